@@ -6,63 +6,24 @@ Flask REST API for real-time toxic comment detection
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 import pickle
-import re
+import sys
+from pathlib import Path
 import numpy as np
 from scipy.sparse import hstack
 from nltk.stem import WordNetLemmatizer
 from nltk.tokenize import word_tokenize
 
+# Text normalization is shared with training and the FastAPI service
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from app.services.common.toxic_normalizer import normalize_for_toxic  # noqa: E402
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend integration
 
 # ===========================
-# Global Variables & Patterns
+# Global Variables
 # ===========================
 
-# Profanity patterns
-PROFANITY_PATTERNS = [
-    (r'f[\W_]*u[\W_]*c[\W_]*k', 'fuck'),
-    (r'sh[\W_]*i[\W_]*t', 'shit'),
-    (r'b[\W_]*i[\W_]*t[\W_]*c[\W_]*h', 'bitch'),
-    (r'a[\W_]*s[\W_]*s[\W_]*h?[\W_]*o?[\W_]*l[\W_]*e?', 'asshole'),
-    (r'd[\W_]*a[\W_]*m[\W_]*n', 'damn'),
-    (r'h[\W_]*e[\W_]*l[\W_]*l', 'hell'),
-    (r'idi0t', 'idiot'),
-    (r'st\*pid', 'stupid'),
-]
-
-# Chat lingo normalization
-CHAT_MAP = {
-    r'\bu\b': 'you',
-    r'\bur\b': 'your',
-    r'\br\b': 'are',
-}
-
-# Positive words for context-aware profanity normalization
-POSITIVE_WORDS = [
-    "good", "great", "awesome", "amazing", "nice",
-    "cool", "fun", "funny", "love", "lovely", "beautiful",
-    "perfect", "excellent", "fantastic", "wonderful", "brilliant",
-    "superb", "outstanding", "impressive", "incredible", "fabulous",
-    "terrific", "magnificent", "marvelous", "spectacular", "phenomenal",
-    "cute", "sweet", "adorable", "delightful", "charming",
-    "interesting", "exciting", "thrilling", "enjoyable", "pleasant",
-    "happy", "glad", "joyful", "pleased", "satisfied",
-    "best", "better", "top", "fine", "solid", "strong",
-    "smart", "clever", "genius", "wise", "talented"
-]
-
-# Create regex patterns
-positive_pattern = "|".join(POSITIVE_WORDS)
-BENIGN_PROFANITY_PATTERN = re.compile(
-    rf"\b(fucking|fuckin|fking|freaking)\s+({positive_pattern})\b",
-    flags=re.IGNORECASE
-)
-INTENSIFIED_PATTERN = re.compile(
-    rf"\b(so|really|very|pretty|quite)\s+(fucking|fuckin|fking)\s+({positive_pattern})\b",
-    flags=re.IGNORECASE
-)
-
 # Label columns
 LABEL_COLS = ['toxic', 'severe_toxic', 'obscene', 'threat', 'insult', 'identity_hate']
 
@@ -77,45 +38,6 @@ lemmatizer = None
 # Preprocessing Functions
 # ===========================
 
-def normalize_for_toxic(text):
-    """
-    Normalize text for toxic detection
-    """
-    # Lowercase
-    text = text.lower()
-    
-    # Remove HTML tags
-    text = re.sub(r'<[^>]+>', ' ', text)
-    
-    # Replace benign profanity with intensifiers
-    text = INTENSIFIED_PATTERN.sub(lambda m: f"{m.group(1)} very {m.group(3)}", text)
-    text = BENIGN_PROFANITY_PATTERN.sub(lambda m: f"very {m.group(2)}", text)
-    
-    # Normalize leet speak: @ → a
-    text = re.sub(r'@', 'a', text)
-    
-    # Collapse repeated characters
-    text = re.sub(r'(.)\1{2,}', r'\1\1', text)
-    
-    # Collapse repeated punctuation
-    text = re.sub(r'!{2,}', '!', text)
-    text = re.sub(r'\?{2,}', '?', text)
-    text = re.sub(r'\.{2,}', '.', text)
-    
-    # Normalize obfuscated profanity
-    for pattern, repl in PROFANITY_PATTERNS:
-        text = re.sub(pattern, repl, text, flags=re.IGNORECASE)
-    
-    # Normalize chat lingo
-    for pattern, repl in CHAT_MAP.items():
-        text = re.sub(pattern, repl, text)
-    
-    # Remove extra whitespaces
-    text = re.sub(r'\s+', ' ', text).strip()
-    
-    return text
-
-
 def analyzer_tfidf(text):
     """
     Custom analyzer for TF-IDF
@@ -2,27 +2,54 @@
 Auto-Train Toxic Detection Model
 Automatically trains and saves models if they don't exist.
 Run this script once, or integrate into FastAPI startup.
+
+Pipeline:
+    1. Normalize text in parallel chunks (one process per core)
+    2. Fit TF-IDF (word 1-3 + char 3-5), or reuse the saved vectorizers
+       in incremental mode; the feature matrix is cached as .npz keyed
+       by data + normalizer + vectorizer settings
+    3. Train the six labels concurrently with joblib (lbfgs is single
+       threaded for binary problems, so n_jobs on the estimator did nothing)
+    4. Optional warm start from the current coefficients
+    5. Publish as a new version under models/versions/<timestamp>/ with a
+       manifest and point models/CURRENT at it; running API workers pick it
+       up without a restart
+
+Usage:
+    python auto_train.py                       # train only if models are missing
+    python auto_train.py --retrain             # full retrain
+    python auto_train.py --retrain --warm-start
+    python auto_train.py --incremental --data train.csv extra_labeled.csv
+    python auto_train.py --retrain --no-activate   # publish only, activate from the admin API
 """
 
+import argparse
+import hashlib
+import json
+import os
 import pickle
-import re
+import sys
+import time
 import pandas as pd
 import numpy as np
 from pathlib import Path
+from joblib import Parallel, delayed
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
-from scipy.sparse import hstack
+from scipy.sparse import hstack, load_npz, save_npz
 from nltk.stem import WordNetLemmatizer
 from nltk.tokenize import word_tokenize
 import nltk
 
-# Ensure NLTK data is downloaded
-try:
-    nltk.data.find('tokenizers/punkt')
-except LookupError:
-    nltk.download('punkt')
-    nltk.download('wordnet')
-    nltk.download('omw-1.4')
+
+def _ensure_nltk_data():
+    """Download NLTK data on first use (not at import: worker processes import this module)"""
+    try:
+        nltk.data.find('tokenizers/punkt')
+    except LookupError:
+        nltk.download('punkt')
+        nltk.download('wordnet')
+        nltk.download('omw-1.4')
 
 # ===========================
 # Configuration
@@ -30,61 +57,54 @@ except LookupError:
 SCRIPT_DIR = Path(__file__).parent
 DATA_FILE = SCRIPT_DIR / "train.csv"
 MODELS_DIR = SCRIPT_DIR / "models"
+CACHE_DIR = MODELS_DIR / ".cache"
+
+# Compact model format and text normalization are shared with the FastAPI service
+sys.path.insert(0, str(SCRIPT_DIR.resolve().parent))
+# Worker processes import this module by name. Appended, not prepended:
+# Only_Model/app.py must not shadow the `app` package (also when the service auto-trains)
+if str(SCRIPT_DIR.resolve()) not in sys.path:
+    sys.path.append(str(SCRIPT_DIR.resolve()))
+from app.services.common.toxic_model_format import COMPACT_DIR_NAME, export_compact_model  # noqa: E402
+from app.services.common import model_versions, toxic_normalizer  # noqa: E402
+
 LABEL_COLS = ['toxic', 'severe_toxic', 'obscene', 'threat', 'insult', 'identity_hate']
 
-# Profanity patterns for preprocessing
-PROFANITY_PATTERNS = [
-    (r'f[\W_]*u[\W_]*c[\W_]*k', 'fuck'),
-    (r'sh[\W_]*i[\W_]*t', 'shit'),
-    (r'b[\W_]*i[\W_]*t[\W_]*c[\W_]*h', 'bitch'),
-    (r'a[\W_]*s[\W_]*s[\W_]*h?[\W_]*o?[\W_]*l[\W_]*e?', 'asshole'),
-    (r'd[\W_]*a[\W_]*m[\W_]*n', 'damn'),
-    (r'h[\W_]*e[\W_]*l[\W_]*l', 'hell'),
-]
-
-CHAT_MAP = {
-    r'\bu\b': 'you',
-    r'\bur\b': 'your',
-    r'\br\b': 'are',
-}
-
-POSITIVE_WORDS = [
-    "good", "great", "awesome", "amazing", "nice", "cool", "fun", "funny",
-    "love", "lovely", "beautiful", "perfect", "excellent", "fantastic"
-]
-
-positive_pattern = "|".join(POSITIVE_WORDS)
-BENIGN_PROFANITY_PATTERN = re.compile(
-    rf"\b(fucking|fuckin|fking|freaking)\s+({positive_pattern})\b",
-    flags=re.IGNORECASE
+WORD_TFIDF_PARAMS = dict(
+    analyzer='word',  # Use built-in analyzer for pickle compatibility
+    ngram_range=(1, 3),
+    max_features=80000,
+    min_df=3,
+    max_df=0.9,
+    sublinear_tf=True,
+    token_pattern=r'\b\w+\b'  # Simple word tokenization
+)
+CHAR_TFIDF_PARAMS = dict(
+    analyzer='char',
+    ngram_range=(3, 5),
+    max_features=20000,
+    min_df=3,
+    max_df=0.9,
+    sublinear_tf=True
 )
+LR_PARAMS = dict(C=4.0, solver='lbfgs', max_iter=1000)
+
+# Below this many rows process start-up costs more than it saves
+PARALLEL_MIN_ROWS = 20000
 
 lemmatizer = WordNetLemmatizer()
 
 
 def normalize_text(text):
-    """Normalize text for toxic detection"""
+    """Normalize text for toxic detection (same pipeline as serving)"""
     if pd.isna(text):
         return ""
-    
-    text = str(text).lower()
-    text = re.sub(r'<[^>]+>', ' ', text)  # Remove HTML
-    text = BENIGN_PROFANITY_PATTERN.sub(lambda m: f"very {m.group(2)}", text)
-    text = re.sub(r'@', 'a', text)
-    text = re.sub(r'(.)\1{2,}', r'\1\1', text)
-    
-    for pattern, repl in PROFANITY_PATTERNS:
-        text = re.sub(pattern, repl, text, flags=re.IGNORECASE)
-    
-    for pattern, repl in CHAT_MAP.items():
-        text = re.sub(pattern, repl, text)
-    
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
+    return toxic_normalizer.normalize_for_toxic(str(text))
 
 
 def custom_analyzer(text):
     """Custom analyzer for TF-IDF"""
+    _ensure_nltk_data()
     try:
         tokens = word_tokenize(text)
         return [lemmatizer.lemmatize(tok) for tok in tokens if tok.strip()]
@@ -92,123 +112,311 @@ def custom_analyzer(text):
         return text.split()
 
 
+def active_model_dir():
+    """Directory of the version models/CURRENT points at (flat models/ without CURRENT)"""
+    return model_versions.resolve_model_dir(MODELS_DIR)[0]
+
+
 def check_models_exist():
     """Check if all model files exist"""
     required_files = ['lr_models.pkl', 'tfidf_word.pkl', 'tfidf_char.pkl']
-    return all((MODELS_DIR / f).exists() for f in required_files)
+    try:
+        model_dir = active_model_dir()
+    except FileNotFoundError:
+        return False
+    return all((model_dir / f).exists() for f in required_files)
+
+
+def _n_jobs(n_jobs=None):
+    return max(1, n_jobs or os.cpu_count() or 1)
+
+
+def _timed(label, start):
+    print(f"   ⏱️ {label}: {time.perf_counter() - start:.1f}s")
+
+
+# ===========================
+# Data + normalization
+# ===========================
+
+def load_data(data_files):
+    """Read one or more labeled CSVs (comment_text + LABEL_COLS)"""
+    frames = [
+        pd.read_csv(path, usecols=['comment_text'] + LABEL_COLS, dtype={label: np.int8 for label in LABEL_COLS})
+        for path in data_files
+    ]
+    df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    df['comment_text'] = df['comment_text'].fillna("").astype(str)
+    return df
+
+
+def _normalize_chunk(texts):
+    return [toxic_normalizer.normalize_for_toxic(text) for text in texts]
+
+
+def normalize_parallel(texts, n_jobs=None, chunk_size=5000):
+    """normalize_for_toxic over all texts, in chunks spread across processes"""
+    n_jobs = _n_jobs(n_jobs)
+    if n_jobs == 1 or len(texts) < PARALLEL_MIN_ROWS:
+        return _normalize_chunk(texts)
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    results = Parallel(n_jobs=n_jobs)(delayed(_normalize_chunk)(chunk) for chunk in chunks)
+    return [text for chunk in results for text in chunk]
+
+
+# ===========================
+# Feature cache
+# ===========================
+
+def _file_digest(path, h=None):
+    h = h or hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h
+
+
+def feature_cache_key(data_files, vectorizer_files=None):
+    """
+    Identifies a feature matrix: data content, normalizer source and vectorizer
+    settings (or the saved vectorizers themselves in incremental mode)
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for path in data_files:
+        _file_digest(path, h)
+    _file_digest(toxic_normalizer.__file__, h)
+    if vectorizer_files:
+        for path in vectorizer_files:
+            _file_digest(path, h)
+    else:
+        h.update(json.dumps([WORD_TFIDF_PARAMS, CHAR_TFIDF_PARAMS], sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def load_cached_features(key):
+    """(X, tfidf_word, tfidf_char) from the cache, or None"""
+    matrix = CACHE_DIR / f"features_{key}.npz"
+    vectorizers = CACHE_DIR / f"vectorizers_{key}.pkl"
+    if not (matrix.exists() and vectorizers.exists()):
+        return None
+    with open(vectorizers, 'rb') as f:
+        tfidf_word, tfidf_char = pickle.load(f)
+    return load_npz(matrix).tocsr(), tfidf_word, tfidf_char
 
 
-def train_models():
-    """Train and save toxic detection models"""
+def save_cached_features(key, X, tfidf_word, tfidf_char):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # Only the latest matrix is kept; they are large
+    for old in CACHE_DIR.glob("features_*.npz"):
+        old.unlink()
+    for old in CACHE_DIR.glob("vectorizers_*.pkl"):
+        old.unlink()
+    save_npz(CACHE_DIR / f"features_{key}.npz", X, compressed=False)
+    with open(CACHE_DIR / f"vectorizers_{key}.pkl", 'wb') as f:
+        pickle.dump((tfidf_word, tfidf_char), f)
+
+
+def build_features(texts, existing_vectorizers=None, n_jobs=None):
+    """Fit (or reuse) both TF-IDF vectorizers and return (X, tfidf_word, tfidf_char)"""
+    start = time.perf_counter()
+    clean = normalize_parallel(texts, n_jobs)
+    _timed(f"normalize {len(clean)} texts", start)
+
+    start = time.perf_counter()
+    if existing_vectorizers is not None:
+        tfidf_word, tfidf_char = existing_vectorizers
+        X_word = tfidf_word.transform(clean)
+        X_char = tfidf_char.transform(clean)
+    else:
+        tfidf_word = TfidfVectorizer(**WORD_TFIDF_PARAMS)
+        tfidf_char = TfidfVectorizer(**CHAR_TFIDF_PARAMS)
+        # The two fits are independent: run them side by side
+        X_word, X_char = Parallel(n_jobs=min(2, _n_jobs(n_jobs)), prefer="threads")(
+            delayed(vec.fit_transform)(clean) for vec in (tfidf_word, tfidf_char)
+        )
+    print(f"     Word: {X_word.shape}, Char: {X_char.shape}")
+    X = hstack([X_word, X_char]).tocsr()
+    _timed("TF-IDF", start)
+    return X, tfidf_word, tfidf_char
+
+
+# ===========================
+# Training
+# ===========================
+
+def _fit_label(X, y, init=None):
+    """One binary LR; `init` = (coef, intercept) to warm start from"""
+    model = LogisticRegression(**LR_PARAMS, warm_start=init is not None)
+    if init is not None:
+        model.coef_ = init[0].copy()
+        model.intercept_ = init[1].copy()
+    return model.fit(X, y)
+
+
+def _warm_start_params(n_features):
+    """Current coefficients per label, if the saved model has the same feature space"""
+    path = active_model_dir() / 'lr_models.pkl'
+    if not path.exists():
+        print("   ⚠️ No saved model to warm start from")
+        return {}
+    with open(path, 'rb') as f:
+        previous = pickle.load(f)
+    params = {}
+    for label in LABEL_COLS:
+        model = previous.get(label)
+        if model is not None and model.coef_.shape == (1, n_features):
+            params[label] = (model.coef_, model.intercept_)
+    if len(params) < len(LABEL_COLS):
+        print(f"   ⚠️ Warm start for {len(params)}/{len(LABEL_COLS)} labels (feature space changed)")
+    return params
+
+
+def train_label_models(X, df, warm_start=False, n_jobs=None):
+    """Fit all labels concurrently; returns {label: LogisticRegression}"""
+    init = _warm_start_params(X.shape[1]) if warm_start else {}
+    n_jobs = min(len(LABEL_COLS), _n_jobs(n_jobs)) if X.shape[0] >= PARALLEL_MIN_ROWS else 1
+    # X is memory-mapped into the workers instead of copied per label
+    models = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_label)(X, df[label].values, init.get(label)) for label in LABEL_COLS
+    )
+    lr_models = dict(zip(LABEL_COLS, models))
+    for label in LABEL_COLS:
+        y = df[label].values
+        print(f"   - {label}: positive {y.sum() / len(y) * 100:.1f}%, iterations {int(lr_models[label].n_iter_[0])}")
+    return lr_models
+
+
+def train_models(data_files=None, warm_start=False, incremental=False, n_jobs=None, use_cache=True,
+                 activate=True, keep_versions=5):
+    """
+    Train toxic detection models and publish them as a new model version.
+
+    - data_files: labeled CSVs (default: train.csv)
+    - warm_start: start each label from the current coefficients
+    - incremental: keep the saved vectorizers (no TF-IDF refit), transform the
+      data with them and warm start; for retraining on added data
+    - activate: point models/CURRENT at the new version
+    - keep_versions: older inactive versions beyond this many are deleted
+    """
     print("=" * 60)
     print("🚀 Auto-Training Toxic Detection Model")
     print("=" * 60)
+    total_start = time.perf_counter()
     
-    # Check if data file exists
-    if not DATA_FILE.exists():
-        print(f"❌ Data file not found: {DATA_FILE}")
+    data_files = [Path(p) for p in (data_files or [DATA_FILE])]
+    missing = [p for p in data_files if not p.exists()]
+    if missing:
+        print(f"❌ Data file not found: {', '.join(map(str, missing))}")
         print("   Please download train.csv from Kaggle Toxic Comment dataset")
         return False
     
-    print(f"\n📂 Loading data from {DATA_FILE}...")
-    df = pd.read_csv(DATA_FILE)
-    print(f"   Loaded {len(df)} samples")
-    
-    # Preprocess
-    print("\n🔧 Preprocessing text...")
-    df['clean_text'] = df['comment_text'].apply(normalize_text)
-    
-    # TF-IDF Vectorizers
-    print("\n📊 Building TF-IDF vectorizers...")
+    existing_vectorizers = None
+    vectorizer_files = None
+    if incremental:
+        vectorizer_files = [active_model_dir() / 'tfidf_word.pkl', active_model_dir() / 'tfidf_char.pkl']
+        if not all(p.exists() for p in vectorizer_files):
+            print("❌ Incremental mode needs existing tfidf_word.pkl / tfidf_char.pkl")
+            return False
+        with open(vectorizer_files[0], 'rb') as f:
+            tfidf_word = pickle.load(f)
+        with open(vectorizer_files[1], 'rb') as f:
+            tfidf_char = pickle.load(f)
+        existing_vectorizers = (tfidf_word, tfidf_char)
+        warm_start = True
     
-    print("   - Word n-grams (1-3)...")
-    # Note: Using built-in 'word' analyzer instead of custom function
-    # to avoid pickle serialization issues with module references
-    tfidf_word = TfidfVectorizer(
-        analyzer='word',  # Use built-in analyzer for pickle compatibility
-        ngram_range=(1, 3),
-        max_features=80000,
-        min_df=3,
-        max_df=0.9,
-        sublinear_tf=True,
-        token_pattern=r'\b\w+\b'  # Simple word tokenization
-    )
-    X_word = tfidf_word.fit_transform(df['clean_text'])
-    print(f"     Shape: {X_word.shape}")
-    
-    print("   - Char n-grams (3-5)...")
-    tfidf_char = TfidfVectorizer(
-        analyzer='char',
-        ngram_range=(3, 5),
-        max_features=20000,
-        min_df=3,
-        max_df=0.9,
-        sublinear_tf=True
-    )
-    X_char = tfidf_char.fit_transform(df['clean_text'])
-    print(f"     Shape: {X_char.shape}")
+    print(f"\n📂 Loading data from {', '.join(p.name for p in data_files)}...")
+    start = time.perf_counter()
+    df = load_data(data_files)
+    print(f"   Loaded {len(df)} samples")
+    _timed("load", start)
     
-    # Combine features
-    X = hstack([X_word, X_char])
+    print("\n📊 Building features...")
+    key = feature_cache_key(data_files, vectorizer_files)
+    cached = load_cached_features(key) if use_cache else None
+    if cached is not None and cached[0].shape[0] == len(df):
+        X, tfidf_word, tfidf_char = cached
+        print(f"   ✓ Feature cache hit ({key[:12]})")
+    else:
+        X, tfidf_word, tfidf_char = build_features(df['comment_text'].tolist(), existing_vectorizers, n_jobs)
+        if use_cache:
+            save_cached_features(key, X, tfidf_word, tfidf_char)
     print(f"\n📐 Combined feature shape: {X.shape}")
     
-    # Train Logistic Regression for each label
-    print("\n🤖 Training Logistic Regression models...")
-    lr_models = {}
+    print(f"\n🤖 Training Logistic Regression models ({'warm start' if warm_start else 'cold start'})...")
+    start = time.perf_counter()
+    lr_models = train_label_models(X, df, warm_start=warm_start, n_jobs=n_jobs)
+    _timed("training", start)
     
-    for label in LABEL_COLS:
-        print(f"   - Training {label}...", end=" ")
-        y = df[label].values
-        
-        model = LogisticRegression(
-            C=4.0,
-            solver='lbfgs',
-            max_iter=1000,
-            n_jobs=-1
-        )
-        model.fit(X, y)
-        lr_models[label] = model
-        
-        # Calculate positive ratio
-        pos_ratio = y.sum() / len(y) * 100
-        print(f"Done! (positive: {pos_ratio:.1f}%)")
-    
-    # Save models
+    # Save models into a staging directory, then publish it as one version
     print("\n💾 Saving models...")
-    MODELS_DIR.mkdir(exist_ok=True)
+    version_dir = model_versions.staging_dir(MODELS_DIR)
     
-    with open(MODELS_DIR / 'lr_models.pkl', 'wb') as f:
+    with open(version_dir / 'lr_models.pkl', 'wb') as f:
         pickle.dump(lr_models, f)
     print("   ✓ lr_models.pkl saved")
     
-    with open(MODELS_DIR / 'tfidf_word.pkl', 'wb') as f:
+    with open(version_dir / 'tfidf_word.pkl', 'wb') as f:
         pickle.dump(tfidf_word, f)
     print("   ✓ tfidf_word.pkl saved")
     
-    with open(MODELS_DIR / 'tfidf_char.pkl', 'wb') as f:
+    with open(version_dir / 'tfidf_char.pkl', 'wb') as f:
         pickle.dump(tfidf_char, f)
     print("   ✓ tfidf_char.pkl saved")
     
+    export_compact_model(lr_models, tfidf_word, tfidf_char, version_dir / COMPACT_DIR_NAME, LABEL_COLS)
+    print(f"   ✓ compact model exported to {COMPACT_DIR_NAME}/")
+    
     # Show file sizes
     print("\n📦 Model files:")
     total_size = 0
-    for file in MODELS_DIR.glob('*.pkl'):
+    for file in version_dir.glob('*.pkl'):
         size_mb = file.stat().st_size / (1024 * 1024)
         total_size += size_mb
         print(f"   - {file.name}: {size_mb:.2f} MB")
     print(f"   Total: {total_size:.2f} MB")
     
+    version = model_versions.publish_version(MODELS_DIR, version_dir, {
+        "labels": LABEL_COLS,
+        "training": {
+            "data": [p.name for p in data_files],
+            "rows": int(len(df)),
+            "n_features": int(X.shape[1]),
+            "warm_start": bool(warm_start),
+            "incremental": bool(incremental),
+            "seconds": round(time.perf_counter() - total_start, 1),
+        },
+    }, activate=activate)
+    print(f"\n🏷️ Published model version {version}" + (" (active)" if activate else " (not activated)"))
+    removed = model_versions.prune_versions(MODELS_DIR, keep_versions)
+    if removed:
+        print(f"   🧹 Removed old versions: {', '.join(removed)}")
+    
     print("\n" + "=" * 60)
-    print("✅ Training completed successfully!")
+    print(f"✅ Training completed successfully in {time.perf_counter() - total_start:.1f}s!")
     print("=" * 60)
     
     return True
 
 
+def export_compact_from_pickles(model_dir=MODELS_DIR):
+    """Convert existing pickled models to the compact memory-mapped format"""
+    with open(model_dir / 'lr_models.pkl', 'rb') as f:
+        lr_models = pickle.load(f)
+    with open(model_dir / 'tfidf_word.pkl', 'rb') as f:
+        tfidf_word = pickle.load(f)
+    with open(model_dir / 'tfidf_char.pkl', 'rb') as f:
+        tfidf_char = pickle.load(f)
+    export_compact_model(lr_models, tfidf_word, tfidf_char, model_dir / COMPACT_DIR_NAME, LABEL_COLS)
+    print(f"✅ Compact model exported to {model_dir / COMPACT_DIR_NAME}")
+
+
 def ensure_models_exist():
     """Ensure models exist, train if not"""
     if check_models_exist():
         print("✅ Toxic detection models already exist")
+        # Flat legacy layout from before the compact format (published versions always have one)
+        if model_versions.read_current(MODELS_DIR) is None and not (MODELS_DIR / COMPACT_DIR_NAME / "manifest.json").exists():
+            export_compact_from_pickles()
         return True
     else:
         print("⚠️ Models not found, starting auto-training...")
@@ -216,4 +424,22 @@ def ensure_models_exist():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the toxic detection model")
+    parser.add_argument("--retrain", action="store_true", help="train even if models exist")
+    parser.add_argument("--warm-start", action="store_true", help="start from the current coefficients")
+    parser.add_argument("--incremental", action="store_true",
+                        help="keep the saved vectorizers and warm start (retrain on added data)")
+    parser.add_argument("--data", nargs="+", default=None, help="labeled CSV files (default: train.csv)")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write the feature cache")
+    parser.add_argument("--no-activate", action="store_true",
+                        help="publish the version without pointing models/CURRENT at it")
+    parser.add_argument("--keep", type=int, default=5, help="model versions to keep (default: 5)")
+    args = parser.parse_args()
+
+    if args.retrain or args.warm_start or args.incremental or args.data:
+        ok = train_models(args.data, warm_start=args.warm_start, incremental=args.incremental,
+                          n_jobs=args.jobs, use_cache=not args.no_cache,
+                          activate=not args.no_activate, keep_versions=args.keep)
+        sys.exit(0 if ok else 1)
     ensure_models_exist()
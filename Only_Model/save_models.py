@@ -5,6 +5,7 @@ Export models from notebook for API deployment
 
 import pickle
 import os
+import sys
 from pathlib import Path
 
 # Create models directory
@@ -33,6 +34,16 @@ try:
         pickle.dump(tfidf_char, f)
     print("✓ tfidf_char.pkl saved")
     
+    # Save compact memory-mapped format (loaded by the FastAPI service)
+    print("Exporting compact model...")
+    sys.path.insert(0, str(Path.cwd().resolve().parent))
+    from app.services.common.toxic_model_format import export_compact_model
+    export_compact_model(
+        lr_models, tfidf_word, tfidf_char, models_dir / 'compact',
+        ['toxic', 'severe_toxic', 'obscene', 'threat', 'insult', 'identity_hate']
+    )
+    print("✓ compact/ saved")
+    
     print("\n" + "="*60)
     print("✓ All models saved successfully!")
     print("="*60)
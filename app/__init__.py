@@ -0,0 +1 @@
+# Regular package (not a namespace package), so Only_Model/app.py can never shadow it
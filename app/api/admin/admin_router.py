@@ -2,7 +2,7 @@
 Admin role API endpoints.
 These endpoints are for admin-only operations.
 """
-from fastapi import APIRouter, Depends, HTTPException, Query, Security
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel, EmailStr, Field, validator
 from app.core.dependencies import get_current_user
@@ -14,6 +14,14 @@ from app.services.user.anon_comment_service import AnonCommentService
 from app.services.user.report_service import ReportService
 from app.services.expert.expert_article_service import ExpertArticleService
 from app.services.common.notification_service import NotificationService
+from app.services.admin.remoderation_service import RemoderationService
+from app.services.common.model_registry import get_model_registry
+from app.services.common.approved_timeline import get_approved_timeline
+from app.services.common.model_versions import list_versions
+from app.services.common.toxic_detection_service import get_toxic_detection_service
+from app.repositories.anon_post_repository import AnonPostRepository
+from app.repositories.user_repository import UserRepository
+from app.utils.pagination import KEYSET_SORT, apply_cursor, next_cursor, set_next_cursor
 from app.schemas.user.anon_post_schema import AnonPostResponse
 from app.schemas.user.report_schema import ReportResponse
 from app.schemas.expert.expert_article_schema import ExpertArticleResponse
@@ -160,8 +168,10 @@ async def list_all_users(
 @router.get("/posts")
 @require_role(Role.ADMIN)
 async def list_all_posts(
+    response: Response,
     status: str = Query(None, description="Filter: Approved, Pending, Blocked"),
     limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
     db=Depends(get_db),
     current_user=Depends(get_current_user)
 ):
@@ -169,22 +179,19 @@ async def list_all_posts(
     Lấy danh sách bài viết (Admin xem được tất cả, bao gồm username của bài ẩn danh).
     """
     collection = db["anon_posts"]
-    users_collection = db["users"]
     
     query = {}
     if status:
         query["moderation_status"] = status
     
-    cursor = collection.find(query).sort("created_at", -1).limit(limit)
-    posts = await cursor.to_list(length=limit)
+    posts = await collection.find(apply_cursor(query, cursor)).sort(KEYSET_SORT).limit(limit).to_list(length=limit)
+    set_next_cursor(response, posts, limit)
     
-    # Enrich với username cho admin (luôn hiển thị, kể cả ẩn danh)
+    # Enrich với username cho admin (luôn hiển thị, kể cả ẩn danh) - một query cho cả trang
+    users = await UserRepository(db).get_many_by_ids([post.get("user_id") for post in posts], {"username": 1, "email": 1})
     enriched_posts = []
     for post in posts:
-        user = await users_collection.find_one(
-            {"_id": post.get("user_id")},
-            {"username": 1, "email": 1}
-        )
+        user = users.get(post.get("user_id"))
         post["_id"] = str(post["_id"])
         post["user_id"] = str(post.get("user_id", ""))
         post["username"] = user.get("username", "Unknown") if user else "Unknown"
@@ -198,20 +205,23 @@ async def list_all_posts(
 @router.get("/posts/pending")
 @require_role(Role.ADMIN)
 async def list_pending_posts(
+    response: Response,
     limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
     db=Depends(get_db),
     current_user=Depends(get_current_user)
 ):
     """Lấy danh sách bài viết đang chờ duyệt (Pending)."""
     collection = db["anon_posts"]
-    users_collection = db["users"]
     
-    cursor = collection.find({"moderation_status": "Pending"}).sort("created_at", -1).limit(limit)
-    posts = await cursor.to_list(length=limit)
+    query = apply_cursor({"moderation_status": "Pending"}, cursor)
+    posts = await collection.find(query).sort(KEYSET_SORT).limit(limit).to_list(length=limit)
+    set_next_cursor(response, posts, limit)
     
+    users = await UserRepository(db).get_many_by_ids([post.get("user_id") for post in posts], {"username": 1, "email": 1})
     enriched_posts = []
     for post in posts:
-        user = await users_collection.find_one({"_id": post.get("user_id")}, {"username": 1, "email": 1})
+        user = users.get(post.get("user_id"))
         post["_id"] = str(post["_id"])
         post["user_id"] = str(post.get("user_id", ""))
         post["username"] = user.get("username", "Unknown") if user else "Unknown"
@@ -223,15 +233,18 @@ async def list_pending_posts(
 @router.get("/posts/approved")
 @require_role(Role.ADMIN)
 async def list_approved_posts(
+    response: Response,
     limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
     db=Depends(get_db),
     current_user=Depends(get_current_user)
 ):
     """Lấy danh sách bài viết đã duyệt (Approved)."""
     collection = db["anon_posts"]
     
-    cursor = collection.find({"moderation_status": "Approved"}).sort("created_at", -1).limit(limit)
-    posts = await cursor.to_list(length=limit)
+    query = apply_cursor({"moderation_status": "Approved"}, cursor)
+    posts = await collection.find(query).sort(KEYSET_SORT).limit(limit).to_list(length=limit)
+    set_next_cursor(response, posts, limit)
     
     for post in posts:
         post["_id"] = str(post["_id"])
@@ -246,14 +259,17 @@ async def list_posts_for_moderation(
     status: str = Query(None, description="Filter: Approved, Pending, Blocked"),
     risk_level: str = Query(None, description="Filter by AI risk level"),
     sentiment: str = Query(None, description="Filter by sentiment"),
-    skip: int = Query(0, ge=0),
+    skip: int = Query(0, ge=0, description="Offset paging (legacy); ignored when cursor is set"),
     limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
     db=Depends(get_db),
     current_user=Depends(get_current_user)
 ):
-    """Lấy danh sách bài viết cho moderation với các bộ lọc nâng cao."""
+    """
+    Lấy danh sách bài viết cho moderation với các bộ lọc nâng cao.
+    Trang sau: gửi `next_cursor` của trang trước qua `cursor` (keyset, không chậm dần như skip).
+    """
     collection = db["anon_posts"]
-    users_collection = db["users"]
     
     query = {}
     if status:
@@ -264,12 +280,15 @@ async def list_posts_for_moderation(
         query["ai_sentiment"] = sentiment
     
     total = await collection.count_documents(query)
-    cursor = collection.find(query).sort("created_at", -1).skip(skip).limit(limit)
-    posts = await cursor.to_list(length=limit)
+    if cursor:
+        skip = 0
+    posts = await collection.find(apply_cursor(query, cursor)).sort(KEYSET_SORT).skip(skip).limit(limit).to_list(length=limit)
+    page_cursor = next_cursor(posts, limit)
     
+    users = await UserRepository(db).get_many_by_ids([post.get("user_id") for post in posts], {"username": 1, "email": 1})
     enriched_posts = []
     for post in posts:
-        user = await users_collection.find_one({"_id": post.get("user_id")}, {"username": 1, "email": 1})
+        user = users.get(post.get("user_id"))
         post["_id"] = str(post["_id"])
         post["user_id"] = str(post.get("user_id", ""))
         post["username"] = user.get("username", "Unknown") if user else "Unknown"
@@ -280,6 +299,7 @@ async def list_posts_for_moderation(
         "total": total,
         "skip": skip,
         "limit": limit,
+        "next_cursor": page_cursor,
         "posts": enriched_posts
     }
 
@@ -338,6 +358,7 @@ async def update_post_status(
     collection = db["anon_posts"]
     
     try:
+        await AnonPostRepository(db).release_queued([post_id])
         result = await collection.update_one(
             {"_id": ObjectId(post_id)},
             {"$set": {"moderation_status": status, "status_reason": reason}}
@@ -347,6 +368,9 @@ async def update_post_status(
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Post not found")
+    if status == "Approved":
+        await AnonPostRepository(db).count_hashtags([post_id])
+    await get_approved_timeline().changed(db)
     
     return {"message": f"Post status updated to {status}", "post_id": post_id}
 
@@ -371,10 +395,15 @@ async def batch_update_post_status(
     except:
         raise HTTPException(status_code=400, detail="Invalid post_id format in list")
     
+    await AnonPostRepository(db).release_queued(object_ids)
     result = await collection.update_many(
         {"_id": {"$in": object_ids}},
         {"$set": {"moderation_status": status, "status_reason": reason}}
     )
+    if status == "Approved":
+        await AnonPostRepository(db).count_hashtags(object_ids)
+    if result.modified_count:
+        await get_approved_timeline().changed(db)
     
     return {
         "message": f"Updated {result.modified_count} posts to status {status}",
@@ -410,15 +439,16 @@ async def delete_post(post_id: str, reason: str, db=Depends(get_db), user=Depend
 @router.get("/comments")
 @require_role(Role.ADMIN)
 async def list_all_comments(
+    response: Response,
     post_id: str = Query(None, description="Filter by post_id"),
     status: str = Query(None, description="Filter: Approved, Pending, Blocked"),
     limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
     db=Depends(get_db),
     current_user=Depends(get_current_user)
 ):
     """Lấy danh sách comments (Admin)."""
     collection = db["anon_comments"]
-    users_collection = db["users"]
     
     query = {}
     if post_id:
@@ -426,15 +456,13 @@ async def list_all_comments(
     if status:
         query["moderation_status"] = status
     
-    cursor = collection.find(query).sort("created_at", -1).limit(limit)
-    comments = await cursor.to_list(length=limit)
+    comments = await collection.find(apply_cursor(query, cursor)).sort(KEYSET_SORT).limit(limit).to_list(length=limit)
+    set_next_cursor(response, comments, limit)
     
+    users = await UserRepository(db).get_many_by_ids([comment.get("user_id") for comment in comments], {"username": 1})
     enriched_comments = []
     for comment in comments:
-        user = await users_collection.find_one(
-            {"_id": comment.get("user_id")},
-            {"username": 1}
-        )
+        user = users.get(comment.get("user_id"))
         comment["_id"] = str(comment["_id"])
         comment["post_id"] = str(comment.get("post_id", ""))
         comment["user_id"] = str(comment.get("user_id", ""))
@@ -459,10 +487,7 @@ async def delete_comment(comment_id: str, reason: str, db=Depends(get_db), user=
     await service.comment_repo.delete(comment_id)
     
     # Decrement comment count on post
-    await db["anon_posts"].update_one(
-        {"_id": comment.get("post_id")},
-        {"$inc": {"comment_count": -1}}
-    )
+    await service.post_repo.increment_counters(comment.get("post_id"), {"comment_count": -1})
     
     # Notify user
     await notif_service.create_notification(
@@ -473,6 +498,98 @@ async def delete_comment(comment_id: str, reason: str, db=Depends(get_db), user=
     )
     return {"message": "Comment deleted and user notified"}
 
+# --- Re-moderation (re-score existing content after a model update) ---
+class RemoderationRequest(BaseModel):
+    mode: Literal["escalate", "scores"] = Field("escalate", description="escalate: siết trạng thái nếu model mới nghiêm hơn; scores: chỉ cập nhật điểm AI")
+    collections: Optional[list[Literal["anon_posts", "anon_comments"]]] = Field(None, description="Mặc định: cả bài viết và bình luận")
+    batch_size: Optional[int] = Field(None, ge=16, le=5000)
+
+
+@router.post("/remoderation")
+@require_role(Role.ADMIN)
+async def start_remoderation(
+    payload: RemoderationRequest,
+    db=Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """
+    Chạy lại kiểm duyệt AI cho bài viết / bình luận đã có (chạy nền, có checkpoint).
+    Bỏ qua nội dung admin đã duyệt tay. Chỉ một job chạy tại một thời điểm.
+    """
+    service = RemoderationService(db)
+    return await service.start(
+        admin_id=current_user["_id"],
+        mode=payload.mode,
+        collections=payload.collections,
+        batch_size=payload.batch_size
+    )
+
+
+@router.get("/remoderation")
+@require_role(Role.ADMIN)
+async def get_remoderation_status(
+    job_id: str = Query(None, description="Mặc định: job gần nhất"),
+    db=Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """Tiến độ job re-moderation: số bản ghi đã xử lý, số bị siết trạng thái, tốc độ (docs/s), ETA."""
+    return await RemoderationService(db).status(job_id)
+
+
+@router.post("/remoderation/{job_id}/pause")
+@require_role(Role.ADMIN)
+async def pause_remoderation(job_id: str, db=Depends(get_db), current_user=Depends(get_current_user)):
+    """Tạm dừng job (dừng sau batch hiện tại, giữ checkpoint)."""
+    return await RemoderationService(db).pause(job_id)
+
+
+@router.post("/remoderation/{job_id}/resume")
+@require_role(Role.ADMIN)
+async def resume_remoderation(job_id: str, db=Depends(get_db), current_user=Depends(get_current_user)):
+    """Tiếp tục job đã tạm dừng từ checkpoint cuối."""
+    return await RemoderationService(db).resume(job_id)
+
+
+@router.delete("/remoderation/{job_id}")
+@require_role(Role.ADMIN)
+async def cancel_remoderation(job_id: str, db=Depends(get_db), current_user=Depends(get_current_user)):
+    """Hủy job (các batch đã ghi giữ nguyên); sau đó có thể chạy job mới."""
+    return await RemoderationService(db).cancel(job_id)
+
+# --- Toxic model versions (hot swap without restarting workers) ---
+class ModelReloadRequest(BaseModel):
+    version: Optional[str] = Field(None, description="Mặc định: nạp lại phiên bản mà models/CURRENT đang trỏ tới")
+
+
+@router.get("/models/toxic")
+@require_role(Role.ADMIN)
+async def get_toxic_model_versions(current_user=Depends(get_current_user)):
+    """Phiên bản model toxic đang chạy ở worker này và các phiên bản đã publish (mới nhất trước)."""
+    service = get_toxic_detection_service()
+    return {**service.status(), "versions": list_versions(service.models_path)}
+
+
+@router.post("/models/toxic/reload")
+@require_role(Role.ADMIN)
+async def reload_toxic_model(payload: ModelReloadRequest, current_user=Depends(get_current_user)):
+    """
+    Nạp model ở nền, warm up rồi thay thế model đang chạy (không gián đoạn request).
+    Nếu chỉ định version: trỏ CURRENT tới phiên bản đó, các worker khác tự chuyển theo
+    trong vòng TOXIC_MODEL_WATCH_SECONDS. Lỗi khi nạp → giữ nguyên model cũ.
+    """
+    registry = get_model_registry()
+    if registry.is_loading("toxic"):
+        raise HTTPException(status_code=409, detail="Toxic model is still loading", headers={"Retry-After": "5"})
+    service = get_toxic_detection_service()
+    try:
+        result = await service.reload_async(payload.version, activate=payload.version is not None)
+    except (FileNotFoundError, ValueError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Model failed to load, still serving {service.model_version}: {e}")
+    registry.mark_ready("toxic")
+    return result
+
 # --- Report Management ---
 @router.get("/reports", response_model=list[ReportResponse])
 @require_role(Role.ADMIN)
@@ -710,6 +827,8 @@ async def receive_ai_analysis_result(
     elif risk_level == "medium":
         new_status = "Pending"
     
+    if post.get("moderation_status") == "Pending":
+        await AnonPostRepository(db).release_queued([post["_id"]])
     await collection.update_one(
         {"_id": ObjectId(post_id)},
         {"$set": {
@@ -718,6 +837,9 @@ async def receive_ai_analysis_result(
             "moderation_status": new_status if post.get("moderation_status") == "Pending" else post.get("moderation_status")
         }}
     )
+    if post.get("moderation_status") == "Pending" and new_status == "Approved":
+        await AnonPostRepository(db).count_hashtags([post["_id"]])
+        await get_approved_timeline().changed(db)
     
     return {
         "message": "AI analysis result received",
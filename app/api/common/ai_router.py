@@ -5,9 +5,16 @@ Allows direct access to sentiment analysis functionality.
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel, Field
 from typing import Optional
+import asyncio
 
 # Import the shared sentiment analysis function
-from app.services.user.journal_service import analyze_sentiment
+from app.services.common.sentiment_service import analyze_sentiment_async, analyze_long_sentiment_async, get_sentiment_batcher
+from app.services.common.inference_executor import get_inference_executor, InferenceQueueFull
+from app.services.common.inference_cache import get_inference_cache
+from app.services.common.model_registry import get_model_registry
+from app.services.common.moderation_cascade import get_moderation_cascade
+from app.services.common.moderation_queue import get_journal_worker, get_moderation_worker
+from app.services.common.approved_timeline import get_approved_timeline
 
 router = APIRouter(prefix="/ai", tags=["🤖 AI - Analysis"])
 
@@ -17,12 +24,21 @@ class SentimentRequest(BaseModel):
     text: str = Field(..., min_length=1, max_length=5000, description="Text to analyze")
 
 
+class SentimentSegmentItem(BaseModel):
+    """Score of one sentence window of a long text"""
+    start: int  # character offsets into the request text
+    end: int
+    sentiment: str
+    score: float
+
+
 class SentimentResponse(BaseModel):
     """Response from sentiment analysis"""
     text: str
     sentiment: str  # Positive, Neutral, Negative
     score: float  # -1.0 to 1.0
     confidence: str  # low, medium, high
+    segments: list[SentimentSegmentItem] = []  # per sentence window (long texts)
 
 
 @router.post("/sentiment", response_model=SentimentResponse)
@@ -36,11 +52,14 @@ async def analyze_text_sentiment(request: SentimentRequest):
     - **sentiment**: Positive / Neutral / Negative
     - **score**: Điểm số (-1.0 đến 1.0)
     - **confidence**: Độ tin cậy (low / medium / high)
+    - **segments**: Điểm từng cụm câu (văn bản dài được chấm theo cửa sổ câu, gộp theo độ dài)
     
     Model: cardiffnlp/twitter-roberta-base-sentiment (RoBERTa)
     """
+    get_model_registry().require("sentiment")
+    
     try:
-        label, score = analyze_sentiment(request.text)
+        label, score, segments = await analyze_long_sentiment_async(request.text)
         
         # Determine confidence level
         abs_score = abs(score)
@@ -55,8 +74,14 @@ async def analyze_text_sentiment(request: SentimentRequest):
             text=request.text[:100] + "..." if len(request.text) > 100 else request.text,
             sentiment=label,
             score=round(score, 4),
-            confidence=confidence
+            confidence=confidence,
+            segments=[
+                SentimentSegmentItem(start=seg["start"], end=seg["end"], sentiment=seg["label"], score=seg["score"])
+                for seg in segments
+            ] if len(segments) > 1 else []
         )
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Sentiment analysis failed: {str(e)}")
 
@@ -90,32 +115,43 @@ async def analyze_batch_sentiment(request: BatchSentimentRequest):
     - **results**: Kết quả phân tích từng văn bản
     - **summary**: Tổng hợp (positive_count, negative_count, neutral_count)
     """
+    get_model_registry().require("sentiment")
+    
     results = []
     positive_count = 0
     negative_count = 0
     neutral_count = 0
     
-    for text in request.texts:
-        try:
-            label, score = analyze_sentiment(text)
-            results.append(BatchSentimentItem(
-                text=text[:50] + "..." if len(text) > 50 else text,
-                sentiment=label,
-                score=round(score, 4)
-            ))
-            
-            if label == "Positive":
-                positive_count += 1
-            elif label == "Negative":
-                negative_count += 1
-            else:
-                neutral_count += 1
-        except:
+    # Submitted together, the texts land in the same micro-batch
+    outcomes = await asyncio.gather(
+        *[analyze_sentiment_async(text) for text in request.texts],
+        return_exceptions=True
+    )
+    
+    for text, outcome in zip(request.texts, outcomes):
+        if isinstance(outcome, InferenceQueueFull):
+            raise HTTPException(status_code=503, detail=str(outcome))
+        if isinstance(outcome, Exception):
             results.append(BatchSentimentItem(
                 text=text[:50] + "...",
                 sentiment="Error",
                 score=0.0
             ))
+            continue
+        
+        label, score = outcome
+        results.append(BatchSentimentItem(
+            text=text[:50] + "..." if len(text) > 50 else text,
+            sentiment=label,
+            score=round(score, 4)
+        ))
+        
+        if label == "Positive":
+            positive_count += 1
+        elif label == "Negative":
+            negative_count += 1
+        else:
+            neutral_count += 1
     
     return BatchSentimentResponse(
         results=results,
@@ -128,6 +164,33 @@ async def analyze_batch_sentiment(request: BatchSentimentRequest):
     )
 
 
+@router.get("/metrics")
+async def inference_metrics():
+    """
+    Thống kê hàng đợi và độ trễ của inference executor.
+    
+    - **cpu**: Thread pool (TF-IDF + Logistic Regression)
+    - **model**: Process pool (RoBERTa sentiment)
+    - **stt**: Thread pool riêng cho speech-to-text (phiên âm nhật ký)
+    - **sentiment_batcher**: Micro-batching (số batch, kích thước trung bình)
+    - **cache**: Cache kết quả toxic/sentiment (hit/miss theo từng model)
+    - **moderation**: Cascade kiểm duyệt (tỉ lệ quyết định và độ trễ từng tầng)
+    - **moderation_queue**: Hàng đợi kiểm duyệt bất đồng bộ (số job theo trạng thái, độ trễ)
+    - **journal_queue**: Hàng đợi xử lý nhật ký (STT + cảm xúc), worker riêng
+    - **feed_timeline**: Timeline bài đã duyệt trong bộ nhớ (hit/miss, số lần rebuild)
+    """
+    return {
+        **get_inference_executor().metrics(),
+        "sentiment_batcher": get_sentiment_batcher().metrics(),
+        "cache": get_inference_cache().metrics(),
+        "moderation": get_moderation_cascade().metrics(),
+        "moderation_queue": await get_moderation_worker().metrics(),
+        "journal_queue": await get_journal_worker().metrics(),
+        "feed_timeline": get_approved_timeline().status(),
+        "models": get_model_registry().status()
+    }
+
+
 # ============================================
 # TOXIC CONTENT DETECTION
 # Integrated with FastAPI (no external Flask API required)
@@ -150,6 +213,7 @@ class ToxicResponse(BaseModel):
     confidence: float
     toxic_labels: list[str] = []
     predictions: dict = {}
+    model_version: Optional[str] = None
 
 
 @router.get("/toxic/health")
@@ -166,6 +230,7 @@ async def toxic_health_check():
         "status": "healthy" if is_healthy else "models_not_loaded",
         "integrated": True,
         "models_path": str(service.models_path),
+        "model_version": service.model_version,
         "message": "Toxic detection model is ready" if is_healthy else "Models not loaded. Run: cd Only_Model && python save_models.py"
     }
 
@@ -196,7 +261,10 @@ async def detect_toxic_content(request: ToxicRequest):
             detail="Toxic detection models not loaded. Run: cd Only_Model && python save_models.py"
         )
     
-    result = await service.analyze_text(request.text, request.threshold)
+    try:
+        result = await service.analyze_text(request.text, request.threshold)
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     
     return ToxicResponse(
         text=request.text[:100] + "..." if len(request.text) > 100 else request.text,
@@ -204,7 +272,8 @@ async def detect_toxic_content(request: ToxicRequest):
         label=result.label,
         confidence=result.confidence,
         toxic_labels=result.toxic_labels,
-        predictions=result.predictions
+        predictions=result.predictions,
+        model_version=result.model_version
     )
 
 
@@ -221,6 +290,7 @@ class BatchToxicItem(BaseModel):
     label: str
     confidence: float
     toxic_labels: list[str] = []
+    model_version: Optional[str] = None
 
 
 class BatchToxicResponse(BaseModel):
@@ -253,7 +323,10 @@ async def detect_toxic_batch(request: BatchToxicRequest):
             detail="Toxic detection models not loaded. Run: cd Only_Model && python save_models.py"
         )
     
-    data = await service.analyze_batch(request.texts, request.threshold)
+    try:
+        data = await service.analyze_batch(request.texts, request.threshold)
+    except InferenceQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
     
     if "error" in data and data.get("error"):
         raise HTTPException(status_code=500, detail=data["error"])
@@ -265,7 +338,8 @@ async def detect_toxic_batch(request: BatchToxicRequest):
             is_violation=item.get("is_violation", False),
             label=item.get("label", "CLEAN"),
             confidence=item.get("confidence", 0.0),
-            toxic_labels=item.get("toxic_labels", [])
+            toxic_labels=item.get("toxic_labels", []),
+            model_version=item.get("model_version")
         ))
     
     return BatchToxicResponse(
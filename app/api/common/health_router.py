@@ -0,0 +1,37 @@
+"""
+Liveness and readiness probes.
+
+- /health/live: the process is up and the event loop responds.
+- /health/ready: the database client is initialized and every required model
+  has finished loading. Returns 503 while models are still loading.
+"""
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.core import database
+from app.services.common.model_registry import get_model_registry
+from app.services.common.lexicon_store import get_lexicon_store
+
+router = APIRouter(prefix="/health", tags=["❤️ Health"])
+
+
+@router.get("/live")
+async def liveness():
+    """Process đang chạy."""
+    return {"status": "alive"}
+
+
+@router.get("/ready")
+async def readiness():
+    """Sẵn sàng nhận traffic: DB đã kết nối và các model bắt buộc đã load xong."""
+    registry = get_model_registry()
+    database_ready = database.client is not None
+    is_ready = database_ready and registry.all_ready()
+
+    body = {
+        "status": "ready" if is_ready else "not_ready",
+        "database": database_ready,
+        "models": registry.status(),
+        "lexicons": get_lexicon_store().status(),
+    }
+    return JSONResponse(status_code=200 if is_ready else 503, content=body)
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
+from typing import Optional
 from app.schemas.user.anon_comment_schema import AnonCommentCreate, AnonCommentResponse
 from app.services.user.anon_comment_service import AnonCommentService
 from app.core.database import get_db
 from app.core.dependencies import get_current_user
+from app.utils.pagination import set_next_cursor
 
 router = APIRouter(prefix="/anon-comments", tags=["👤 User - Anonymous Comments (Bình luận ẩn danh)"])
 
@@ -18,9 +20,17 @@ async def create_comment(payload: AnonCommentCreate, db=Depends(get_db), user=De
     return comment
 
 @router.get("/{post_id}", response_model=list[AnonCommentResponse])
-async def list_comments(post_id: str, db=Depends(get_db)):
+async def list_comments(
+    post_id: str,
+    response: Response,
+    limit: int = Query(default=50, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor của trang trước"),
+    db=Depends(get_db)
+):
     service = AnonCommentService(db)
-    return await service.comment_repo.list_by_post(post_id)
+    comments = await service.comment_repo.list_by_post(post_id, limit=limit, cursor=cursor)
+    set_next_cursor(response, comments, limit)
+    return comments
 
 @router.delete("/{comment_id}")
 async def delete_comment(comment_id: str, db=Depends(get_db), user=Depends(get_current_user)):
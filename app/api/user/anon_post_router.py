@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, File, Form
 from typing import Optional, List
 from app.schemas.user.anon_post_schema import AnonPostCreate, AnonPostResponse
 from app.services.user.anon_post_service import AnonPostService
 from app.services.common.cloudinary_service import CloudinaryService
 from app.core.database import get_db
 from app.core.dependencies import get_current_user, get_current_user_optional
+from app.utils.pagination import set_next_cursor
 
 router = APIRouter(prefix="/anon-posts", tags=["👤 User - Posts (Bài viết cộng đồng)"])
 
@@ -54,7 +55,10 @@ async def create_post(
 
 @router.get("/", response_model=list[AnonPostResponse])
 async def list_posts(
+    response: Response,
     limit: int = Query(default=20, ge=1, le=100, description="Số lượng bài viết tối đa"),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor của trang trước (infinite scroll)"),
+    tag: Optional[str] = Query(default=None, max_length=100, description="Chỉ lấy bài có hashtag này (vd: sharing hoặc #sharing)"),
     db=Depends(get_db),
     user: Optional[dict] = Depends(get_current_user_optional)
 ):
@@ -63,15 +67,21 @@ async def list_posts(
     
     - Nếu đã đăng nhập: Hiển thị is_liked, is_owner
     - Nếu chưa đăng nhập: Vẫn xem được nhưng không có is_liked, is_owner
+    - Trang tiếp theo: gửi lại header X-Next-Cursor qua `cursor` (không có header = hết bài)
+    - `tag`: lọc theo hashtag
     """
     service = AnonPostService(db)
     current_user_id = str(user["_id"]) if user else None
-    return await service.list_posts(limit=limit, current_user_id=current_user_id)
+    posts = await service.list_posts(limit=limit, current_user_id=current_user_id, cursor=cursor, tag=tag)
+    set_next_cursor(response, posts, limit)
+    return posts
 
 
 @router.get("/my-posts", response_model=list[AnonPostResponse])
 async def get_my_posts(
+    response: Response,
     limit: int = Query(default=50, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None, description="X-Next-Cursor của trang trước"),
     db=Depends(get_db),
     user=Depends(get_current_user)
 ):
@@ -80,7 +90,38 @@ async def get_my_posts(
     Chỉ user đã đăng nhập mới có thể xem.
     """
     service = AnonPostService(db)
-    return await service.get_my_posts(user_id=str(user["_id"]), limit=limit)
+    posts = await service.get_my_posts(user_id=str(user["_id"]), limit=limit, cursor=cursor)
+    set_next_cursor(response, posts, limit)
+    return posts
+
+
+@router.get("/hashtags/popular")
+async def list_popular_hashtags(
+    limit: int = Query(default=20, ge=1, le=100, description="Số hashtag"),
+    db=Depends(get_db)
+):
+    """Hashtag được dùng nhiều nhất (cập nhật định kỳ, không sort cả collection mỗi lần gọi)."""
+    service = AnonPostService(db)
+    tags = await service.list_popular_hashtags(limit=limit)
+    return [
+        {"name": tag["name"], "usage_count": tag.get("usage_count", 0), "last_used_at": tag.get("last_used_at")}
+        for tag in tags
+    ]
+
+
+@router.get("/trending", response_model=list[AnonPostResponse])
+async def list_trending_posts(
+    limit: int = Query(default=20, ge=1, le=50, description="Số bài trending"),
+    db=Depends(get_db),
+    user: Optional[dict] = Depends(get_current_user_optional)
+):
+    """
+    Bài viết đang nổi bật: xếp theo trending_score (lượt thích + bình luận, giảm dần theo thời gian).
+    Điểm được cập nhật mỗi lần like / bình luận, top-K đọc thẳng từ index.
+    """
+    service = AnonPostService(db)
+    current_user_id = str(user["_id"]) if user else None
+    return await service.list_trending(limit=limit, current_user_id=current_user_id)
 
 
 @router.get("/{post_id}", response_model=AnonPostResponse)
@@ -1,17 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Request
+from fastapi.responses import StreamingResponse
 from app.schemas.user.journal_schema import JournalCreate, JournalResponse
 from app.repositories.journal_repository import JournalRepository
 from app.services.user.journal_service import JournalService
 from app.core.database import get_db
 from app.core.dependencies import get_current_user
 from app.core.constants import ICON_SENTIMENT_MAP
+from app.services.common.speech_to_text import stream_transcription
 from typing import List, Optional
+import json
 import uuid
 import os
 from time import time
 
 router = APIRouter(prefix="/journal", tags=["User - Journal (Nhật ký)"])
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # audio uploads are copied to disk 1 MB at a time
+
+async def save_upload(upload: UploadFile, extension: str) -> str:
+    """Stream an upload into temp/ in chunks (never fully in memory); returns the file path."""
+    temp_dir = os.path.join(os.getcwd(), "temp")
+    os.makedirs(temp_dir, exist_ok=True)
+    file_path = os.path.join(temp_dir, f"{uuid.uuid4()}{extension}")
+    with open(file_path, "wb") as f:
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            f.write(chunk)
+    return file_path
+
 def serialize_journal(journal) -> JournalResponse:
     """Serialize Journal model to JournalResponse schema."""
     return JournalResponse(
@@ -24,10 +39,12 @@ def serialize_journal(journal) -> JournalResponse:
         voice_text=journal.voice_text,
         sentiment_label=journal.sentiment_label or "Neutral",
         sentiment_score=journal.sentiment_score or 0.0,
+        sentiment_segments=journal.sentiment_segments,
         tags=journal.tags or [],
         is_toxic=journal.is_toxic,
         toxic_labels=journal.toxic_labels,
-        toxic_confidence=journal.toxic_confidence
+        toxic_confidence=journal.toxic_confidence,
+        processing_status=journal.processing_status
     )
 
 @router.post("/", response_model=JournalResponse)
@@ -39,6 +56,10 @@ async def create_journal(
 ):
     """Create a new journal entry compatible với FE hiện tại.
 
+    Trả về ngay với processing_status="pending"; phiên âm, toxic và sentiment
+    chạy nền. FE poll GET /journal/{id} (hoặc nhận thông báo với ghi âm)
+    tới khi processing_status="done" (hoặc "failed" nếu xử lý nền bỏ cuộc).
+
     FE gửi:
       - text_content: string (bắt buộc)
       - tags: JSON string của array [{tag_id, tag_name}]
@@ -100,29 +121,23 @@ async def create_journal(
             file_extension = os.path.splitext(audio.filename)[1].lower()
             if file_extension not in (".mp3", ".m4a"):
                 raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Only MP3 or M4A files are supported")
-            file_name = f"{uuid.uuid4()}{file_extension}"
-            temp_dir = os.path.join(os.getcwd(), "temp")
-            os.makedirs(temp_dir, exist_ok=True)
-            file_path = os.path.join(temp_dir, file_name)
-            with open(file_path, "wb") as f:
-                f.write(await audio.read())
+            file_path = await save_upload(audio, file_extension)
             data.voice_note_path = file_path
 
-        # Create journal
+        # Create journal (the background worker transcribes and deletes the file)
         service = JournalService(JournalRepository(db))
         journal = await service.create_journal(str(current_user["_id"]), data)
         return serialize_journal(journal)
-    except HTTPException:
-        # Re-raise có kiểm soát
-        raise
     except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to create journal: {str(e)}")
-    finally:
-        if audio and file_path and os.path.exists(file_path):
+        if file_path and os.path.exists(file_path):
             try:
                 os.remove(file_path)
             except Exception:
                 pass
+        if isinstance(e, HTTPException):
+            # Re-raise có kiểm soát
+            raise
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to create journal: {str(e)}")
 
 @router.get("/", response_model=List[JournalResponse])
 async def get_journals(
@@ -137,6 +152,16 @@ async def get_journals(
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to fetch journals: {str(e)}")
 
+@router.get("/{journal_id}", response_model=JournalResponse)
+async def get_journal(
+    journal_id: str,
+    db=Depends(get_db),
+    current_user: dict = Depends(get_current_user),
+):
+    """Get one journal entry - FE polls this until processing_status is "done" (or "failed")."""
+    journal = await JournalRepository(db).get_by_id(journal_id, str(current_user["_id"]))
+    return serialize_journal(journal)
+
 @router.post("/test-stt", response_model=dict)
 async def test_stt(
     voice_note: UploadFile = File(..., description="Upload an English MP3 file for transcription"),
@@ -149,14 +174,9 @@ async def test_stt(
         if file_extension != ".mp3":
             raise HTTPException(status_code=400, detail="Only MP3 files are supported")
 
-        # Save to temp file for AssemblyAI
-        file_name = f"{uuid.uuid4()}{file_extension}"
-        temp_dir = os.path.join(os.getcwd(), "temp")
-        os.makedirs(temp_dir, exist_ok=True)
-        file_path = os.path.join(temp_dir, file_name)
+        # Save to temp file
         start_time = time()
-        with open(file_path, "wb") as f:
-            f.write(await voice_note.read())
+        file_path = await save_upload(voice_note, file_extension)
 
     # Transcribe using STT service
         service = JournalService(None)
@@ -174,4 +194,33 @@ async def test_stt(
     except Exception as e:
         if file_path and os.path.exists(file_path):
             os.remove(file_path)
-        raise HTTPException(status_code=500, detail=f"Failed to process STT: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Failed to process STT: {str(e)}")
+
+
+@router.post("/test-stt/stream")
+async def test_stt_stream(
+    voice_note: UploadFile = File(..., description="Upload an MP3 / M4A file for transcription"),
+):
+    """
+    Phiên âm dạng stream (NDJSON): mỗi dòng {"text": ...} là một đoạn vừa decode xong,
+    dòng cuối {"done": true, "voice_text": ...}. Với STT_BACKEND=faster_whisper các đoạn
+    đến dần trong lúc decode; AssemblyAI trả về một đoạn duy nhất.
+    """
+    file_extension = os.path.splitext(voice_note.filename)[1].lower()
+    if file_extension not in (".mp3", ".m4a"):
+        raise HTTPException(status_code=400, detail="Only MP3 or M4A files are supported")
+    audio = await voice_note.read()
+    if not audio:
+        raise HTTPException(status_code=400, detail="Audio content is empty")
+
+    async def lines():
+        parts = []
+        try:
+            async for text in stream_transcription(audio):
+                parts.append(text)
+                yield json.dumps({"text": text}, ensure_ascii=False) + "\n"
+            yield json.dumps({"done": True, "voice_text": " ".join(parts)}, ensure_ascii=False) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": f"Transcription error: {str(e)}"}, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
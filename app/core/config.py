@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -6,13 +7,55 @@ class Settings(BaseSettings):
     JWT_SECRET_KEY: str
     ALLOWED_ORIGINS: str
     SENTIMENT_MODEL: str = "roberta"  # default
+    SENTIMENT_MODEL_PATH: Optional[str] = None  # local dir / hub id overriding SENTIMENT_MODEL (offline, benchmarks)
+    TOXIC_MODELS_PATH: Optional[str] = None  # default: Only_Model/models
+    
+    # ===== AI INFERENCE =====
+    INFERENCE_THREAD_WORKERS: int = 2  # sklearn toxic scoring
+    INFERENCE_PROCESS_WORKERS: int = 1  # transformer sentiment (0 = run in thread pool)
+    INFERENCE_MAX_QUEUE: int = 64  # pending calls before rejecting with 503
+    SENTIMENT_BATCH_WINDOW_MS: float = 5.0  # how long to collect concurrent sentiment calls
+    SENTIMENT_MAX_BATCH_SIZE: int = 16  # flush early once this many are waiting
+    SENTIMENT_CHUNK_CHARS: int = 600  # long texts are scored in sentence windows of up to this many chars
+    TOXIC_AUTO_TRAIN: bool = True  # train from Only_Model/train.csv in the background if models are missing
+    TOXIC_MODEL_WATCH_SECONDS: float = 30  # poll Only_Model/models/CURRENT and hot-swap new versions (0 = off)
+    INFERENCE_CACHE_SIZE: int = 4096  # cached toxic/sentiment results per process (0 = disabled)
+    INFERENCE_CACHE_TTL_SECONDS: int = 3600
+    LEXICON_POLL_SECONDS: int = 10  # version-stamp polling when change streams are unavailable
+    LEXICON_FULL_RELOAD_SECONDS: int = 300  # polling mode: full reload at least this often
+    MODERATION_STAGES: str = "lexicon,patterns,tfidf,phobert"  # cascade order, cheapest first
+    MODERATION_BLOCK_CONFIDENCE: float = 0.8  # TF-IDF confidence that blocks without review
+    MODERATION_PHOBERT_MODEL: Optional[str] = None  # export_quantized(fine_tuned=True) dir; unset = stage skipped
+    MODERATION_PHOBERT_CLEAR_SCORE: float = 0.7  # hybrid safety score that approves a grey-zone post
+    ASYNC_MODERATION: bool = False  # save posts/comments as Pending and moderate them in a background worker
+    MODERATION_WORKER_BATCH: int = 32  # jobs claimed per worker round
+    MODERATION_WORKER_POLL_SECONDS: float = 2.0  # idle wait between queue polls
+    MODERATION_JOB_LEASE_SECONDS: int = 120  # a claimed job is retried after this if its worker died
+    MODERATION_JOB_MAX_ATTEMPTS: int = 5
+    REMODERATION_BATCH_SIZE: int = 256  # documents re-scored per vectorized batch / bulk_write
+    REMODERATION_STALE_SECONDS: int = 120  # a running job without heartbeat for this long can be taken over
+    FEED_TIMELINE_SIZE: int = 500  # newest approved posts kept in memory for the feed (0 = disabled)
+    FEED_TIMELINE_POLL_SECONDS: float = 1.0  # how often a process checks for feed writes made by other processes
+    TRENDING_DECAY_SECONDS: int = 45000  # post age that weighs as much as 10x engagement (12.5h)
+    TRENDING_COMMENT_WEIGHT: float = 2.0  # a comment counts as this many likes
+    HASHTAG_POPULAR_SIZE: int = 50  # popular hashtags kept in memory
+    HASHTAG_POPULAR_REFRESH_SECONDS: float = 60.0
     EMAIL_HOST: str
     EMAIL_PORT: int
     EMAIL_USER: str
     EMAIL_PASSWORD: str
     HOST: str = "0.0.0.0"
     PORT: int = 8000
-    ASSEMBLYAI_API_KEY: str
+    
+    # ===== SPEECH-TO-TEXT (journal voice notes) =====
+    STT_BACKEND: str = "assemblyai"  # assemblyai (cloud) | faster_whisper (local CPU, offline)
+    ASSEMBLYAI_API_KEY: Optional[str] = None  # required for STT_BACKEND=assemblyai
+    STT_MODEL: str = "small"  # faster-whisper size (tiny/base/small/...) or a local CTranslate2 model dir
+    STT_COMPUTE_TYPE: str = "int8"  # CTranslate2 quantization on CPU
+    STT_LANGUAGE: Optional[str] = None  # e.g. "vi" / "en"; unset = detect per file
+    STT_BEAM_SIZE: int = 1  # 1 = greedy decoding, fastest on CPU
+    STT_WORKERS: int = 1  # transcription threads, separate from INFERENCE_THREAD_WORKERS
+    STT_MAX_QUEUE: int = 8  # pending transcriptions before rejecting with 503
     
     # ===== CLOUDINARY =====
     CLOUDINARY_CLOUD_NAME: str
@@ -15,6 +15,25 @@ async def init_db():
     global client
     client = AsyncIOMotorClient(settings.MONGO_URI, tls=True, tlsCAFile=certifi.where())
 
+async def ensure_indexes(db):
+    """
+    Create the repositories' indexes. Motor's create_index is a coroutine, so
+    it has to be awaited here rather than fired from a repository constructor.
+    A failing index (e.g. duplicates under a unique key) is reported, not fatal.
+    """
+    from app.repositories.anon_post_repository import AnonPostRepository
+    from app.repositories.anon_comment_repository import AnonCommentRepository
+    from app.repositories.anon_like_repository import AnonLikeRepository
+    from app.repositories.hashtag_repository import HashtagRepository
+    from app.repositories.journal_repository import JournalRepository
+
+    for repo in (AnonPostRepository(db), AnonCommentRepository(db), AnonLikeRepository(db), HashtagRepository(db),
+                 JournalRepository(db)):
+        try:
+            await repo.ensure_indexes()
+        except Exception as e:
+            print(f"⚠️ Index creation failed for {repo.collection.name}: {e}")
+
 async def close_db():
     global client
     if client:
@@ -2,9 +2,24 @@ import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.core.database import init_db, close_db
+from app.core import database
+from app.core.database import init_db, close_db, ensure_indexes
+from app.services.common.inference_executor import shutdown_inference_executor
+from app.services.common.model_registry import get_model_registry
+from app.services.common.lexicon_store import get_lexicon_store
+from app.services.common.toxic_detection_service import get_toxic_detection_service
+from app.services.common.sentiment_service import warm_up_sentiment
+from app.services.common.speech_to_text import get_stt_engine, STT_MODEL
+from app.services.common.moderation_cascade import get_moderation_cascade, PHOBERT_MODEL
+from app.services.common.moderation_queue import get_journal_worker, get_moderation_worker
+from app.services.user.anon_post_service import AnonPostService
+from app.services.user.anon_comment_service import AnonCommentService
+from app.services.user.journal_service import JournalService, JOURNAL_JOB
+from app.repositories.journal_repository import JournalRepository
+from app.services.admin.remoderation_service import RemoderationService, stop_remoderation_watcher
 
 # Common routers
+from app.api.common.health_router import router as health_router
 from app.api.user_admin_auth_router import router as user_admin_auth_router
 from app.api.expert.expert_auth_router import router as expert_auth_router
 
@@ -46,11 +61,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],  # keyset pagination of list endpoints
 )
 
 API_PREFIX = "/api/v1"
 
 # ==== ROUTER REGISTRATION ====
+# Health probes (no prefix: /health/live, /health/ready)
+app.include_router(health_router)
+
 # Common routes
 app.include_router(user_admin_auth_router, prefix=API_PREFIX)
 app.include_router(expert_auth_router, prefix=API_PREFIX)
@@ -87,10 +106,58 @@ app.include_router(expert_dashboard_router, prefix=API_PREFIX)
 @app.on_event("startup")
 async def startup_event():
     await init_db()
+    
+    # Moderation lexicons: loaded once, then refreshed from change stream / version polling
+    db = database.client[settings.DATABASE_NAME]
+    await ensure_indexes(db)
+    await get_lexicon_store().start(db)
+    
+    # Load AI models in the background; /health/ready turns green once they are up
+    registry = get_model_registry()
+    # Without a trained model file posts are approved without AI scan (degraded, still ready)
+    registry.register("toxic", get_toxic_detection_service().load,
+                      required=get_toxic_detection_service().has_model_files())
+    registry.register("sentiment", warm_up_sentiment)
+    if settings.MODERATION_PHOBERT_MODEL:
+        # Optional last moderation stage; posts are moderated without it until it is ready
+        registry.register(PHOBERT_MODEL, get_moderation_cascade().load_phobert, required=False)
+    if get_stt_engine().local:
+        # Local speech-to-text model; voice notes load it on first use if it is not ready yet
+        registry.register(STT_MODEL, get_stt_engine().load, required=False)
+    await registry.start()
+    # New model versions (models/CURRENT) are swapped in without a restart
+    await get_toxic_detection_service().start_watching()
+    
+    # Background job workers: posts/comments with ASYNC_MODERATION (or jobs left
+    # over after it was turned off), and journal enrichment (STT + toxic + sentiment)
+    # on its own worker so transcriptions never delay moderation
+    worker = get_moderation_worker()
+    worker.register("post", lambda db, jobs: AnonPostService(db).moderate_queued(jobs))
+    worker.register("comment", lambda db, jobs: AnonCommentService(db).moderate_queued(jobs))
+    await worker.start(db, wait_for=lambda: registry.is_loading("toxic"))
+    journal_worker = get_journal_worker()
+    journal_worker.register(
+        JOURNAL_JOB,
+        lambda db, jobs: JournalService(JournalRepository(db)).enrich_queued(jobs),
+        on_failed=lambda db, jobs: JournalService(JournalRepository(db)).fail_queued(jobs)
+    )
+    await journal_worker.start(db, wait_for=lambda: registry.is_loading("toxic"))
+    await JournalService(JournalRepository(db)).requeue_pending()
+    
+    # Re-moderation jobs interrupted by a restart continue from their checkpoint
+    # (checked again periodically: the old runner's heartbeat goes stale later)
+    await RemoderationService(db).start_watching()
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await get_model_registry().stop()
+    await get_toxic_detection_service().stop_watching()
+    await get_moderation_worker().stop()
+    await get_journal_worker().stop()
+    await stop_remoderation_watcher()
+    await get_lexicon_store().stop()
     await close_db()
+    shutdown_inference_executor()
 
 # ==== MAIN ENTRYPOINT ====
 if __name__ == "__main__":
@@ -20,9 +20,11 @@ class AnonPost(BaseModel):
     toxic_labels: list[str] = []
     toxic_confidence: float = 0.0
     toxic_predictions: dict = {}
+    model_version: str | None = None  # toxic model version that scored the post
 
     like_count: int = 0
     comment_count: int = 0
+    trending_score: float = 0.0  # app/services/common/trending.py, kept in sync with the counters
 
     class Config:
         validate_by_name = True
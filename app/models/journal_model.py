@@ -14,10 +14,13 @@ class Journal(BaseModel):
     voice_text: Optional[str] = None
     sentiment_label: Optional[str] = None
     sentiment_score: Optional[float] = None
+    sentiment_segments: List[dict] = []  # per sentence window: source, start, end, label, score
     tags: List[str] = []
     is_toxic: bool = False
     toxic_labels: List[str] = []
     toxic_confidence: float = 0.0
+    toxic_model_version: Optional[str] = None
+    processing_status: str = "done"  # pending until STT / toxic / sentiment enrichment has run; failed if it gave up
 
     class Config:
         populate_by_name = True
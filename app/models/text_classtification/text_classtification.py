@@ -6,8 +6,9 @@ This module is written for high maintainability and contains:
 - preprocessing utilities for Vietnamese text (cleaning + tokenization hooks)
 - lexicon loader (CSV file and optional MongoDB loader)
 - rule-based scorer that uses a negative lexicon with weights
-- skeleton for PhoBERT + Attention model integration (lazy import / device-safe)
-- hybrid checker that combines rule-based and DL model scores
+- skeleton for PhoBERT + Attention model integration (lazy import / device-safe),
+  with batched inference and an int8 ONNX / TorchScript export for CPU serving
+- hybrid checker that combines rule-based and DL model scores (single + batch)
 
 Notes about data (high maintenance):
 - Shipping lexicon: keep a CSV at `safety_checker/data/negative_lexicon.csv` or
@@ -37,12 +38,17 @@ Example usage:
 The functions return simple, JSON-serializable dicts to plug directly into an API.
 """
 
-from typing import Dict, List, Tuple, Optional
+from typing import Dict, List, Mapping, Tuple, Optional, Union
 import re
 import csv
+import inspect
+import json
 import logging
+from datetime import datetime
 from pathlib import Path
 
+from app.services.common.phrase_index import PhraseIndex
+
 # Lazy imports for optional dependencies (transformers/torch)
 _HAS_TRANSFORMERS = False
 try:
@@ -176,6 +182,10 @@ def load_lexicon_from_mongo(db, collection_name: str = "negative_lexicon") -> Di
 async def load_lexicon_from_mongo_async(db, collection_name: str = "negative_lexicon") -> Dict[str, float]:
     """Async loader for Motor (recommended if using Motor client).
 
+    Inside the API, prefer the process-wide snapshot kept fresh by the lexicon
+    store (`get_lexicon_store().snapshot.negative_lexicon`); this loader reads
+    the whole collection every time.
+
     Example usage in FastAPI startup event:
         from app.core.database import client
         db = client[settings.DATABASE_NAME]
@@ -203,29 +213,51 @@ async def load_lexicon_from_mongo_async(db, collection_name: str = "negative_lex
 # Rule-based scoring
 # -------------------------------
 
-def rule_based_scoring(tokenized_text: str, lexicon: Dict[str, float], max_penalty: float = 1.0) -> Dict:
+_EDGE_PUNCT = ".,!?"
+
+# Index of the last explicitly passed lexicon (lexicons are treated as read-only)
+_last_index: Optional[Tuple[Mapping[str, float], int, PhraseIndex]] = None
+
+
+def _phrase_index(lexicon: Optional[Union[Mapping[str, float], PhraseIndex]]) -> PhraseIndex:
+    """Phrase index for a lexicon; defaults to the lexicon store snapshot (in memory, no DB round-trip)"""
+    global _last_index
+    if isinstance(lexicon, PhraseIndex):
+        return lexicon
+    if lexicon is None:
+        from app.services.common.lexicon_store import get_lexicon_store
+        return get_lexicon_store().snapshot.negative_phrases
+    if _last_index is None or _last_index[0] is not lexicon or _last_index[1] != len(lexicon):
+        _last_index = (lexicon, len(lexicon), PhraseIndex(lexicon))
+    return _last_index[2]
+
+
+def rule_based_scoring(tokenized_text: str, lexicon: Optional[Union[Mapping[str, float], PhraseIndex]] = None, max_penalty: float = 1.0) -> Dict:
     """Score text using lexicon weights.
 
     Inputs:
     - tokenized_text: string where tokens are separated by whitespace (e.g., from
       underthesea word_tokenize output).
-    - lexicon: dict token -> weight. Tokens should match tokenization.
+    - lexicon: dict entry -> weight, or a prebuilt PhraseIndex. Entries may be
+      single tokens or multi-word phrases ("cút khỏi đây"); tokens should match
+      tokenization. Defaults to the `negative_lexicon` snapshot of the lexicon store.
 
     Returns a dict with keys: is_violation, safety_score, violation_words, penalty
     """
     if not tokenized_text:
         return {"is_violation": False, "safety_score": 1.0, "violation_words": [], "penalty": 0.0}
 
-    tokens = tokenized_text.split()
+    # preprocess_text keeps basic punctuation; "ngu," must still match "ngu"
+    tokens = [tok for tok in (t.strip(_EDGE_PUNCT) for t in tokenized_text.split()) if tok]
     violation_words: List[str] = []
     total_penalty = 0.0
 
-    # Matching strategy: exact token match; projects may implement fuzzy matching
+    # Matching strategy: one pass over the tokens, longest lexicon phrase at each
+    # position (so "đồ ngu" wins over "ngu"); projects may add fuzzy matching
     # or normalized forms (stem/lemma) if needed.
-    for token in tokens:
-        if token in lexicon:
-            violation_words.append(token)
-            total_penalty += float(lexicon[token])
+    for match in _phrase_index(lexicon).scan(tokens):
+        violation_words.append(match.phrase)
+        total_penalty += match.weight
 
     # Cap penalty
     total_penalty = min(total_penalty, float(max_penalty))
@@ -244,6 +276,44 @@ def rule_based_scoring(tokenized_text: str, lexicon: Dict[str, float], max_penal
 # Deep Learning model skeleton (PhoBERT + Attention)
 # -------------------------------
 
+# Serving backends for PhoBERTWithAttentionWrapper
+BACKEND_EAGER = "eager"              # PyTorch model built by load()
+BACKEND_TORCHSCRIPT = "torchscript"  # int8 dynamic-quantized TorchScript (export_quantized)
+BACKEND_ONNX = "onnx"                # int8 dynamic-quantized ONNX, run by onnxruntime
+EXPORT_MANIFEST = "export.json"
+
+
+def _model_with_head(base):
+    """Attach a small attention pooling + regression head to a PhoBERT encoder.
+
+    Kept simple so users can replace it with a persisted fine-tuned model later.
+    """
+
+    class ModelWithHead(torch.nn.Module):
+        def __init__(self, base_model):
+            super().__init__()
+            self.base = base_model
+            hidden = base_model.config.hidden_size
+            self.attn = torch.nn.Linear(hidden, 1)
+            self.dropout = torch.nn.Dropout(0.2)
+            self.regressor = torch.nn.Linear(hidden, 1)
+
+        def forward(self, input_ids, attention_mask):
+            outputs = self.base(input_ids=input_ids, attention_mask=attention_mask)
+            last = outputs[0]  # last_hidden_state (batch, seq, hidden); tuple-safe for tracing
+            attn_weights = torch.tanh(self.attn(last))  # (batch, seq, 1)
+            # Padding gets no attention, so a text scores the same however much its batch is padded
+            attn_weights = attn_weights.masked_fill(attention_mask.unsqueeze(-1) == 0, -1e4)
+            attn_weights = torch.softmax(attn_weights, dim=1)
+            context = torch.sum(attn_weights * last, dim=1)  # (batch, hidden)
+            x = self.dropout(context)
+            out = self.regressor(x)
+            out = torch.sigmoid(out).squeeze(-1)
+            return out, attn_weights
+
+    return ModelWithHead(base)
+
+
 class PhoBERTWithAttentionWrapper:
     """Lightweight wrapper to lazily load a PhoBERT model with a simple
     attention pooling + regression head.
@@ -251,7 +321,12 @@ class PhoBERTWithAttentionWrapper:
     Usage:
         model_wrapper = PhoBERTWithAttentionWrapper('vinai/phobert-base')
         model_wrapper.load(device='cpu')
-        score, tokens, attn = model_wrapper.predict(text)
+        result = model_wrapper.predict(text)
+        results = model_wrapper.predict_batch(texts)   # dynamic padding
+
+    CPU serving with an int8 model:
+        model_wrapper.export_quantized('models/phobert-int8', backend='onnx')
+        model_wrapper = PhoBERTWithAttentionWrapper.load_exported('models/phobert-int8')
 
     Notes on maintenance:
     - Keep weights and tokenizer paths configurable via settings.
@@ -267,6 +342,8 @@ class PhoBERTWithAttentionWrapper:
         self.device = "cpu"
         self.tokenizer = None
         self.model = None
+        self.backend = BACKEND_EAGER
+        self._session = None  # onnxruntime.InferenceSession for the ONNX backend
 
     def load(self, device: Optional[str] = None):
         """Load tokenizer and model into memory. Call once at startup.
@@ -281,80 +358,211 @@ class PhoBERTWithAttentionWrapper:
         # We load AutoModel and add a tiny attention/regression head at runtime
         base = AutoModel.from_pretrained(self.model_name)
 
-        # Attach a small regression head + attention; keep it simple so users can
-        # replace with a persisted fine-tuned model later.
-        class ModelWithHead(torch.nn.Module):
-            def __init__(self, base_model):
-                super().__init__()
-                self.base = base_model
-                hidden = base_model.config.hidden_size
-                self.attn = torch.nn.Linear(hidden, 1)
-                self.dropout = torch.nn.Dropout(0.2)
-                self.regressor = torch.nn.Linear(hidden, 1)
-
-            def forward(self, input_ids, attention_mask):
-                outputs = self.base(input_ids=input_ids, attention_mask=attention_mask)
-                last = outputs.last_hidden_state  # (batch, seq, hidden)
-                attn_weights = torch.tanh(self.attn(last))  # (batch, seq, 1)
-                attn_weights = torch.softmax(attn_weights, dim=1)
-                context = torch.sum(attn_weights * last, dim=1)  # (batch, hidden)
-                x = self.dropout(context)
-                out = self.regressor(x)
-                out = torch.sigmoid(out).squeeze(-1)
-                return out, attn_weights
-
-        self.model = ModelWithHead(base).to(self.device)
+        self.model = _model_with_head(base).to(self.device)
         self.model.eval()
+        self.backend = BACKEND_EAGER
+
+    def _ensure_loaded(self):
+        if self.tokenizer is None or (self.model is None and self._session is None):
+            raise RuntimeError("Model not loaded. Call load() or load_exported() first.")
+
+    def _forward(self, input_ids, attention_mask):
+        """Run one padded batch (numpy int64 arrays); returns (scores, attention) as numpy"""
+        if self.backend == BACKEND_ONNX:
+            scores, attn = self._session.run(
+                None, {"input_ids": input_ids, "attention_mask": attention_mask}
+            )
+            return scores, attn.squeeze(-1)
+
+        ids = torch.from_numpy(input_ids).to(self.device)
+        mask = torch.from_numpy(attention_mask).to(self.device)
+        with torch.inference_mode():
+            scores, attn = self.model(ids, mask)
+        return scores.cpu().numpy(), attn.squeeze(-1).cpu().numpy()
+
+    def _to_result(self, ids, mask, score, attn, top_k_tokens: int) -> Dict:
+        import numpy as _np
+
+        length = int(mask.sum())
+        attn = attn[:length]
+        tokens = self.tokenizer.convert_ids_to_tokens(ids[:length].tolist())
+
+        # select top-k tokens by attention weight (ignore special tokens)
+        special = {self.tokenizer.pad_token, self.tokenizer.cls_token, self.tokenizer.sep_token}
+        idxs = _np.argsort(attn)[-top_k_tokens:][::-1]
+        violation_tokens = [tokens[i] for i in idxs if tokens[i] not in special]
+
+        return {"safety_score": round(float(score), 4), "violation_tokens": violation_tokens, "attention": attn.tolist()}
 
     def predict(self, text: str, top_k_tokens: int = 3) -> Dict:
         """Return safety score and top tokens by attention.
 
         Returns dict: { 'safety_score': float, 'violation_tokens': List[str], 'attention': List[float] }
+        ('attention' has one weight per real token, padding excluded)
         """
-        if self.model is None or self.tokenizer is None:
-            raise RuntimeError("Model not loaded. Call load() first.")
-
-        # Note: For Vietnamese, the text should be segmented externally (underthesea)
-        encoding = self.tokenizer.encode_plus(
-            text,
-            truncation=True,
-            padding='max_length',
-            max_length=self.max_len,
-            return_tensors='pt',
-            return_attention_mask=True,
-        )
-        input_ids = encoding['input_ids'].to(self.device)
-        attention_mask = encoding['attention_mask'].to(self.device)
-
-        with torch.no_grad():
-            score_tensor, attn_weights = self.model(input_ids, attention_mask)
-
-        safety_score = float(score_tensor.cpu().numpy().item())
-
-        # Convert attention and tokens to python objects
-        attn = attn_weights.squeeze(-1).squeeze(0).cpu().numpy()  # (seq_len,)
-        ids = input_ids.squeeze(0).cpu().numpy()
-        tokens = self.tokenizer.convert_ids_to_tokens(ids)
+        return self.predict_batch([text], top_k_tokens=top_k_tokens)[0]
 
-        # select top-k tokens by attention weight (ignore special tokens)
-        import numpy as _np
+    def predict_batch(self, texts: List[str], top_k_tokens: int = 3, batch_size: int = 32) -> List[Dict]:
+        """Score many texts; one forward pass per `batch_size` texts.
 
-        idxs = _np.argsort(attn)[-top_k_tokens:][::-1]
-        violation_tokens = []
-        for i in idxs:
-            tok = tokens[i]
-            if tok in [self.tokenizer.pad_token, self.tokenizer.cls_token, self.tokenizer.sep_token]:
-                continue
-            violation_tokens.append(tok)
+        Texts are sorted by length and each chunk is padded only to its longest
+        member (not to max_len), so short posts cost short sequences.
+        Results come back in input order, same shape as `predict`.
+        """
+        self._ensure_loaded()
+        results: List[Optional[Dict]] = [None] * len(texts)
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+
+        for start in range(0, len(order), batch_size):
+            chunk = order[start:start + batch_size]
+            # Note: For Vietnamese, the text should be segmented externally (underthesea)
+            encoding = self.tokenizer(
+                [texts[i] for i in chunk],
+                truncation=True,
+                padding="longest",
+                max_length=self.max_len,
+                return_tensors="np",
+                return_attention_mask=True,
+            )
+            input_ids = encoding["input_ids"].astype("int64")
+            attention_mask = encoding["attention_mask"].astype("int64")
+            scores, attn = self._forward(input_ids, attention_mask)
+
+            for row, i in enumerate(chunk):
+                results[i] = self._to_result(input_ids[row], attention_mask[row], scores[row], attn[row], top_k_tokens)
+
+        return results
+
+    # ----- int8 export for CPU serving -----
+
+    def export_quantized(self, out_dir: str, backend: str = BACKEND_ONNX, opset: int = 17, fine_tuned: bool = False) -> Path:
+        """Export an int8 (dynamic quantization of the Linear layers) copy of the model.
+
+        - backend='onnx': ONNX graph quantized with onnxruntime (needs `onnx` and `onnxruntime`)
+        - backend='torchscript': torch.quantization.quantize_dynamic + torch.jit.trace
+        - fine_tuned: recorded in export.json; set it only when the attention /
+          regression head was trained. The moderation cascade refuses exports
+          without it (a base checkpoint scores with a random head).
+
+        Writes the model, the tokenizer and `export.json` to out_dir; load it back
+        with `PhoBERTWithAttentionWrapper.load_exported(out_dir)`.
+        """
+        if self.model is None or self.backend != BACKEND_EAGER:
+            raise RuntimeError("Export needs the eager PyTorch model. Call load() first.")
+
+        out = Path(out_dir)
+        out.mkdir(parents=True, exist_ok=True)
+
+        model = self.model.to("cpu").eval()
+        sample = self.tokenizer(["xin chào", "mày là đồ ngu cút khỏi đây"], padding="longest", return_tensors="pt")
+        example = (sample["input_ids"], sample["attention_mask"])
 
-        return {"safety_score": round(safety_score, 4), "violation_tokens": violation_tokens, "attention": attn.tolist()}
+        try:
+            if backend == BACKEND_TORCHSCRIPT:
+                filename = "model.pt"
+                quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+                with torch.no_grad():
+                    traced = torch.jit.trace(quantized, example, strict=False)
+                traced.save(str(out / filename))
+            elif backend == BACKEND_ONNX:
+                try:
+                    from onnxruntime.quantization import quantize_dynamic, QuantType
+                except ImportError as e:
+                    raise RuntimeError("ONNX export needs onnx and onnxruntime: pip install onnx onnxruntime") from e
+                filename = "model.onnx"
+                fp32_path = out / "model.fp32.onnx"
+                dynamic = {0: "batch", 1: "sequence"}
+                # The TorchScript-based exporter handles dynamic_axes; newer torch defaults to dynamo
+                extra = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+                with torch.no_grad():
+                    torch.onnx.export(
+                        model, example, str(fp32_path),
+                        input_names=["input_ids", "attention_mask"],
+                        output_names=["safety_score", "attention"],
+                        dynamic_axes={
+                            "input_ids": dynamic,
+                            "attention_mask": dynamic,
+                            "safety_score": {0: "batch"},
+                            "attention": dynamic,
+                        },
+                        opset_version=opset,
+                        **extra,
+                    )
+                quantize_dynamic(str(fp32_path), str(out / filename), weight_type=QuantType.QInt8)
+                fp32_path.unlink()
+            else:
+                raise ValueError(f"Unknown backend: {backend} (expected '{BACKEND_ONNX}' or '{BACKEND_TORCHSCRIPT}')")
+        finally:
+            self.model.to(self.device)
+
+        self.tokenizer.save_pretrained(str(out))
+        manifest = {
+            "backend": backend,
+            "file": filename,
+            "model_name": self.model_name,
+            "max_len": self.max_len,
+            "quantization": "dynamic-int8",
+            "fine_tuned": bool(fine_tuned),
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        with (out / EXPORT_MANIFEST).open("w", encoding="utf-8") as fh:
+            json.dump(manifest, fh, indent=2)
+        return out
+
+    @classmethod
+    def load_exported(cls, path: str, num_threads: Optional[int] = None) -> "PhoBERTWithAttentionWrapper":
+        """Load a model written by `export_quantized` (CPU only)."""
+        path = Path(path)
+        with (path / EXPORT_MANIFEST).open(encoding="utf-8") as fh:
+            manifest = json.load(fh)
+
+        wrapper = cls(manifest["model_name"], max_len=manifest["max_len"])
+        wrapper.tokenizer = AutoTokenizer.from_pretrained(str(path))
+        wrapper.device = "cpu"
+        wrapper.backend = manifest["backend"]
+        model_file = str(path / manifest["file"])
+
+        if wrapper.backend == BACKEND_ONNX:
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            if num_threads:
+                options.intra_op_num_threads = num_threads
+            wrapper._session = ort.InferenceSession(model_file, options, providers=["CPUExecutionProvider"])
+        elif wrapper.backend == BACKEND_TORCHSCRIPT:
+            if num_threads:
+                torch.set_num_threads(num_threads)
+            wrapper.model = torch.jit.load(model_file, map_location="cpu")
+            wrapper.model.eval()
+        else:
+            raise ValueError(f"Unknown exported backend: {wrapper.backend}")
+        return wrapper
 
 
 # -------------------------------
 # Hybrid checker combining rule-based + DL
 # -------------------------------
 
-def hybrid_safety_check(tokenized_text: str, lexicon: Dict[str, float], dl_wrapper: Optional[PhoBERTWithAttentionWrapper] = None, threshold: float = 0.5) -> Dict:
+# Rule-based penalty at which the DL model is skipped
+RULE_FAST_PATH_PENALTY = 0.6
+
+
+def _combine_scores(rule: Dict, dl_result: Dict, threshold: float) -> Dict:
+    final_score = round(0.3 * rule["safety_score"] + 0.7 * dl_result["safety_score"], 4)
+    is_violation = final_score < threshold
+
+    combined_violations = list(dict.fromkeys(rule.get("violation_words", []) + dl_result.get("violation_tokens", [])))
+
+    return {
+        "is_violation": is_violation,
+        "safety_score": final_score,
+        "violation_words": combined_violations,
+        "method": "hybrid",
+        "rule_score": rule["safety_score"],
+        "dl_score": dl_result["safety_score"],
+    }
+
+
+def hybrid_safety_check(tokenized_text: str, lexicon: Optional[Union[Mapping[str, float], PhraseIndex]] = None, dl_wrapper: Optional[PhoBERTWithAttentionWrapper] = None, threshold: float = 0.5) -> Dict:
     """Combine rule-based and optional DL model to return final decision.
 
     - If lexicon penalty is very high, return rule-based result immediately.
@@ -363,7 +571,7 @@ def hybrid_safety_check(tokenized_text: str, lexicon: Dict[str, float], dl_wrapp
     rule = rule_based_scoring(tokenized_text, lexicon)
 
     # fast path: strong rule-based penalty
-    if rule["penalty"] >= 0.6:
+    if rule["penalty"] >= RULE_FAST_PATH_PENALTY:
         return {**rule, "method": "rule-based"}
 
     dl_result = None
@@ -378,19 +586,35 @@ def hybrid_safety_check(tokenized_text: str, lexicon: Dict[str, float], dl_wrapp
     if dl_result is None:
         return {**rule, "method": "rule-based"}
 
-    final_score = round(0.3 * rule["safety_score"] + 0.7 * dl_result["safety_score"], 4)
-    is_violation = final_score < threshold
+    return _combine_scores(rule, dl_result, threshold)
 
-    combined_violations = list(dict.fromkeys(rule.get("violation_words", []) + dl_result.get("violation_tokens", [])))
 
-    return {
-        "is_violation": is_violation,
-        "safety_score": final_score,
-        "violation_words": combined_violations,
-        "method": "hybrid",
-        "rule_score": rule["safety_score"],
-        "dl_score": dl_result["safety_score"],
-    }
+def hybrid_safety_check_batch(tokenized_texts: List[str], lexicon: Optional[Union[Mapping[str, float], PhraseIndex]] = None, dl_wrapper: Optional[PhoBERTWithAttentionWrapper] = None, threshold: float = 0.5, batch_size: int = 32) -> List[Dict]:
+    """Batch variant of `hybrid_safety_check` (same result per text, in order).
+
+    Every text is scored by the lexicon first; only those below the rule-based
+    fast path go to the DL model, in padded batches via `predict_batch`.
+    """
+    index = _phrase_index(lexicon)
+    rules = [rule_based_scoring(text, index) for text in tokenized_texts]
+    results = [{**rule, "method": "rule-based"} for rule in rules]
+
+    if dl_wrapper is None:
+        return results
+
+    pending = [i for i, rule in enumerate(rules) if rule["penalty"] < RULE_FAST_PATH_PENALTY]
+    if not pending:
+        return results
+
+    try:
+        dl_results = dl_wrapper.predict_batch([tokenized_texts[i] for i in pending], batch_size=batch_size)
+    except Exception:
+        logger.exception("Error running DL model on batch; falling back to rule-based only.")
+        return results
+
+    for i, dl_result in zip(pending, dl_results):
+        results[i] = _combine_scores(rules[i], dl_result, threshold)
+    return results
 
 
 # -------------------------------
@@ -1,11 +1,20 @@
 from app.models.anon_comment_model import AnonComment
 from bson import ObjectId
 from fastapi import HTTPException
+from pymongo import ReturnDocument
+from typing import Optional
+from app.utils.pagination import KEYSET_SORT, apply_cursor
+from app.services.common.moderation_queue import SCAN_QUEUED
 
 class AnonCommentRepository:
     def __init__(self, db):
         self.collection = db["anon_comments"]
-        self.collection.create_index([("post_id", 1), ("created_at", -1)])
+
+    async def ensure_indexes(self):
+        """Called once at startup (app.core.database.ensure_indexes)"""
+        await self.collection.create_index([("post_id", 1), ("created_at", -1)])
+        # Keyset pagination (app/utils/pagination.py) of a post's approved comments
+        await self.collection.create_index([("post_id", 1), ("moderation_status", 1), ("created_at", -1), ("_id", -1)])
 
     async def create(self, comment: dict) -> dict:
         result = await self.collection.insert_one(comment)
@@ -18,20 +27,28 @@ class AnonCommentRepository:
             raise HTTPException(status_code=404, detail="Comment not found")
         return comment
 
-    async def list_by_post(self, post_id: str, limit: int = 50) -> list:
-        cursor = self.collection.find({"post_id": ObjectId(post_id), "moderation_status": "Approved"}) \
-            .sort("created_at", -1).limit(limit)
-        return await cursor.to_list(length=limit)
+    async def list_by_post(self, post_id: str, limit: int = 50, cursor: Optional[str] = None) -> list:
+        query = apply_cursor({"post_id": ObjectId(post_id), "moderation_status": "Approved"}, cursor)
+        return await self.collection.find(query).sort(KEYSET_SORT).limit(limit).to_list(length=limit)
 
     async def update_status(self, comment_id: str, status: str) -> dict:
         result = await self.collection.update_one(
             {"_id": ObjectId(comment_id)},
-            {"$set": {"moderation_status": status}}
+            # Dropping the queue marker keeps the moderation worker from overriding this decision
+            {"$set": {"moderation_status": status}, "$unset": {"ai_scan_result": ""}}
         )
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Comment not found")
         return await self.get_by_id(comment_id)
     
+    async def apply_moderation(self, comment_id, status: str) -> Optional[dict]:
+        """Ghi kết quả kiểm duyệt bất đồng bộ; None nếu comment đã được duyệt tay hoặc đã bị xóa."""
+        return await self.collection.find_one_and_update(
+            {"_id": ObjectId(comment_id) if isinstance(comment_id, str) else comment_id, "ai_scan_result": SCAN_QUEUED},
+            {"$set": {"moderation_status": status}, "$unset": {"ai_scan_result": ""}},
+            return_document=ReturnDocument.AFTER
+        )
+    
     async def delete(self, comment_id: str) -> dict:
         comment = await self.collection.find_one({"_id": ObjectId(comment_id)})
         if not comment:
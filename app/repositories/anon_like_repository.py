@@ -4,8 +4,11 @@ from fastapi import HTTPException
 class AnonLikeRepository:
     def __init__(self, db):
         self.collection = db["anon_likes"]
+
+    async def ensure_indexes(self):
+        """Called once at startup (app.core.database.ensure_indexes)"""
         # đảm bảo unique cho mỗi user_id + post_id
-        self.collection.create_index([("post_id", 1), ("user_id", 1)], unique=True)
+        await self.collection.create_index([("post_id", 1), ("user_id", 1)], unique=True)
 
     async def like(self, post_id: str, user_id: str, created_at):
         data = {
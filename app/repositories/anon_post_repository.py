@@ -1,7 +1,14 @@
 from app.models.anon_post_model import AnonPost
+from app.repositories.user_repository import UserRepository
+from app.repositories.hashtag_repository import HashtagRepository
+from app.utils.pagination import KEYSET_SORT, apply_cursor
+from app.services.common.approved_timeline import get_approved_timeline
+from app.services.common.trending import score_post
+from app.services.common.moderation_queue import SCAN_QUEUED
 from bson import ObjectId
 from fastapi import HTTPException
 from typing import Optional
+from pymongo import ReturnDocument, UpdateOne
 
 class AnonPostRepository:
     def __init__(self, db):
@@ -9,7 +16,18 @@ class AnonPostRepository:
         self.collection = db["anon_posts"]
         self.users_collection = db["users"]
         self.likes_collection = db["anon_likes"]
-        self.collection.create_index([("user_id", 1), ("created_at", -1), ("moderation_status", 1)])
+
+    async def ensure_indexes(self):
+        """Called once at startup (app.core.database.ensure_indexes)"""
+        await self.collection.create_index([("user_id", 1), ("created_at", -1), ("moderation_status", 1)])
+        # Keyset pagination (app/utils/pagination.py): feed, my-posts, admin listings
+        await self.collection.create_index([("moderation_status", 1), ("created_at", -1), ("_id", -1)])
+        await self.collection.create_index([("user_id", 1), ("created_at", -1), ("_id", -1)])
+        await self.collection.create_index([("created_at", -1), ("_id", -1)])
+        # GET /anon-posts/trending: top-K without scanning
+        await self.collection.create_index([("moderation_status", 1), ("trending_score", -1), ("_id", -1)])
+        # GET /anon-posts/?tag= (multikey on the hashtags array)
+        await self.collection.create_index([("hashtags", 1), ("moderation_status", 1), ("created_at", -1), ("_id", -1)])
 
     async def create(self, post: dict) -> dict:
         result = await self.collection.insert_one(post)
@@ -29,92 +47,174 @@ class AnonPostRepository:
 
     async def _enrich_post(self, post: dict, current_user_id: Optional[str] = None) -> dict:
         """Bổ sung author_name, is_liked, is_owner cho post."""
-        post_user_id = post.get("user_id")
-        
-        # Xác định author_name
-        if post.get("is_anonymous", True):
-            post["author_name"] = "Ẩn danh"
-            post["user_id"] = None  # Ẩn user_id khi ẩn danh
-        else:
-            # Lấy username từ users collection
-            user = await self.users_collection.find_one(
-                {"_id": ObjectId(post_user_id) if isinstance(post_user_id, str) else post_user_id},
-                {"username": 1}
-            )
-            post["author_name"] = user.get("username", "Người dùng") if user else "Người dùng"
-            post["user_id"] = str(post_user_id)
-        
-        # Check is_owner và is_liked
+        return (await self._enrich_posts([post], current_user_id))[0]
+
+    async def _enrich_posts(self, posts: list, current_user_id: Optional[str] = None) -> list:
+        """
+        Bổ sung author_name, is_liked, is_owner cho cả trang posts.
+        Một query `$in` trên users (tác giả công khai) và một trên anon_likes,
+        nên số round-trip không phụ thuộc số bài trong trang.
+        """
+        # Lấy username của các tác giả không ẩn danh
+        author_ids = [post.get("user_id") for post in posts if not post.get("is_anonymous", True)]
+        authors = await UserRepository(self.db).get_many_by_ids(author_ids, {"username": 1})
+
+        # Các bài current user đã like
+        liked = set()
+        current_user_oid = None
         if current_user_id:
             current_user_oid = ObjectId(current_user_id) if isinstance(current_user_id, str) else current_user_id
+            if posts:
+                cursor = self.likes_collection.find(
+                    {"post_id": {"$in": [post["_id"] for post in posts]}, "user_id": current_user_oid},
+                    {"post_id": 1}
+                )
+                liked = {like["post_id"] async for like in cursor}
+
+        for post in posts:
+            post_user_id = post.get("user_id")
             post_user_oid = ObjectId(post_user_id) if isinstance(post_user_id, str) else post_user_id
-            
-            # Check owner
-            post["is_owner"] = str(current_user_oid) == str(post_user_oid)
-            
-            # Nếu là owner, hiển thị user_id
-            if post["is_owner"]:
+
+            # Xác định author_name
+            if post.get("is_anonymous", True):
+                post["author_name"] = "Ẩn danh"
+                post["user_id"] = None  # Ẩn user_id khi ẩn danh
+            else:
+                user = authors.get(post_user_oid)
+                post["author_name"] = user.get("username", "Người dùng") if user else "Người dùng"
                 post["user_id"] = str(post_user_id)
-            
-            # Check liked
-            like = await self.likes_collection.find_one({
-                "post_id": post["_id"],
-                "user_id": current_user_oid
-            })
-            post["is_liked"] = like is not None
-        else:
-            post["is_owner"] = False
-            post["is_liked"] = False
-        
-        return post
 
-    async def list(self, limit: int = 20, current_user_id: Optional[str] = None) -> list:
-        """Lấy danh sách posts đã duyệt với thông tin author."""
-        cursor = self.collection.find({"moderation_status": "Approved"}).sort("created_at", -1).limit(limit)
-        posts = await cursor.to_list(length=limit)
-        
-        # Enrich mỗi post với author info
-        enriched_posts = []
-        for post in posts:
-            enriched_post = await self._enrich_post(post, current_user_id)
-            enriched_posts.append(enriched_post)
-        
-        return enriched_posts
+            # Check is_owner và is_liked
+            if current_user_oid is not None:
+                post["is_owner"] = str(current_user_oid) == str(post_user_oid)
+                # Nếu là owner, hiển thị user_id
+                if post["is_owner"]:
+                    post["user_id"] = str(post_user_id)
+                post["is_liked"] = post["_id"] in liked
+            else:
+                post["is_owner"] = False
+                post["is_liked"] = False
+
+        return posts
+
+    async def list(self, limit: int = 20, current_user_id: Optional[str] = None, cursor: Optional[str] = None,
+                   tag: Optional[str] = None) -> list:
+        """Lấy danh sách posts đã duyệt với thông tin author (trang sau `cursor`, lọc theo hashtag `tag`)."""
+        # Newest pages come from the in-memory approved timeline, older ones (and tag filters) from the index
+        posts = None if tag else await get_approved_timeline().page(self.db, limit, cursor)
+        if posts is None:
+            query = {"moderation_status": "Approved"}
+            if tag:
+                query["hashtags"] = tag
+            query = apply_cursor(query, cursor)
+            posts = await self.collection.find(query).sort(KEYSET_SORT).limit(limit).to_list(length=limit)
+        return await self._enrich_posts(posts, current_user_id)
 
-    async def list_by_user(self, user_id: str, limit: int = 50) -> list:
+    async def list_by_user(self, user_id: str, limit: int = 50, cursor: Optional[str] = None) -> list:
         """Lấy tất cả posts của một user (bao gồm cả pending)."""
-        cursor = self.collection.find({
-            "user_id": ObjectId(user_id)
-        }).sort("created_at", -1).limit(limit)
+        query = apply_cursor({"user_id": ObjectId(user_id)}, cursor)
+        posts = await self.collection.find(query).sort(KEYSET_SORT).limit(limit).to_list(length=limit)
+        return await self._enrich_posts(posts, user_id)
+
+    async def list_trending(self, limit: int = 20, current_user_id: Optional[str] = None) -> list:
+        """Top-K bài đã duyệt theo trending_score (đọc thẳng từ index)."""
+        cursor = self.collection.find({"moderation_status": "Approved"}) \
+            .sort([("trending_score", -1), ("_id", -1)]).limit(limit)
         posts = await cursor.to_list(length=limit)
-        
-        enriched_posts = []
-        for post in posts:
-            enriched_post = await self._enrich_post(post, user_id)
-            enriched_posts.append(enriched_post)
-        
-        return enriched_posts
+        return await self._enrich_posts(posts, current_user_id)
+
+    async def increment_counters(self, post_id, inc: dict):
+        """$inc like_count / comment_count, then recompute trending_score and patch the feed timeline."""
+        post_oid = ObjectId(post_id) if isinstance(post_id, str) else post_id
+        post = await self.collection.find_one_and_update(
+            {"_id": post_oid},
+            {"$inc": inc},
+            projection={"like_count": 1, "comment_count": 1, "created_at": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if post:
+            # Only if no other $inc landed since ours - otherwise that writer sets the newer score
+            await self.collection.update_one(
+                {"_id": post_oid, "like_count": post.get("like_count"), "comment_count": post.get("comment_count")},
+                {"$set": {"trending_score": score_post(post)}}
+            )
+        await get_approved_timeline().updated(self.db, post_oid, inc)
+
+    async def refresh_trending_scores(self, post_ids: Optional[list] = None, batch_size: int = 500) -> int:
+        """Recompute trending_score from the counters (given posts, or all); returns the number updated."""
+        query = {"_id": {"$in": post_ids}} if post_ids is not None else {}
+        cursor = self.collection.find(query, {"like_count": 1, "comment_count": 1, "created_at": 1})
+        ops, updated = [], 0
+        async for post in cursor:
+            ops.append(UpdateOne({"_id": post["_id"]}, {"$set": {"trending_score": score_post(post)}}))
+            if len(ops) >= batch_size:
+                updated += (await self.collection.bulk_write(ops, ordered=False)).modified_count
+                ops = []
+        if ops:
+            updated += (await self.collection.bulk_write(ops, ordered=False)).modified_count
+        return updated
 
     async def update_status(self, post_id: str, status: str, reason: str = None) -> dict:
+        await self.release_queued([post_id])
         result = await self.collection.update_one(
             {"_id": ObjectId(post_id)},
             {"$set": {"moderation_status": status, "flagged_reason": reason}}
         )
         if result.matched_count == 0:
             raise HTTPException(status_code=404, detail="Post not found")
+        if status == "Approved":
+            await self.count_hashtags([post_id])
         return await self.get_by_id(post_id)
+
+    async def count_hashtags(self, post_ids: list) -> int:
+        """
+        Count the hashtags of posts that are now Approved, once per post: the
+        `hashtags_counted` flag is set atomically, so re-approvals and
+        concurrent calls do not count a post twice. Returns the posts counted.
+        """
+        hashtag_repo = HashtagRepository(self.db)
+        counted = 0
+        for post_id in post_ids:
+            post = await self.collection.find_one_and_update(
+                {
+                    "_id": ObjectId(post_id) if isinstance(post_id, str) else post_id,
+                    "moderation_status": "Approved",
+                    "hashtags_counted": {"$ne": True},
+                },
+                {"$set": {"hashtags_counted": True}},
+                projection={"hashtags": 1}
+            )
+            if post is not None:
+                await hashtag_repo.record_usage(post.get("hashtags") or [])
+                counted += 1
+        return counted
     
-    async def increment_comment_count(self, post_id: str):
-        await self.collection.update_one(
-            {"_id": ObjectId(post_id)},
-            {"$inc": {"comment_count": 1}}
+    async def release_queued(self, post_ids: list) -> int:
+        """
+        Admin decision on posts still waiting for the moderation worker: drop the
+        queue marker so `apply_moderation` skips them. Call it before writing the
+        new status - a worker result landing in between is then overwritten.
+        """
+        ids = [ObjectId(pid) if isinstance(pid, str) else pid for pid in post_ids]
+        result = await self.collection.update_many(
+            {"_id": {"$in": ids}, "ai_scan_result": SCAN_QUEUED},
+            {"$set": {"ai_scan_result": "Not Scanned"}}
         )
+        return result.modified_count
 
-    async def decrement_comment_count(self, post_id: str):
-        await self.collection.update_one(
-            {"_id": ObjectId(post_id)},
-            {"$inc": {"comment_count": -1}}
+    async def apply_moderation(self, post_id, fields: dict) -> bool:
+        """Ghi kết quả kiểm duyệt bất đồng bộ; bỏ qua nếu bài đã được duyệt tay hoặc đã bị xóa."""
+        result = await self.collection.update_one(
+            {"_id": ObjectId(post_id) if isinstance(post_id, str) else post_id, "ai_scan_result": SCAN_QUEUED},
+            {"$set": fields}
         )
+        return result.modified_count == 1
+
+    async def increment_comment_count(self, post_id: str):
+        await self.increment_counters(post_id, {"comment_count": 1})
+
+    async def decrement_comment_count(self, post_id: str):
+        await self.increment_counters(post_id, {"comment_count": -1})
 
     async def delete(self, post_id: str) -> dict:
         post = await self.collection.find_one({"_id": ObjectId(post_id)})
@@ -122,6 +222,7 @@ class AnonPostRepository:
             raise HTTPException(status_code=404, detail="Post not found")
 
         await self.collection.delete_one({"_id": ObjectId(post_id)})
+        await get_approved_timeline().removed(self.db, [post["_id"]])
         return post
     
     async def get(self, post_id: str) -> dict:
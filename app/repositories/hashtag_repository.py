@@ -1,10 +1,33 @@
 from bson import ObjectId
 from datetime import datetime
+from pymongo import UpdateOne
+import time
+from app.core.config import settings
+
+# Process-wide top-N by usage_count, refreshed every HASHTAG_POPULAR_REFRESH_SECONDS
+_popular: list[dict] = []
+_popular_loaded_at = 0.0
+
+
+def normalize_hashtags(tags: list[str]) -> list[str]:
+    """'#Sharing', ' sharing ' -> 'sharing'; duplicates and empty tags dropped, order kept"""
+    normalized = []
+    for tag in tags or []:
+        name = str(tag).strip().lstrip("#").strip().lower()
+        if name and name not in normalized:
+            normalized.append(name)
+    return normalized
+
 
 class HashtagRepository:
     def __init__(self, db):
         self.collection = db["hashtags"]
 
+    async def ensure_indexes(self):
+        """Called once at startup (app.core.database.ensure_indexes)"""
+        await self.collection.create_index("name", unique=True)  # record_usage upserts by name
+        await self.collection.create_index([("usage_count", -1)])
+
     async def create(self, hashtag_data: dict):
         result = await self.collection.insert_one(hashtag_data)
         return await self.collection.find_one({"_id": result.inserted_id})
@@ -35,8 +58,34 @@ class HashtagRepository:
         }
         return await self.create(hashtag_data)
 
+    async def record_usage(self, names: list[str]):
+        """Count one use of each tag of a post: a single bulk_write of upserts"""
+        if not names:
+            return
+        now = datetime.utcnow()
+        await self.collection.bulk_write([
+            UpdateOne(
+                {"name": name},
+                {
+                    "$inc": {"usage_count": 1},
+                    "$set": {"last_used_at": now},
+                    "$setOnInsert": {"created_at": now}
+                },
+                upsert=True
+            )
+            for name in names
+        ], ordered=False)
+
     async def list_popular(self, limit: int = 20):
-        return await self.collection.find().sort("usage_count", -1).limit(limit).to_list(length=limit)
+        """Most used tags, served from the in-memory top-N (no sort on every call)"""
+        global _popular, _popular_loaded_at
+        size = settings.HASHTAG_POPULAR_SIZE
+        if limit > size:
+            return await self.collection.find().sort("usage_count", -1).limit(limit).to_list(length=limit)
+        if time.monotonic() - _popular_loaded_at >= settings.HASHTAG_POPULAR_REFRESH_SECONDS:
+            _popular = await self.collection.find().sort("usage_count", -1).limit(size).to_list(length=size)
+            _popular_loaded_at = time.monotonic()
+        return [dict(tag) for tag in _popular[:limit]]
 
     async def search(self, query: str, limit: int = 10):
         return await self.collection.find(
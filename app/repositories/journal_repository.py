@@ -1,12 +1,18 @@
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from fastapi import HTTPException
 from app.models.journal_model import Journal
 from bson import ObjectId
 
 class JournalRepository:
     def __init__(self, db: AsyncIOMotorDatabase):
         self.collection = db.get_collection("journals")
-        self.collection.create_index([("user_id", 1), ("created_at", -1)])
-        self.collection.create_index("tags")
+
+    async def ensure_indexes(self):
+        """Called once at startup (app.core.database.ensure_indexes)"""
+        await self.collection.create_index([("user_id", 1), ("created_at", -1)])
+        await self.collection.create_index("tags")
+        # Startup requeue looks up journals still waiting for enrichment
+        await self.collection.create_index("processing_status")
 
     async def create(self, journal: dict) -> Journal:
         result = await self.collection.insert_one(journal)
@@ -15,4 +21,27 @@ class JournalRepository:
 
     async def get_by_user(self, user_id: str) -> list[Journal]:
         cursor = self.collection.find({"user_id": ObjectId(user_id)}).sort("created_at", -1)
-        return [Journal(**doc) async for doc in cursor]
\ No newline at end of file
+        return [Journal(**doc) async for doc in cursor]
+
+    async def get_by_id(self, journal_id: str, user_id: str) -> Journal:
+        if not ObjectId.is_valid(journal_id):
+            raise HTTPException(status_code=404, detail="Journal not found")
+        doc = await self.collection.find_one({"_id": ObjectId(journal_id), "user_id": ObjectId(user_id)})
+        if not doc:
+            raise HTTPException(status_code=404, detail="Journal not found")
+        return Journal(**doc)
+
+    async def get_many(self, journal_ids: list) -> list[dict]:
+        return await self.collection.find({"_id": {"$in": journal_ids}}).to_list(length=None)
+
+    async def update_fields(self, journal_id, fields: dict, status: str = None) -> bool:
+        """Set fields; with `status` only while the journal is still in that processing status"""
+        query = {"_id": journal_id}
+        if status is not None:
+            query["processing_status"] = status
+        result = await self.collection.update_one(query, {"$set": fields})
+        return result.modified_count > 0
+
+    async def list_ids_by_status(self, status: str) -> list:
+        cursor = self.collection.find({"processing_status": status}, {"_id": 1})
+        return [doc["_id"] async for doc in cursor]
@@ -15,4 +15,10 @@ class ModerationLogRepository:
             "created_at": datetime.utcnow(),
         }
         await self.collection.insert_one(log)
-        return log
\ No newline at end of file
+        return log
+
+    async def create_many(self, logs: list[dict]):
+        """Ghi nhiều log một lần (re-moderation theo batch)."""
+        if logs:
+            await self.collection.insert_many(logs)
+        return logs
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+from bson import ObjectId
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+
+
+class RemoderationJobRepository:
+    def __init__(self, db):
+        self.collection = db["remoderation_jobs"]
+
+    async def create(self, job: dict) -> dict:
+        result = await self.collection.insert_one(job)
+        job["_id"] = result.inserted_id
+        return job
+
+    async def get_by_id(self, job_id) -> dict:
+        try:
+            oid = ObjectId(job_id) if isinstance(job_id, str) else job_id
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid job_id format")
+        job = await self.collection.find_one({"_id": oid})
+        if not job:
+            raise HTTPException(status_code=404, detail="Re-moderation job not found")
+        return job
+
+    async def get_latest(self) -> Optional[dict]:
+        return await self.collection.find_one({}, sort=[("created_at", -1)])
+
+    async def find_active(self) -> Optional[dict]:
+        return await self.collection.find_one({"status": {"$in": ["running", "paused"]}})
+
+    async def claim(self, job_id, owner: str, statuses: list[str], stale_seconds: int) -> Optional[dict]:
+        """
+        Mark the job running for `owner` if it is in one of `statuses`, or if it is
+        marked running but its runner stopped heartbeating (process restarted).
+        """
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {"_id": job_id, "$or": [
+                {"status": {"$in": statuses}},
+                {"status": "running", "heartbeat_at": {"$lt": now - timedelta(seconds=stale_seconds)}},
+            ]},
+            {"$set": {"status": "running", "owner": owner, "heartbeat_at": now, "updated_at": now}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def find_interrupted(self, stale_seconds: int) -> list:
+        cutoff = datetime.utcnow() - timedelta(seconds=stale_seconds)
+        cursor = self.collection.find({"status": "running", "heartbeat_at": {"$lt": cutoff}})
+        return await cursor.to_list(length=None)
+
+    async def checkpoint(self, job_id, owner: str, fields: dict, inc: dict) -> Optional[dict]:
+        """Save progress; returns the job, or None if it is no longer running for this owner (paused / taken over)"""
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {"_id": job_id, "status": "running", "owner": owner},
+            {"$set": {**fields, "heartbeat_at": now, "updated_at": now}, "$inc": inc},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def set_status(self, job_id, status: str, from_statuses: list[str], **fields) -> Optional[dict]:
+        return await self.collection.find_one_and_update(
+            {"_id": job_id, "status": {"$in": from_statuses}},
+            {"$set": {"status": status, "updated_at": datetime.utcnow(), **fields}},
+            return_document=ReturnDocument.AFTER
+        )
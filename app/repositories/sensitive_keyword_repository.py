@@ -1,11 +1,14 @@
 from bson import ObjectId
+from app.services.common.lexicon_store import notify_lexicon_changed, SENSITIVE_KEYWORDS
 
 class SensitiveKeywordRepository:
     def __init__(self, db):
-        self.collection = db["sensitive_keywords"]
+        self.db = db
+        self.collection = db[SENSITIVE_KEYWORDS]
 
     async def create(self, keyword_data: dict):
         result = await self.collection.insert_one(keyword_data)
+        await notify_lexicon_changed(self.db, SENSITIVE_KEYWORDS)
         return await self.collection.find_one({"_id": result.inserted_id})
 
     async def get_all(self):
@@ -18,11 +21,14 @@ class SensitiveKeywordRepository:
         return await self.collection.find({"category": category}).to_list(length=1000)
 
     async def delete(self, keyword_id: str):
-        return await self.collection.delete_one({"_id": ObjectId(keyword_id)})
+        result = await self.collection.delete_one({"_id": ObjectId(keyword_id)})
+        await notify_lexicon_changed(self.db, SENSITIVE_KEYWORDS)
+        return result
 
     async def update(self, keyword_id: str, update_data: dict):
         await self.collection.update_one(
             {"_id": ObjectId(keyword_id)},
             {"$set": update_data}
         )
+        await notify_lexicon_changed(self.db, SENSITIVE_KEYWORDS)
         return await self.collection.find_one({"_id": ObjectId(keyword_id)})
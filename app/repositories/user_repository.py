@@ -41,6 +41,14 @@ class UserRepository:
         except Exception as e:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to fetch user: {str(e)}")
 
+    async def get_many_by_ids(self, user_ids, projection: Optional[dict] = None) -> dict:
+        """Raw user documents for many ids in one `$in` query, keyed by ObjectId (missing ids are absent)."""
+        ids = {ObjectId(uid) if isinstance(uid, str) else uid for uid in user_ids if uid}
+        if not ids:
+            return {}
+        cursor = self.db.users.find({"_id": {"$in": list(ids)}}, projection)
+        return {user["_id"]: user async for user in cursor}
+
     async def get_by_email(self, email: str) -> Optional[User]:
         try:
             user_data = await self.db.users.find_one({"email": email})
@@ -41,6 +41,7 @@ class AnonPostResponse(BaseModel):
     toxic_labels: List[str] = []
     toxic_confidence: float = 0.0
     toxic_predictions: dict = {}
+    model_version: Optional[str] = None
 
     @field_validator('hashtags', mode='before')
     @classmethod
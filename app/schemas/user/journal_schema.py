@@ -8,6 +8,13 @@ class JournalCreate(BaseModel):
     voice_note_path: Optional[str] = None
     tags: Optional[List[str]] = None
 
+class SentimentSegment(BaseModel):
+    source: str  # "text_content" | "voice_text"
+    start: int  # character offsets into that field
+    end: int
+    label: str
+    score: float
+
 class JournalResponse(BaseModel):
     id: str
     user_id: str
@@ -18,10 +25,13 @@ class JournalResponse(BaseModel):
     voice_text: Optional[str] = None
     sentiment_label: str
     sentiment_score: float
+    sentiment_segments: List[SentimentSegment] = []
     tags: Optional[List[str]] = None
     is_toxic: bool = False
     toxic_labels: List[str] = []
     toxic_confidence: float = 0.0
+    toxic_model_version: Optional[str] = None
+    processing_status: str = "done"
 
     class Config:
         json_encoders = {
@@ -0,0 +1,364 @@
+"""
+Re-moderation Service
+Admin-triggered background job that re-scores existing posts and comments
+after the toxic model has been retrained.
+
+- Streams each collection in `_id` order from the last checkpoint, so a job
+  can be paused, resumed, or picked up again after a restart without
+  re-scoring what is already done.
+- Each batch goes through the moderation cascade in one call (one vectorized
+  TF-IDF pass) and is written back with a single unordered bulk_write.
+- Progress (last `_id`, counts, elapsed time) is checkpointed in
+  `remoderation_jobs` after every batch; the checkpoint also carries the
+  pause signal and a heartbeat, so only one process runs a job at a time.
+- Every process keeps checking for running jobs whose heartbeat went stale
+  (runner killed by a redeploy) and takes them over.
+
+Modes:
+- "escalate" (default): refresh the AI fields and tighten the status when the
+  new model is stricter (Approved -> Pending / Blocked, Pending -> Blocked).
+  Nothing is ever approved automatically.
+- "scores": only refresh the AI fields (toxic_labels, confidence, ...).
+
+Content an admin decided on (`status_reason` set) and content still waiting
+in the async moderation queue (SCAN_QUEUED) is skipped. Content approved
+without a scan ("Not Scanned", model unavailable) is re-scored.
+"""
+import asyncio
+import os
+import socket
+import time
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.repositories.anon_post_repository import AnonPostRepository
+from app.repositories.moderation_log_repository import ModerationLogRepository
+from app.repositories.remoderation_job_repository import RemoderationJobRepository
+from app.services.common.approved_timeline import get_approved_timeline
+from app.services.common.model_registry import get_model_registry
+from app.services.common.moderation_cascade import ModerationCascade, get_moderation_cascade
+from app.services.common.moderation_queue import SCAN_QUEUED
+
+MODES = ("escalate", "scores")
+
+# collection -> (content_type, cascade stages; None = MODERATION_STAGES)
+TARGETS = {
+    "anon_posts": ("post", None),
+    "anon_comments": ("comment", ["lexicon", "tfidf"]),
+}
+
+_ACTION_RANK = {"Approved": 0, "Pending": 1, "Blocked": 2}
+_SCAN_RESULT = {"Pending": "Suspicious", "Blocked": "Unsafe"}
+
+# Eligible documents: automatic decisions only
+_ELIGIBLE = {
+    "moderation_status": {"$in": list(_ACTION_RANK)},
+    "status_reason": {"$exists": False},
+    "ai_scan_result": {"$ne": SCAN_QUEUED},
+}
+
+# Runner identity for the job lease
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+# job_id -> running task in this process
+_tasks: dict[str, asyncio.Task] = {}
+_watch_task: Optional[asyncio.Task] = None
+
+
+class RemoderationService:
+    def __init__(self, db):
+        self.db = db
+        self.job_repo = RemoderationJobRepository(db)
+        self.log_repo = ModerationLogRepository(db)
+
+    # ----- admin actions -----
+
+    async def start(self, admin_id: str, mode: str = "escalate", collections: Optional[list[str]] = None,
+                    batch_size: Optional[int] = None) -> dict:
+        if mode not in MODES:
+            raise HTTPException(status_code=400, detail=f"Invalid mode. Use: {', '.join(MODES)}")
+        collections = collections or list(TARGETS)
+        unknown = [name for name in collections if name not in TARGETS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown collections: {unknown}")
+        toxic_service = get_moderation_cascade().toxic_service
+        if not toxic_service.models_loaded:
+            raise HTTPException(status_code=503, detail="Toxic model is not loaded", headers={"Retry-After": "5"})
+
+        active = await self.job_repo.find_active()
+        if active:
+            raise HTTPException(status_code=409, detail=f"Re-moderation job {active['_id']} is already {active['status']}")
+
+        now = datetime.utcnow()
+        totals = {name: await self.db[name].count_documents(_ELIGIBLE) for name in collections}
+        job = await self.job_repo.create({
+            "status": "running",
+            "owner": OWNER,
+            "heartbeat_at": now,
+            "mode": mode,
+            "batch_size": batch_size or settings.REMODERATION_BATCH_SIZE,
+            "collections": collections,
+            "done": [],
+            "cursor": {name: None for name in collections},
+            "totals": totals,
+            "processed": {name: 0 for name in collections},
+            "changed": {name: 0 for name in collections},
+            "escalated": {"Pending": 0, "Blocked": 0},
+            "elapsed_seconds": 0.0,
+            "model_version": toxic_service.model_version,
+            "created_by": str(admin_id),
+            "created_at": now,
+            "updated_at": now,
+            "finished_at": None,
+            "error": None,
+        })
+        self._spawn(job)
+        return self.to_status(job)
+
+    async def pause(self, job_id: str) -> dict:
+        job = await self.job_repo.get_by_id(job_id)
+        paused = await self.job_repo.set_status(job["_id"], "paused", ["running"])
+        if paused is None:
+            raise HTTPException(status_code=409, detail=f"Job is {job['status']}, not running")
+        # The runner stops at its next checkpoint (this or another process)
+        return self.to_status(paused)
+
+    async def cancel(self, job_id: str) -> dict:
+        job = await self.job_repo.get_by_id(job_id)
+        cancelled = await self.job_repo.set_status(job["_id"], "cancelled", ["running", "paused"],
+                                                   finished_at=datetime.utcnow())
+        if cancelled is None:
+            raise HTTPException(status_code=409, detail=f"Job is already {job['status']}")
+        return self.to_status(cancelled)
+
+    async def resume(self, job_id: str) -> dict:
+        job = await self.job_repo.get_by_id(job_id)
+        claimed = await self.job_repo.claim(job["_id"], OWNER, ["paused"], settings.REMODERATION_STALE_SECONDS)
+        if claimed is None:
+            raise HTTPException(status_code=409, detail=f"Job is {job['status']} and cannot be resumed")
+        self._spawn(claimed)
+        return self.to_status(claimed)
+
+    async def status(self, job_id: Optional[str] = None) -> dict:
+        job = await self.job_repo.get_by_id(job_id) if job_id else await self.job_repo.get_latest()
+        if job is None:
+            raise HTTPException(status_code=404, detail="No re-moderation job yet")
+        return self.to_status(job)
+
+    async def resume_interrupted(self):
+        """Take over jobs whose runner died mid-way"""
+        for job in await self.job_repo.find_interrupted(settings.REMODERATION_STALE_SECONDS):
+            claimed = await self.job_repo.claim(job["_id"], OWNER, [], settings.REMODERATION_STALE_SECONDS)
+            if claimed is not None:
+                print(f"🔁 Resuming re-moderation job {claimed['_id']}")
+                self._spawn(claimed)
+
+    async def start_watching(self):
+        """
+        App startup: resume interrupted jobs now and keep checking. The runner
+        of a redeployed process only goes stale REMODERATION_STALE_SECONDS
+        after its last heartbeat, usually after this process has started.
+        """
+        global _watch_task
+        await self.resume_interrupted()
+        if _watch_task is None or _watch_task.done():
+            _watch_task = asyncio.create_task(self._watch())
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(max(1, settings.REMODERATION_STALE_SECONDS / 2))
+            try:
+                await self.resume_interrupted()
+            except Exception as e:
+                print(f"⚠️ Re-moderation watcher error: {e}")
+
+    @staticmethod
+    def to_status(job: dict) -> dict:
+        processed = sum(job["processed"].values())
+        total = sum(job["totals"].values())
+        elapsed = job.get("elapsed_seconds") or 0.0
+        rate = processed / elapsed if elapsed else 0.0
+        return {
+            "job_id": str(job["_id"]),
+            "status": job["status"],
+            "mode": job["mode"],
+            "model_version": job.get("model_version"),
+            "collections": job["collections"],
+            "done": job.get("done", []),
+            "processed": job["processed"],
+            "changed": job["changed"],
+            "escalated": job["escalated"],
+            "totals": job["totals"],
+            "progress": round(processed / total, 4) if total else 1.0,
+            "docs_per_second": round(rate, 1),
+            "eta_seconds": round((total - processed) / rate) if rate and total > processed else None,
+            "elapsed_seconds": round(elapsed, 1),
+            "created_at": job["created_at"],
+            "updated_at": job.get("updated_at"),
+            "finished_at": job.get("finished_at"),
+            "error": job.get("error"),
+        }
+
+    # ----- runner -----
+
+    def _spawn(self, job: dict):
+        key = str(job["_id"])
+        task = _tasks.get(key)
+        if task is None or task.done():
+            _tasks[key] = asyncio.create_task(self._run(job))
+
+    async def _run(self, job: dict):
+        job_id = job["_id"]
+        try:
+            # Resumed at startup: wait for the toxic model instead of scoring without it
+            while get_model_registry().is_loading("toxic"):
+                await asyncio.sleep(1)
+            if not get_moderation_cascade().toxic_service.models_loaded:
+                raise RuntimeError("toxic model is not loaded")
+            for name in job["collections"]:
+                if name in job["done"]:
+                    continue
+                job = await self._run_collection(job, name)
+                if job is None:
+                    print(f"⏸️ Re-moderation job {job_id} paused")
+                    return
+                job = await self.job_repo.checkpoint(job_id, OWNER, {"done": job["done"] + [name]}, {})
+                if job is None:
+                    return
+            await self.job_repo.set_status(job_id, "completed", ["running"], finished_at=datetime.utcnow())
+            print(f"✅ Re-moderation job {job_id} completed: {self.to_status(job)['processed']}")
+        except asyncio.CancelledError:
+            # Shutdown: the heartbeat goes stale and the job is resumed on the next start
+            raise
+        except Exception as e:
+            print(f"❌ Re-moderation job {job_id} failed: {e}")
+            await self.job_repo.set_status(job_id, "failed", ["running"], error=str(e))
+        finally:
+            _tasks.pop(str(job_id), None)
+
+    async def _run_collection(self, job: dict, name: str) -> Optional[dict]:
+        """Stream one collection from its checkpoint; None when the job was paused / taken over"""
+        content_type, stages = TARGETS[name]
+        # Own instance so bulk runs do not skew the live cascade metrics; same models
+        cascade = ModerationCascade(stages)
+        cascade.toxic_service = get_moderation_cascade().toxic_service
+        cascade.phobert = get_moderation_cascade().phobert
+
+        query = dict(_ELIGIBLE)
+        last_id = job["cursor"].get(name)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        projection = {"content": 1, "user_id": 1, "post_id": 1, "moderation_status": 1}
+        batch_size = job["batch_size"]
+
+        batch = []
+        cursor = self.db[name].find(query, projection).sort("_id", 1).batch_size(batch_size)
+        async for doc in cursor:
+            batch.append(doc)
+            if len(batch) >= batch_size:
+                job = await self._process_batch(job, name, content_type, cascade, batch)
+                if job is None:
+                    return None
+                batch = []
+        if batch:
+            job = await self._process_batch(job, name, content_type, cascade, batch)
+        return job
+
+    async def _process_batch(self, job: dict, name: str, content_type: str, cascade: ModerationCascade,
+                             docs: list[dict]) -> Optional[dict]:
+        # Paused / taken over since the last checkpoint: stop before writing anything
+        if await self.job_repo.checkpoint(job["_id"], OWNER, {}, {}) is None:
+            return None
+
+        start = time.perf_counter()
+        decisions = await cascade.moderate_batch([doc.get("content") or "" for doc in docs], db=self.db)
+        # Millisecond precision, as stored: the re-read below matches on it
+        now = datetime.utcnow()
+        now = now.replace(microsecond=now.microsecond // 1000 * 1000)
+
+        ops, escalations = [], []
+        for doc, decision in zip(docs, decisions):
+            if decision.decided_by != "lexicon" and not decision.toxic_predictions:
+                # Scoring failed for this text: leave it as it is
+                continue
+            fields = {
+                "toxic_labels": decision.toxic_labels,
+                "toxic_confidence": decision.toxic_confidence,
+                "toxic_predictions": decision.toxic_predictions,
+                "model_version": decision.model_version or job["model_version"],
+                "remoderated_at": now,
+            }
+            current = doc.get("moderation_status")
+            if job["mode"] == "escalate" and _ACTION_RANK[decision.action] > _ACTION_RANK.get(current, 0):
+                fields["moderation_status"] = decision.action
+                if content_type == "post":
+                    fields["ai_scan_result"] = _SCAN_RESULT[decision.action]
+                    fields["flagged_reason"] = decision.flagged_reason
+                escalations.append((doc, decision))
+            # Guard against a concurrent admin decision since the read
+            ops.append(UpdateOne({"_id": doc["_id"], "moderation_status": current, "status_reason": {"$exists": False}},
+                                 {"$set": fields}))
+
+        if ops:
+            await self.db[name].bulk_write(ops, ordered=False)
+        if escalations:
+            # Logs and counters only for the updates the guard let through
+            applied = {
+                doc["_id"] async for doc in self.db[name].find(
+                    {"_id": {"$in": [doc["_id"] for doc, _ in escalations]}, "remoderated_at": now}, {"_id": 1}
+                )
+            }
+            escalations = [(doc, decision) for doc, decision in escalations if doc["_id"] in applied]
+
+        logs = []
+        escalated = {"Pending": 0, "Blocked": 0}
+        uncounted: dict = {}  # post_id -> approved comments that are no longer approved
+        for doc, decision in escalations:
+            escalated[decision.action] += 1
+            logs.append({
+                "content_id": doc["_id"],
+                "content_type": content_type,
+                "user_id": str(doc.get("user_id", "")),
+                "text": doc.get("content"),
+                "detected_keywords": decision.detected_keywords,
+                "action": decision.action,
+                "source": "remoderation",
+                "job_id": job["_id"],
+                "created_at": now,
+            })
+            if content_type == "comment" and doc.get("moderation_status") == "Approved":
+                uncounted[doc["post_id"]] = uncounted.get(doc["post_id"], 0) + 1
+        if uncounted:
+            await self.db["anon_posts"].bulk_write(
+                [UpdateOne({"_id": post_id}, {"$inc": {"comment_count": -count}}) for post_id, count in uncounted.items()],
+                ordered=False
+            )
+            await AnonPostRepository(self.db).refresh_trending_scores(list(uncounted))
+        if uncounted or (content_type == "post" and sum(escalated.values())):
+            # Escalated posts leave the feed, comment counters moved
+            await get_approved_timeline().changed(self.db)
+        if logs:
+            await self.log_repo.create_many(logs)
+
+        changed = sum(escalated.values())
+        return await self.job_repo.checkpoint(
+            job["_id"], OWNER,
+            {f"cursor.{name}": docs[-1]["_id"]},
+            {
+                f"processed.{name}": len(docs),
+                f"changed.{name}": changed,
+                "escalated.Pending": escalated["Pending"],
+                "escalated.Blocked": escalated["Blocked"],
+                "elapsed_seconds": time.perf_counter() - start,
+            }
+        )
+
+
+async def stop_remoderation_watcher():
+    """App shutdown; running jobs go stale and are taken over by another process"""
+    if _watch_task is not None and not _watch_task.done():
+        _watch_task.cancel()
@@ -0,0 +1,182 @@
+"""
+Approved Timeline
+Per-process, in-memory ring buffer of the newest FEED_TIMELINE_SIZE approved
+posts (raw documents, newest first), so feed pages are served without a query
+on `anon_posts`. Enrichment (authors, is_liked) still runs per request.
+
+Write paths fan out to it:
+- `added(db, post)`        - a post was created as Approved
+- `removed(db, post_ids)`  - posts were deleted
+- `updated(db, post_id, inc)` - like / comment counters moved
+- `changed(db)`            - anything else (admin status changes, webhook,
+                             async moderation, re-moderation): rebuild
+
+Every write bumps a version stamp in `cache_versions`. The process that wrote
+applies the change in place when no other process wrote in between; all other
+processes see the stamp move (checked at most every FEED_TIMELINE_POLL_SECONDS
+on read) and rebuild with one indexed query. Counter updates on posts that are
+not in a loaded buffer do not touch the stamp; a process that has not loaded
+its buffer yet cannot tell, so it always bumps.
+"""
+import asyncio
+import time
+from typing import Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from app.core.config import settings
+from app.utils.pagination import KEYSET_SORT, decode_cursor
+
+VERSIONS_COLLECTION = "cache_versions"
+TIMELINE_KEY = "approved_timeline"
+
+APPROVED = "Approved"
+
+
+def _sort_key(post: dict):
+    return post["created_at"], post["_id"]
+
+
+class ApprovedTimeline:
+    """
+    Usage:
+        posts = await get_approved_timeline().page(db, limit, cursor)
+        if posts is None:  # disabled, or the page is older than the buffer
+            posts = ...query anon_posts...
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self._posts: list[dict] = []
+        self._complete = False  # the buffer holds every approved post
+        self._version: Optional[int] = None  # None = not loaded / stale
+        self._checked_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self.hits = 0
+        self.misses = 0
+        self.rebuilds = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    async def _read_version(self, db) -> int:
+        doc = await db[VERSIONS_COLLECTION].find_one({"_id": TIMELINE_KEY})
+        return doc.get("version", 0) if doc else 0
+
+    async def _bump(self, db) -> bool:
+        """Bump the stamp; True if no other process wrote since our last sync (safe to patch in place)"""
+        doc = await db[VERSIONS_COLLECTION].find_one_and_update(
+            {"_id": TIMELINE_KEY},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER,
+        )
+        version = doc.get("version", 0)
+        if self._version is not None and version == self._version + 1:
+            self._version = version
+            return True
+        self._version = None
+        return False
+
+    async def _ensure_fresh(self, db):
+        if self._version is not None and time.monotonic() - self._checked_at < settings.FEED_TIMELINE_POLL_SECONDS:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._version is not None and time.monotonic() - self._checked_at < settings.FEED_TIMELINE_POLL_SECONDS:
+                return
+            version = await self._read_version(db)
+            if version != self._version:
+                posts = await db["anon_posts"].find({"moderation_status": APPROVED}) \
+                    .sort(KEYSET_SORT).limit(self.size).to_list(length=self.size)
+                self._posts = posts
+                self._complete = len(posts) < self.size
+                self._version = version
+                self.rebuilds += 1
+            self._checked_at = time.monotonic()
+
+    async def page(self, db, limit: int, cursor: Optional[str] = None) -> Optional[list[dict]]:
+        """
+        Up to `limit` approved posts after `cursor` (copies, safe to enrich),
+        or None when the buffer cannot answer and the caller must query.
+        """
+        if not self.enabled:
+            return None
+        await self._ensure_fresh(db)
+        posts = self._posts
+        start = 0
+        if cursor:
+            after = decode_cursor(cursor)
+            # Newest first: skip everything at or above the cursor key
+            while start < len(posts) and _sort_key(posts[start]) >= after:
+                start += 1
+        result = posts[start:start + limit]
+        if len(result) < limit and not self._complete:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [dict(post) for post in result]
+
+    async def added(self, db, post: dict):
+        if not self.enabled or post.get("moderation_status") != APPROVED:
+            return
+        if await self._bump(db):
+            self._posts = sorted(self._posts + [dict(post)], key=_sort_key, reverse=True)
+            if len(self._posts) > self.size:
+                del self._posts[self.size:]
+                self._complete = False
+
+    async def removed(self, db, post_ids: list):
+        if not self.enabled:
+            return
+        ids = {ObjectId(pid) if isinstance(pid, str) else pid for pid in post_ids}
+        if await self._bump(db):
+            # The buffer shrinks until the next rebuild; pages past its end fall back to the query
+            self._posts = [post for post in self._posts if post["_id"] not in ids]
+
+    async def updated(self, db, post_id, inc: dict):
+        if not self.enabled:
+            return
+        post_id = ObjectId(post_id) if isinstance(post_id, str) else post_id
+        post = next((p for p in self._posts if p["_id"] == post_id), None)
+        if post is None:
+            # Not loaded (or stale): the post may be in other processes' buffers
+            if self._version is None:
+                await self._bump(db)
+            return
+        if await self._bump(db):
+            for key, delta in inc.items():
+                post[key] = post.get(key, 0) + delta
+
+    async def changed(self, db):
+        """Unknown change to approved posts: every process rebuilds on its next read"""
+        if not self.enabled:
+            return
+        await self._bump(db)
+        self._version = None
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "size": self.size,
+            "cached": len(self._posts),
+            "version": self._version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "rebuilds": self.rebuilds,
+        }
+
+
+# Singleton instance
+_timeline: Optional[ApprovedTimeline] = None
+
+
+def get_approved_timeline() -> ApprovedTimeline:
+    """Get or create the process-wide approved timeline"""
+    global _timeline
+    if _timeline is None:
+        _timeline = ApprovedTimeline(settings.FEED_TIMELINE_SIZE)
+    return _timeline
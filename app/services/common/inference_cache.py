@@ -0,0 +1,171 @@
+"""
+Inference Result Cache
+Bounded LRU + TTL cache for model outputs, shared by toxic and sentiment scoring.
+
+Identical texts are scored over and over (preset comments, resubmitted posts,
+admin re-checks, /ai/toxic calls while the user types). Entries are keyed by
+a hash of the normalized text and grouped by namespace ("toxic", "sentiment").
+Each namespace carries the version of the model that produced its entries:
+looking up with a different version drops the whole namespace, so results
+from an older model are never served after a reload.
+
+Cache raw model outputs (probabilities, label/score), not thresholded
+decisions: callers pass their own threshold.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from app.core.config import settings
+
+
+def text_key(text: str) -> bytes:
+    """128-bit hash of a (normalized) text"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def model_fingerprint(paths: Iterable[Path]) -> str:
+    """
+    Version string for a set of model files (name, size, mtime).
+    Changes whenever a file is replaced, e.g. after retraining.
+    """
+    digest = hashlib.sha1()
+    for path in sorted(Path(p) for p in paths):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+
+class _NamespaceStats:
+    def __init__(self):
+        self.version: Optional[str] = None
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def to_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "version": self.version,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+class InferenceCache:
+    """
+    Usage:
+        cache = get_inference_cache()
+        probs = cache.get("toxic", model_version, normalized_text)
+        if probs is None:
+            probs = score(normalized_text)
+            cache.set("toxic", model_version, normalized_text, probs)
+
+    Thread-safe: toxic scoring looks up the cache from the inference thread pool.
+    """
+
+    def __init__(self, max_size: int = 4096, ttl_seconds: float = 3600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[tuple[str, bytes], tuple[float, Any]] = OrderedDict()
+        self._namespaces: dict[str, _NamespaceStats] = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    def _namespace(self, namespace: str, version: str) -> _NamespaceStats:
+        """Stats for a namespace; drops its entries when the model version changed"""
+        stats = self._namespaces.get(namespace)
+        if stats is None:
+            stats = self._namespaces[namespace] = _NamespaceStats()
+        if stats.version != version:
+            if stats.version is not None:
+                self._drop_namespace(namespace)
+                stats.invalidations += 1
+            stats.version = version
+        return stats
+
+    def _drop_namespace(self, namespace: str):
+        for key in [key for key in self._entries if key[0] == namespace]:
+            del self._entries[key]
+
+    def get(self, namespace: str, version: str, text: str) -> Optional[Any]:
+        """Cached value for the text, or None"""
+        if not self.enabled:
+            return None
+        key = (namespace, text_key(text))
+        with self._lock:
+            stats = self._namespace(namespace, version)
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    stats.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+            stats.misses += 1
+            return None
+
+    def set(self, namespace: str, version: str, text: str, value: Any):
+        if not self.enabled:
+            return
+        key = (namespace, text_key(text))
+        with self._lock:
+            self._namespace(namespace, version)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, namespace: Optional[str] = None):
+        """Drop one namespace, or everything"""
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                for stats in self._namespaces.values():
+                    stats.invalidations += 1
+            elif namespace in self._namespaces:
+                self._drop_namespace(namespace)
+                self._namespaces[namespace].invalidations += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "namespaces": {name: stats.to_dict() for name, stats in self._namespaces.items()},
+            }
+
+
+# Singleton instance
+_cache: Optional[InferenceCache] = None
+
+
+def get_inference_cache() -> InferenceCache:
+    """Get or create the inference result cache"""
+    global _cache
+    if _cache is None:
+        _cache = InferenceCache(
+            max_size=settings.INFERENCE_CACHE_SIZE,
+            ttl_seconds=settings.INFERENCE_CACHE_TTL_SECONDS
+        )
+    return _cache
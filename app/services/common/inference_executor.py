@@ -0,0 +1,211 @@
+"""
+Inference Executor
+Runs CPU-bound model inference off the asyncio event loop.
+
+- sklearn (TF-IDF + LR) work goes to a thread pool: numpy/scipy release the GIL
+  for the heavy parts and the vectorizers stay shared in memory.
+- Transformer forward passes go to a process pool, so one RoBERTa call cannot
+  stall every other request served by the same uvicorn worker.
+- Speech-to-text gets its own thread pool: a transcription holds a thread for
+  seconds to minutes and must not take the threads toxic scoring runs on.
+
+Every pool sits behind a bounded queue: when too many calls are waiting, new
+calls are rejected immediately with InferenceQueueFull instead of piling up.
+
+If a process worker dies (OOM kill, segfault), the calls in flight fail with
+BrokenProcessPool and the pool is dropped; the next call spawns a new one.
+"""
+import asyncio
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+from app.core.config import settings
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference queue is at capacity"""
+
+
+class _PoolMetrics:
+    """Queue depth and latency counters for one pool"""
+
+    def __init__(self, workers: int, window: int = 1000):
+        self.workers = workers
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+        self.latencies = deque(maxlen=window)
+
+    def record(self, latency: float, ok: bool):
+        if ok:
+            self.completed += 1
+        else:
+            self.failed += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.latencies.append(latency)
+
+    def snapshot(self) -> dict:
+        recent = sorted(self.latencies)
+
+        def percentile(p: float) -> float:
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(p * len(recent)))] * 1000
+
+        finished = self.completed + self.failed
+        return {
+            "workers": self.workers,
+            "in_flight": self.in_flight,
+            "queue_depth": max(0, self.in_flight - self.workers),
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "latency_ms": {
+                "avg": round(self.total_latency / finished * 1000, 3) if finished else 0.0,
+                "p50": round(percentile(0.50), 3),
+                "p95": round(percentile(0.95), 3),
+                "p99": round(percentile(0.99), 3),
+                "max": round(self.max_latency * 1000, 3),
+            },
+        }
+
+
+class InferenceExecutor:
+    """
+    Dedicated executor for model inference.
+
+    Usage:
+        executor = get_inference_executor()
+        probs = await executor.run_cpu(model.predict, texts)      # thread pool
+        result = await executor.run_model(analyze_sentiment, text)  # process pool
+        text = await executor.run_stt(engine.transcribe, audio)     # STT thread pool
+    """
+
+    def __init__(self, thread_workers: int = 2, process_workers: int = 1, max_queue: int = 64,
+                 stt_workers: int = 1, stt_max_queue: int = 8):
+        self.max_queue = max_queue
+        self.stt_max_queue = stt_max_queue
+        self._thread_pool = ThreadPoolExecutor(
+            max_workers=max(1, thread_workers),
+            thread_name_prefix="inference"
+        )
+        self._stt_pool = ThreadPoolExecutor(
+            max_workers=max(1, stt_workers),
+            thread_name_prefix="stt"
+        )
+        self._process_workers = process_workers
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+
+        self._cpu_metrics = _PoolMetrics(max(1, thread_workers))
+        # process_workers=0 runs transformer calls in the thread pool instead
+        self._model_metrics = _PoolMetrics(process_workers if process_workers > 0 else max(1, thread_workers))
+        self._stt_metrics = _PoolMetrics(max(1, stt_workers))
+
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        if self._process_pool is None:
+            # spawn: never fork a process that already runs the event loop and Motor threads
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=self._process_workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._process_pool
+
+    def _drop_process_pool(self, pool: ProcessPoolExecutor):
+        # Concurrent calls all fail on the same broken pool; only the first one drops it
+        if self._process_pool is pool:
+            print("⚠️ Inference process pool broke (worker died), respawning on next call")
+            self._process_pool = None
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _submit(self, pool, metrics: _PoolMetrics, fn: Callable, *args, max_queue: Optional[int] = None):
+        max_queue = max_queue or self.max_queue
+        if metrics.in_flight >= max_queue:
+            metrics.rejected += 1
+            raise InferenceQueueFull(f"Inference queue is full ({max_queue} pending calls)")
+
+        loop = asyncio.get_running_loop()
+        metrics.in_flight += 1
+        metrics.submitted += 1
+        start = time.perf_counter()
+        ok = False
+        try:
+            result = await loop.run_in_executor(pool, fn, *args)
+            ok = True
+            return result
+        finally:
+            metrics.in_flight -= 1
+            metrics.record(time.perf_counter() - start, ok)
+
+    async def run_cpu(self, fn: Callable, *args):
+        """Run a CPU-bound call (sklearn, numpy) in the inference thread pool"""
+        return await self._submit(self._thread_pool, self._cpu_metrics, fn, *args)
+
+    async def run_model(self, fn: Callable, *args):
+        """
+        Run a transformer call in the inference process pool.
+        `fn` and its arguments must be picklable (module-level functions).
+        """
+        if self._process_workers <= 0:
+            return await self._submit(self._thread_pool, self._model_metrics, fn, *args)
+        pool = self._get_process_pool()
+        try:
+            return await self._submit(pool, self._model_metrics, fn, *args)
+        except BrokenProcessPool:
+            self._drop_process_pool(pool)
+            raise
+
+    async def run_stt(self, fn: Callable, *args):
+        """Run a speech-to-text call in the STT thread pool (own workers and queue bound)"""
+        return await self._submit(self._stt_pool, self._stt_metrics, fn, *args, max_queue=self.stt_max_queue)
+
+    def metrics(self) -> dict:
+        """Queue depth and latency metrics for every pool"""
+        return {
+            "max_queue": self.max_queue,
+            "cpu": self._cpu_metrics.snapshot(),
+            "model": self._model_metrics.snapshot(),
+            "stt": {**self._stt_metrics.snapshot(), "max_queue": self.stt_max_queue},
+        }
+
+    def shutdown(self):
+        self._thread_pool.shutdown(wait=False, cancel_futures=True)
+        self._stt_pool.shutdown(wait=False, cancel_futures=True)
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+
+
+# Singleton instance
+_executor: Optional[InferenceExecutor] = None
+
+
+def get_inference_executor() -> InferenceExecutor:
+    """Get or create the inference executor"""
+    global _executor
+    if _executor is None:
+        _executor = InferenceExecutor(
+            thread_workers=settings.INFERENCE_THREAD_WORKERS,
+            process_workers=settings.INFERENCE_PROCESS_WORKERS,
+            max_queue=settings.INFERENCE_MAX_QUEUE,
+            stt_workers=settings.STT_WORKERS,
+            stt_max_queue=settings.STT_MAX_QUEUE
+        )
+    return _executor
+
+
+def shutdown_inference_executor():
+    """Release the worker pools (call on app shutdown)"""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown()
+        _executor = None
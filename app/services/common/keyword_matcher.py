@@ -0,0 +1,147 @@
+"""
+Sensitive Keyword Matcher
+Aho–Corasick automaton over every keyword and variation in `sensitive_keywords`.
+
+The old check ran one `re.search(rf"\\b{term}\\b")` per term and per comment
+(O(keywords × text)) after fetching the whole collection from Mongo. Here the
+automaton is built once, kept in memory, and a comment is scanned in a single
+linear pass that returns every hit with its severity.
+
+Matching keeps the previous semantics: case-insensitive, and a term only counts
+when it sits on `\\b` word boundaries.
+
+The process-wide matcher lives in the lexicon store
+(app/services/common/lexicon_store.py), which rebuilds it when keywords change.
+"""
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional
+
+
+@dataclass(frozen=True)
+class KeywordMatch:
+    """One sensitive term found in a text"""
+    term: str
+    keyword: str
+    severity: str  # hard | soft
+    category: Optional[str]
+    start: int
+    end: int
+
+
+def _is_word_char(ch: str) -> bool:
+    # Same definition as `\w` in Python's re module for str patterns
+    return ch.isalnum() or ch == "_"
+
+
+def _at_boundary(text: str, pos: int) -> bool:
+    """True if `\\b` matches at text[pos]"""
+    before = pos > 0 and _is_word_char(text[pos - 1])
+    after = pos < len(text) and _is_word_char(text[pos])
+    return before != after
+
+
+class AhoCorasick:
+    """
+    Multi-pattern string matcher.
+
+    Usage:
+        automaton = AhoCorasick([("kill", 0), ("killer", 1)])
+        for end, length, payload in automaton.iter(text):   # end is exclusive
+            ...
+    """
+
+    def __init__(self, patterns: Iterable[tuple[str, Any]]):
+        # Node i: transitions[i] (char -> node), fail[i], outputs[i] = [(length, payload)]
+        self.transitions: list[dict[str, int]] = [{}]
+        self.fail: list[int] = [0]
+        self.outputs: list[list[tuple[int, Any]]] = [[]]
+
+        for pattern, payload in patterns:
+            if pattern:
+                self._add(pattern, payload)
+        self._build_fail_links()
+
+    def __len__(self) -> int:
+        return sum(len(out) for out in self.outputs)
+
+    def _add(self, pattern: str, payload: Any):
+        node = 0
+        for ch in pattern:
+            nxt = self.transitions[node].get(ch)
+            if nxt is None:
+                nxt = len(self.transitions)
+                self.transitions.append({})
+                self.fail.append(0)
+                self.outputs.append([])
+                self.transitions[node][ch] = nxt
+            node = nxt
+        self.outputs[node].append((len(pattern), payload))
+
+    def _build_fail_links(self):
+        """Breadth-first: each node falls back to its longest proper suffix in the trie"""
+        queue = deque(self.transitions[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.transitions[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and ch not in self.transitions[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.transitions[fallback].get(ch, 0)
+                self.fail[child] = target if target != child else 0
+                # Inherit the suffix matches so iter() never walks the fail chain for outputs
+                self.outputs[child] = self.outputs[child] + self.outputs[self.fail[child]]
+
+    def iter(self, text: str):
+        """Yield (end, length, payload) for every occurrence, overlaps included"""
+        transitions, fail, outputs = self.transitions, self.fail, self.outputs
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in transitions[node]:
+                node = fail[node]
+            node = transitions[node].get(ch, 0)
+            if outputs[node]:
+                for length, payload in outputs[node]:
+                    yield i + 1, length, payload
+
+
+class SensitiveKeywordMatcher:
+    """
+    Compiled matcher for `sensitive_keywords` documents.
+
+    Usage:
+        matcher = SensitiveKeywordMatcher(await repo.get_all())
+        hits = matcher.match(content)   # list[KeywordMatch], keyword order
+    """
+
+    def __init__(self, keywords: list[dict]):
+        # One entry per (keyword, term), in collection order, so results keep
+        # the order the per-keyword loop used to produce
+        self.terms: list[tuple[str, str, str, Optional[str]]] = []
+        for kw in keywords:
+            base = kw["keyword"].lower()
+            variations = [v.lower() for v in kw.get("variations", [])]
+            for term in [base] + variations:
+                self.terms.append((term, kw["keyword"], kw["severity"], kw.get("category")))
+        self.automaton = AhoCorasick((term, index) for index, (term, *_) in enumerate(self.terms))
+
+    def match(self, text: str) -> list[KeywordMatch]:
+        """Every term present on word boundaries (first occurrence each), in keyword order"""
+        if not self.terms or not text:
+            return []
+        text = text.lower()
+        found: dict[int, tuple[int, int]] = {}
+        for end, length, index in self.automaton.iter(text):
+            if index in found:
+                continue
+            start = end - length
+            if _at_boundary(text, start) and _at_boundary(text, end):
+                found[index] = (start, end)
+
+        matches = []
+        for index in sorted(found):
+            term, keyword, severity, category = self.terms[index]
+            start, end = found[index]
+            matches.append(KeywordMatch(term, keyword, severity, category, start, end))
+        return matches
@@ -0,0 +1,279 @@
+"""
+Lexicon Store
+Process-wide, in-memory snapshot of the moderation lexicons:
+
+- `sensitive_keywords` -> compiled SensitiveKeywordMatcher (comment moderation)
+- `negative_lexicon`   -> {word: weight} + PhraseIndex (rule_based_scoring)
+
+Loaded once at startup, then kept fresh in the background:
+
+1. Mongo change stream (replica sets / Atlas): each insert / update / replace /
+   delete is applied to the in-memory documents and only the affected lexicon
+   is rebuilt. No re-read of the collection.
+2. Fallback (standalone mongod, mongomock): poll the version stamps in
+   `lexicon_versions` every LEXICON_POLL_SECONDS and reload a collection when
+   its stamp moved, plus a full reload every LEXICON_FULL_RELOAD_SECONDS for
+   writes made outside the app. Writers call `notify_lexicon_changed()`.
+
+Readers get the current snapshot with a plain attribute read (`store.snapshot`),
+never a database round-trip. A snapshot is immutable; refreshes swap in a new one.
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from app.core.config import settings
+from app.services.common.keyword_matcher import SensitiveKeywordMatcher
+from app.services.common.phrase_index import PhraseIndex
+
+SENSITIVE_KEYWORDS = "sensitive_keywords"
+NEGATIVE_LEXICON = "negative_lexicon"
+LEXICON_COLLECTIONS = (SENSITIVE_KEYWORDS, NEGATIVE_LEXICON)
+VERSIONS_COLLECTION = "lexicon_versions"
+
+CHANGE_STREAM = "change_stream"
+POLLING = "polling"
+
+
+@dataclass(frozen=True)
+class LexiconSnapshot:
+    """Immutable view of both lexicons at one point in time"""
+    keyword_matcher: SensitiveKeywordMatcher = field(default_factory=lambda: SensitiveKeywordMatcher([]))
+    negative_lexicon: Mapping[str, float] = field(default_factory=lambda: MappingProxyType({}))
+    negative_phrases: PhraseIndex = field(default_factory=lambda: PhraseIndex({}))
+    version: int = 0
+    loaded_at: Optional[datetime] = None
+
+
+def build_negative_lexicon(docs) -> dict[str, float]:
+    """{word: weight} from negative_lexicon documents (same rules as load_lexicon_from_mongo_async)"""
+    lex: dict[str, float] = {}
+    for doc in docs:
+        word = doc.get("word")
+        if not word:
+            continue
+        try:
+            lex[word] = float(doc.get("weight", 0.0))
+        except (TypeError, ValueError):
+            lex[word] = 0.0
+    return lex
+
+
+class LexiconStore:
+    """
+    Usage:
+        store = get_lexicon_store()
+        await store.start(db)                        # app startup
+        snapshot = await store.ensure_loaded(db)     # request path (no I/O once loaded)
+        hits = snapshot.keyword_matcher.match(text)
+    """
+
+    def __init__(self):
+        self.snapshot = LexiconSnapshot()
+        self.mode: Optional[str] = None
+        self._db = None
+        self._docs: dict[str, dict] = {name: {} for name in LEXICON_COLLECTIONS}
+        self._stamps: dict[str, int] = {}
+        self._last_full_reload = 0.0
+        self._load_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self.changes_applied = 0
+        self.reloads = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self.snapshot.loaded_at is not None
+
+    # ----- loading -----
+
+    def _lock(self) -> asyncio.Lock:
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+        return self._load_lock
+
+    async def reload(self, collections=LEXICON_COLLECTIONS):
+        """Re-read the given collections and publish a new snapshot"""
+        async with self._lock():
+            await self._reload(collections)
+
+    async def _reload(self, collections):
+        for name in collections:
+            docs = await self._db[name].find().to_list(length=None)
+            self._docs[name] = {doc["_id"]: doc for doc in docs}
+        self._publish(collections)
+        if set(collections) == set(LEXICON_COLLECTIONS):
+            self._last_full_reload = time.monotonic()
+        self.reloads += 1
+
+    async def ensure_loaded(self, db) -> LexiconSnapshot:
+        """Current snapshot; loads it on first use if startup has not done so yet"""
+        if not self.loaded:
+            if self._db is None:
+                self._db = db
+            async with self._lock():
+                # Concurrent first requests wait for a single load
+                if not self.loaded:
+                    await self._reload(LEXICON_COLLECTIONS)
+        return self.snapshot
+
+    def _publish(self, changed):
+        """Rebuild the lexicons touched by a change and swap in a new snapshot"""
+        current = self.snapshot
+        keyword_matcher = current.keyword_matcher
+        negative_lexicon = current.negative_lexicon
+        negative_phrases = current.negative_phrases
+        if SENSITIVE_KEYWORDS in changed:
+            keyword_matcher = SensitiveKeywordMatcher(list(self._docs[SENSITIVE_KEYWORDS].values()))
+        if NEGATIVE_LEXICON in changed:
+            negative_lexicon = MappingProxyType(build_negative_lexicon(self._docs[NEGATIVE_LEXICON].values()))
+            negative_phrases = PhraseIndex(negative_lexicon)
+        self.snapshot = LexiconSnapshot(
+            keyword_matcher=keyword_matcher,
+            negative_lexicon=negative_lexicon,
+            negative_phrases=negative_phrases,
+            version=current.version + 1,
+            loaded_at=datetime.utcnow(),
+        )
+
+    # ----- background refresh -----
+
+    async def start(self, db):
+        """Load both lexicons and keep them fresh in the background"""
+        self._db = db
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    async def _run(self):
+        # Initial load, retried until Mongo answers
+        while not self.loaded:
+            try:
+                await self.reload()
+                print(f"✅ Lexicons loaded: {self.status()['counts']}")
+            except Exception as e:
+                print(f"⚠️ Lexicon load failed: {e}, retrying in {settings.LEXICON_POLL_SECONDS}s")
+                await asyncio.sleep(settings.LEXICON_POLL_SECONDS)
+
+        while True:
+            try:
+                await self._watch_changes()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if self.mode != CHANGE_STREAM:
+                    print(f"ℹ️ Lexicon change stream unavailable ({e}); polling every {settings.LEXICON_POLL_SECONDS}s")
+                    self.mode = POLLING
+                    await self._poll_changes()
+                    return
+                print(f"⚠️ Lexicon change stream interrupted: {e}")
+                self.mode = None
+                await asyncio.sleep(1)
+
+    async def _watch_changes(self):
+        pipeline = [{"$match": {"ns.coll": {"$in": list(LEXICON_COLLECTIONS)}}}]
+        async with self._db.watch(pipeline, full_document="updateLookup") as stream:
+            # The first call opens the cursor: unsupported deployments fail here
+            change = await stream.try_next()
+            self.mode = CHANGE_STREAM
+            # Writes between the initial load and the stream opening are not in the stream
+            await self.reload()
+            while True:
+                if change is not None:
+                    await self._apply_change(change)
+                change = await stream.next()
+
+    async def _apply_change(self, change: dict):
+        """Apply one change event to the in-memory documents"""
+        name = change.get("ns", {}).get("coll")
+        operation = change.get("operationType")
+        if name not in self._docs:
+            return
+        if operation in ("insert", "update", "replace", "delete"):
+            doc_id = change["documentKey"]["_id"]
+            doc = change.get("fullDocument")
+            async with self._lock():
+                if operation == "delete" or doc is None:
+                    self._docs[name].pop(doc_id, None)
+                else:
+                    self._docs[name][doc_id] = doc
+                self._publish((name,))
+                self.changes_applied += 1
+        else:
+            # drop / rename / invalidate: start over from the collection
+            await self.reload((name,))
+
+    async def _read_stamps(self) -> dict[str, int]:
+        docs = await self._db[VERSIONS_COLLECTION].find(
+            {"_id": {"$in": list(LEXICON_COLLECTIONS)}}
+        ).to_list(length=None)
+        return {doc["_id"]: doc.get("version", 0) for doc in docs}
+
+    async def _poll_changes(self):
+        self._stamps = await self._read_stamps()
+        while True:
+            await asyncio.sleep(settings.LEXICON_POLL_SECONDS)
+            try:
+                await self.poll_once()
+            except Exception as e:
+                print(f"⚠️ Lexicon poll failed: {e}")
+
+    async def poll_once(self):
+        """One polling step: reload collections whose version stamp moved"""
+        if time.monotonic() - self._last_full_reload >= settings.LEXICON_FULL_RELOAD_SECONDS:
+            self._stamps = await self._read_stamps()
+            await self.reload()
+            return
+        stamps = await self._read_stamps()
+        changed = [name for name in LEXICON_COLLECTIONS if stamps.get(name) != self._stamps.get(name)]
+        self._stamps = stamps
+        if changed:
+            await self.reload(changed)
+
+    async def notify_changed(self, db, collection: str):
+        """
+        Called after a write to a lexicon collection: bumps its version stamp
+        (for polling workers) and refreshes this process right away.
+        """
+        await db[VERSIONS_COLLECTION].update_one(
+            {"_id": collection},
+            {"$inc": {"version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        if self._db is None:
+            self._db = db
+        if self.loaded:
+            await self.reload((collection,))
+
+    def status(self) -> dict:
+        snapshot = self.snapshot
+        return {
+            "mode": self.mode,
+            "version": snapshot.version,
+            "loaded_at": snapshot.loaded_at.isoformat() if snapshot.loaded_at else None,
+            "counts": {name: len(docs) for name, docs in self._docs.items()},
+            "changes_applied": self.changes_applied,
+            "reloads": self.reloads,
+        }
+
+
+# Singleton instance
+_store: Optional[LexiconStore] = None
+
+
+def get_lexicon_store() -> LexiconStore:
+    """Get or create the lexicon store"""
+    global _store
+    if _store is None:
+        _store = LexiconStore()
+    return _store
+
+
+async def notify_lexicon_changed(db, collection: str):
+    """Shortcut for repositories writing to a lexicon collection"""
+    await get_lexicon_store().notify_changed(db, collection)
@@ -0,0 +1,90 @@
+"""
+Micro-batcher
+Collects concurrent single-item requests for a short window and runs them
+through the model as one batch.
+
+A batch is flushed when it reaches `max_batch_size` or when the oldest item
+has waited `window_ms`, whichever comes first. Each caller still awaits its
+own result.
+"""
+import asyncio
+from typing import Awaitable, Callable, Optional
+
+
+class MicroBatcher:
+    """
+    Usage:
+        batcher = MicroBatcher(run_batch, max_batch_size=16, window_ms=5)
+        result = await batcher.submit(text)
+
+    `run_batch` is an async callable taking a list of items and returning a
+    list of results in the same order.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[list], Awaitable[list]],
+        max_batch_size: int = 16,
+        window_ms: float = 5.0
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.window = max(0.0, window_ms) / 1000
+        self._pending: list[tuple[object, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item):
+        """Queue one item and wait for its result"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch = self._pending[:self.max_batch_size]
+        self._pending = self._pending[self.max_batch_size:]
+        if self._pending:
+            # Leftovers start a new window right away
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+
+        asyncio.get_running_loop().create_task(self._run(batch))
+
+    async def _run(self, batch: list):
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self.run_batch([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def metrics(self) -> dict:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "window_ms": self.window * 1000,
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+        }
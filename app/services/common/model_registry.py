@@ -0,0 +1,137 @@
+"""
+Model Registry
+Loads AI models in the background after startup and tracks their readiness.
+
+Workers start serving immediately (auth, journals, posts...) while models load.
+Routes that need a model call `require()` to get a fast 503 until it is ready,
+or check `is_ready()` to fall back to a cheaper path.
+"""
+import asyncio
+import time
+from typing import Awaitable, Callable, Optional, Union
+from fastapi import HTTPException
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class _ModelEntry:
+    def __init__(self, name: str, loader: Callable, required: bool):
+        self.name = name
+        self.loader = loader
+        self.required = required
+        self.status = PENDING
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "required": self.required,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "error": self.error,
+        }
+
+
+class ModelRegistry:
+    """
+    Usage:
+        registry = get_model_registry()
+        registry.register("toxic", toxic_service.load)
+        await registry.start()          # returns immediately, loading continues in background
+        registry.require("toxic")       # raises 503 until loaded
+    """
+
+    def __init__(self):
+        self._models: dict[str, _ModelEntry] = {}
+
+    def register(self, name: str, loader: Union[Callable[[], None], Callable[[], Awaitable[None]]], required: bool = True):
+        """
+        Register a model loader.
+        Sync loaders run in a thread; async loaders are awaited on the event loop.
+        A loader signals failure by raising or by returning False.
+        """
+        self._models[name] = _ModelEntry(name, loader, required)
+
+    async def start(self):
+        """Kick off background loading of every registered model"""
+        for entry in self._models.values():
+            if entry.task is None and entry.status == PENDING:
+                entry.task = asyncio.create_task(self._load(entry))
+
+    async def _load(self, entry: _ModelEntry):
+        entry.status = LOADING
+        start = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(entry.loader):
+                result = await entry.loader()
+            else:
+                result = await asyncio.to_thread(entry.loader)
+            if result is False:
+                raise RuntimeError("loader reported failure")
+            entry.status = READY
+            print(f"✅ Model '{entry.name}' ready")
+        except asyncio.CancelledError:
+            entry.status = PENDING
+            raise
+        except Exception as e:
+            entry.status = FAILED
+            entry.error = str(e)
+            print(f"❌ Model '{entry.name}' failed to load: {e}")
+        finally:
+            entry.load_seconds = time.perf_counter() - start
+
+    async def stop(self):
+        for entry in self._models.values():
+            if entry.task is not None and not entry.task.done():
+                entry.task.cancel()
+
+    def is_ready(self, name: str) -> bool:
+        entry = self._models.get(name)
+        return entry is not None and entry.status == READY
+
+    def is_loading(self, name: str) -> bool:
+        """True while a registered model has not finished loading (ready or failed)"""
+        entry = self._models.get(name)
+        return entry is not None and entry.status in (PENDING, LOADING)
+
+    def mark_ready(self, name: str):
+        """A model that failed at startup was loaded later (e.g. admin hot reload)"""
+        entry = self._models.get(name)
+        if entry is not None and entry.status != READY:
+            entry.status = READY
+            entry.error = None
+
+    def require(self, name: str):
+        """Raise 503 (with Retry-After) unless the model is ready"""
+        entry = self._models.get(name)
+        if entry is not None and entry.status == READY:
+            return
+        status = entry.status if entry is not None else "not registered"
+        raise HTTPException(
+            status_code=503,
+            detail=f"Model '{name}' is not ready ({status})",
+            headers={"Retry-After": "5"}
+        )
+
+    def all_ready(self) -> bool:
+        """True when every required model is loaded"""
+        return all(entry.status == READY for entry in self._models.values() if entry.required)
+
+    def status(self) -> dict:
+        return {name: entry.to_dict() for name, entry in self._models.items()}
+
+
+# Singleton instance
+_registry: Optional[ModelRegistry] = None
+
+
+def get_model_registry() -> ModelRegistry:
+    """Get or create the model registry"""
+    global _registry
+    if _registry is None:
+        _registry = ModelRegistry()
+    return _registry
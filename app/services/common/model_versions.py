@@ -0,0 +1,158 @@
+"""
+Model Versions
+Versioned layout for the toxic model artifacts, shared by Only_Model/auto_train.py
+(publishing) and ToxicDetectionService (loading / hot-swapping).
+
+    Only_Model/models/
+        CURRENT                     <- name of the active version
+        versions/
+            20261016-231000/
+                manifest.json       <- version, created_at, labels, files + sha256, training info
+                lr_models.pkl  tfidf_word.pkl  tfidf_char.pkl
+                compact/
+
+- A version directory is written under a staging name and renamed into place
+  once complete, so a reader never sees half a version.
+- CURRENT is replaced atomically (write + os.replace); every worker process
+  polls it and swaps to the new version on its own.
+- Without CURRENT the flat legacy layout (pickles directly in models/) is used.
+
+No app settings are imported here: the training script uses this module
+outside the FastAPI process.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+CURRENT_FILE = "CURRENT"
+VERSIONS_DIR = "versions"
+MANIFEST_FILE = "manifest.json"
+
+_VERSION_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+
+def new_version_id(models_dir) -> str:
+    """UTC timestamp, suffixed if a version with that name already exists"""
+    base = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    version, n = base, 1
+    while (Path(models_dir) / VERSIONS_DIR / version).exists():
+        n += 1
+        version = f"{base}-{n}"
+    return version
+
+
+def version_dir(models_dir, version: str) -> Path:
+    if not _VERSION_NAME.match(version or ""):
+        raise ValueError(f"Invalid model version name: {version!r}")
+    return Path(models_dir) / VERSIONS_DIR / version
+
+
+def read_current(models_dir) -> Optional[str]:
+    """Active version name, or None for the legacy flat layout"""
+    try:
+        version = (Path(models_dir) / CURRENT_FILE).read_text(encoding="utf-8").strip()
+    except FileNotFoundError:
+        return None
+    return version or None
+
+
+def read_manifest(path) -> dict:
+    with open(Path(path) / MANIFEST_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def resolve_model_dir(models_dir, version: Optional[str] = None) -> tuple[Path, Optional[dict]]:
+    """
+    Directory holding the artifacts to load and its manifest.
+    `version=None` follows CURRENT; without CURRENT returns (models_dir, None).
+
+    Raises:
+        FileNotFoundError: the version does not exist or has no manifest
+    """
+    version = version or read_current(models_dir)
+    if version is None:
+        return Path(models_dir), None
+    path = version_dir(models_dir, version)
+    if not (path / MANIFEST_FILE).exists():
+        raise FileNotFoundError(f"Model version '{version}' not found in {Path(models_dir) / VERSIONS_DIR}")
+    return path, read_manifest(path)
+
+
+def list_versions(models_dir) -> list[dict]:
+    """Manifests of all published versions, newest first, with an `active` flag"""
+    root = Path(models_dir) / VERSIONS_DIR
+    current = read_current(models_dir)
+    versions = []
+    if root.exists():
+        for path in root.iterdir():
+            if path.is_dir() and (path / MANIFEST_FILE).exists():
+                manifest = read_manifest(path)
+                manifest["active"] = manifest.get("version") == current
+                versions.append(manifest)
+    versions.sort(key=lambda m: (m.get("created_at", ""), m.get("version", "")), reverse=True)
+    return versions
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def staging_dir(models_dir) -> Path:
+    """Empty directory to write a new version into (not visible to loaders)"""
+    path = Path(models_dir) / VERSIONS_DIR / f".staging-{os.getpid()}-{datetime.utcnow():%H%M%S%f}"
+    path.mkdir(parents=True)
+    return path
+
+
+def publish_version(models_dir, staged: Path, info: Optional[dict] = None, activate: bool = True) -> str:
+    """
+    Write the manifest for a staged directory, move it into place and
+    (optionally) point CURRENT at it. Returns the version name.
+    """
+    version = new_version_id(models_dir)
+    files = {
+        str(path.relative_to(staged)): {"size": path.stat().st_size, "sha256": _sha256(path)}
+        for path in sorted(staged.rglob("*")) if path.is_file()
+    }
+    manifest = {
+        "version": version,
+        "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+        "files": files,
+        **(info or {}),
+    }
+    with open(staged / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(staged, version_dir(models_dir, version))
+    if activate:
+        activate_version(models_dir, version)
+    return version
+
+
+def activate_version(models_dir, version: str):
+    """Point CURRENT at an existing version (atomic replace)"""
+    if not (version_dir(models_dir, version) / MANIFEST_FILE).exists():
+        raise FileNotFoundError(f"Model version '{version}' not found")
+    tmp = Path(models_dir) / f".{CURRENT_FILE}.{os.getpid()}.tmp"
+    tmp.write_text(version + "\n", encoding="utf-8")
+    os.replace(tmp, Path(models_dir) / CURRENT_FILE)
+
+
+def prune_versions(models_dir, keep: int) -> list[str]:
+    """Delete all but the `keep` newest versions (never the active one); returns the removed names"""
+    current = read_current(models_dir)
+    removed = []
+    for manifest in list_versions(models_dir)[keep:]:
+        if manifest["version"] == current:
+            continue
+        shutil.rmtree(version_dir(models_dir, manifest["version"]), ignore_errors=True)
+        removed.append(manifest["version"])
+    return removed
@@ -0,0 +1,311 @@
+"""
+Moderation Cascade
+Tiered content moderation: cheap checks first, models only when needed.
+
+Stages run in the order given by MODERATION_STAGES (default
+"lexicon,patterns,tfidf,phobert"):
+
+1. lexicon  - sensitive keyword automaton (lexicon store snapshot, no I/O).
+              A hard keyword blocks right away; a soft one flags for review.
+2. patterns - link / phone number regexes. Flags for review and keeps going,
+              the model may still block.
+3. tfidf    - TF-IDF + Logistic Regression, all pending texts in one pass.
+              Clean -> Approved, severe or confident -> Blocked (both final);
+              the grey zone in between stays Pending.
+4. phobert  - PhoBERT hybrid check, only for the grey zone of the previous
+              stage and only when a model is configured and loaded. A clearly
+              safe score approves the text, anything else stays Pending.
+              Only an export_quantized() model marked fine_tuned is accepted:
+              a base checkpoint gets a random head and would approve at random.
+
+A stage only sees the texts no earlier stage has decided, so the average post
+never reaches the expensive stages. Per-stage counts and latency are kept for
+/ai/metrics.
+
+Without a PhoBERT model the decisions match the previous inline checks in
+AnonPostService.create_post.
+"""
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from app.core.config import settings
+from app.services.common.inference_executor import get_inference_executor
+from app.services.common.lexicon_store import get_lexicon_store
+from app.services.common.model_registry import get_model_registry
+from app.services.common.toxic_detection_service import get_toxic_detection_service
+
+LINK_PATTERN = re.compile(r"(https?:\/\/\S+|(?:www\.)?[a-zA-Z0-9-]+\.[a-z]{2,}(\/\S*)?)", re.IGNORECASE)
+PHONE_PATTERN = re.compile(r"\b(?:\+?\d[\d\-\s]{8,14}\d)\b")
+
+SEVERE_TOXIC_TYPES = ("severe_toxic", "threat", "identity_hate")
+
+PHOBERT_MODEL = "phobert"  # model registry name
+
+_ACTION_RANK = {"Approved": 0, "Pending": 1, "Blocked": 2}
+
+
+@dataclass
+class ModerationDecision:
+    """Outcome for one text; field names follow the post / moderation log documents"""
+    text: str
+    action: str = "Approved"
+    scan_result: str = "Safe"
+    reason: Optional[str] = None         # main reason (keyword / model)
+    flags: list[str] = field(default_factory=list)  # appended as " | <flag>"
+    toxic_labels: list[str] = field(default_factory=list)
+    toxic_confidence: float = 0.0
+    toxic_predictions: dict = field(default_factory=dict)
+    model_version: Optional[str] = None  # TF-IDF model that scored the text
+    keywords: list[str] = field(default_factory=list)
+    decided_by: Optional[str] = None     # stage that short-circuited the cascade
+    stages: list[str] = field(default_factory=list)
+
+    @property
+    def flagged_reason(self) -> Optional[str]:
+        if not self.flags:
+            return self.reason
+        return (self.reason or "") + "".join(f" | {flag}" for flag in self.flags)
+
+    @property
+    def detected_keywords(self) -> list[str]:
+        return self.toxic_labels + [kw for kw in self.keywords if kw not in self.toxic_labels]
+
+    def escalate(self, action: str, scan_result: str):
+        if _ACTION_RANK[action] > _ACTION_RANK[self.action]:
+            self.action = action
+            self.scan_result = scan_result
+
+
+class _StageStats:
+    def __init__(self):
+        self.batches = 0
+        self.items = 0
+        self.decided = 0
+        self.flagged = 0
+        self.seconds = 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "decided": self.decided,
+            "flagged": self.flagged,
+            "hit_rate": round(self.decided / self.items, 4) if self.items else 0.0,
+            "avg_ms_per_item": round(self.seconds / self.items * 1000, 3) if self.items else 0.0,
+            "total_seconds": round(self.seconds, 3),
+        }
+
+
+class ModerationCascade:
+    """
+    Usage:
+        cascade = get_moderation_cascade()
+        decision = await cascade.moderate(content, db=self.db)
+        decisions = await cascade.moderate_batch(texts, db=self.db)
+    """
+
+    def __init__(self, stages: Optional[list[str]] = None):
+        names = stages if stages is not None else [
+            name.strip() for name in settings.MODERATION_STAGES.split(",") if name.strip()
+        ]
+        self._runners = {
+            "lexicon": self._lexicon_stage,
+            "patterns": self._pattern_stage,
+            "tfidf": self._tfidf_stage,
+            "phobert": self._phobert_stage,
+        }
+        unknown = [name for name in names if name not in self._runners]
+        if unknown:
+            raise ValueError(f"Unknown moderation stages: {unknown}")
+        self.stages = names
+        self.stats = {name: _StageStats() for name in names}
+        self.toxic_service = get_toxic_detection_service()
+        self.phobert = None  # PhoBERTWithAttentionWrapper, set by load_phobert()
+
+    # ----- public API -----
+
+    async def moderate(self, text: str, db=None) -> ModerationDecision:
+        return (await self.moderate_batch([text], db=db))[0]
+
+    async def moderate_batch(self, texts: list[str], db=None) -> list[ModerationDecision]:
+        """Run every text through the cascade; each stage gets the undecided ones as one batch"""
+        decisions = [ModerationDecision(text=text) for text in texts]
+        pending = list(decisions)
+        if db is not None and "lexicon" in self.stages:
+            await get_lexicon_store().ensure_loaded(db)
+
+        for name in self.stages:
+            if not pending:
+                break
+            stats = self.stats[name]
+            start = time.perf_counter()
+            decided = await self._runners[name](pending)
+            stats.seconds += time.perf_counter() - start
+            stats.batches += 1
+            stats.items += len(pending)
+            stats.decided += len(decided)
+            for decision in pending:
+                decision.stages.append(name)
+                if decision.action != "Approved" and id(decision) not in decided:
+                    stats.flagged += 1
+            for decision in pending:
+                if id(decision) in decided:
+                    decision.decided_by = name
+            pending = [decision for decision in pending if id(decision) not in decided]
+
+        return decisions
+
+    def metrics(self) -> dict:
+        return {
+            "stages": self.stages,
+            "phobert_loaded": self.phobert is not None,
+            "stats": {name: stats.snapshot() for name, stats in self.stats.items()},
+        }
+
+    # ----- stages: each returns the ids of the decisions it finalized -----
+
+    async def _lexicon_stage(self, pending: list[ModerationDecision]) -> set[int]:
+        matcher = get_lexicon_store().snapshot.keyword_matcher
+        decided = set()
+        for decision in pending:
+            for hit in matcher.match(decision.text):
+                decision.keywords.append(hit.term)
+                if hit.severity == "hard":
+                    decision.escalate("Blocked", "Unsafe")
+                    decision.reason = f"Hard block keyword detected: {hit.term}"
+                    decided.add(id(decision))
+                    break
+                if hit.severity == "soft" and decision.action == "Approved":
+                    decision.escalate("Pending", "Suspicious")
+                    decision.reason = f"Soft block keyword detected: {hit.term}"
+        return decided
+
+    async def _pattern_stage(self, pending: list[ModerationDecision]) -> set[int]:
+        for decision in pending:
+            if LINK_PATTERN.search(decision.text):
+                decision.escalate("Pending", "Suspicious")
+                decision.flags.append("Contains link")
+            if PHONE_PATTERN.search(decision.text):
+                decision.escalate("Pending", "Suspicious")
+                decision.flags.append("Contains phone number")
+        return set()
+
+    async def _tfidf_stage(self, pending: list[ModerationDecision]) -> set[int]:
+        if not await self.toxic_service.check_health():
+            for decision in pending:
+                self._mark_unscanned(decision, "Not Scanned", "AI service unavailable - manual review required")
+            return set()
+
+        try:
+            results = await self.toxic_service.analyze_texts([d.text for d in pending], threshold=0.5)
+        except Exception as e:
+            for decision in pending:
+                self._mark_unscanned(decision, "Error", f"AI scan error: {str(e)}")
+            return set()
+
+        decided = set()
+        for decision, result in zip(pending, results):
+            if result.label == "ERROR":
+                self._mark_unscanned(decision, "Error", "AI scan error")
+                continue
+            decision.toxic_labels = result.toxic_labels
+            decision.toxic_confidence = result.confidence
+            decision.toxic_predictions = result.predictions
+            decision.model_version = result.model_version
+
+            if not result.is_violation:
+                # Clean for the model: decided unless an earlier stage flagged it
+                if decision.action == "Approved":
+                    decided.add(id(decision))
+                continue
+
+            labels = ", ".join(result.toxic_labels)
+            has_severe = any(label in result.toxic_labels for label in SEVERE_TOXIC_TYPES)
+            if has_severe or result.confidence >= settings.MODERATION_BLOCK_CONFIDENCE:
+                decision.escalate("Blocked", "Unsafe")
+                decision.reason = f"AI detected toxic content: {labels} (confidence: {result.confidence:.2%})"
+                decided.add(id(decision))
+            else:
+                decision.escalate("Pending", "Suspicious")
+                decision.reason = f"AI flagged for review: {labels} (confidence: {result.confidence:.2%})"
+        return decided
+
+    async def _phobert_stage(self, pending: list[ModerationDecision]) -> set[int]:
+        if self.phobert is None or not get_model_registry().is_ready(PHOBERT_MODEL):
+            return set()
+        # Only the model's grey zone: toxic-but-not-confident, nothing else flagged it
+        grey = [d for d in pending if d.toxic_labels and d.action == "Pending" and not d.flags and not d.keywords]
+        if not grey:
+            return set()
+
+        from app.models.text_classtification.text_classtification import (
+            hybrid_safety_check_batch, preprocess_text
+        )
+        lexicon = get_lexicon_store().snapshot.negative_phrases
+        texts = [preprocess_text(d.text) for d in grey]
+        try:
+            results = await get_inference_executor().run_cpu(
+                hybrid_safety_check_batch, texts, lexicon, self.phobert, 0.5
+            )
+        except Exception as e:
+            print(f"⚠️ PhoBERT stage failed, keeping TF-IDF decision: {e}")
+            return set()
+
+        decided = set()
+        for decision, result in zip(grey, results):
+            if result.get("method") != "hybrid":
+                continue
+            if result["safety_score"] >= settings.MODERATION_PHOBERT_CLEAR_SCORE:
+                decision.action = "Approved"
+                decision.scan_result = "Safe"
+                decision.reason = None
+                decided.add(id(decision))
+        return decided
+
+    @staticmethod
+    def _mark_unscanned(decision: ModerationDecision, scan_result: str, reason: str):
+        # Same as before: approve, but leave a trace for manual review
+        if decision.action == "Approved":
+            decision.scan_result = scan_result
+        if decision.reason is None:
+            decision.reason = reason
+
+    # ----- PhoBERT model -----
+
+    def load_phobert(self) -> bool:
+        """
+        Load the PhoBERT stage model from MODERATION_PHOBERT_MODEL (blocking).
+        Must be an export_quantized(fine_tuned=True) directory: this stage
+        approves posts, and any other checkpoint scores with a random head.
+        """
+        import json
+        from pathlib import Path
+        from app.models.text_classtification.text_classtification import (
+            EXPORT_MANIFEST, PhoBERTWithAttentionWrapper
+        )
+        path = settings.MODERATION_PHOBERT_MODEL
+        if not path:
+            return False
+        manifest_path = Path(path) / EXPORT_MANIFEST
+        if not manifest_path.exists():
+            raise RuntimeError(f"{path} is not an export_quantized() directory; "
+                               "a base checkpoint has an untrained head, PhoBERT stage disabled")
+        with manifest_path.open(encoding="utf-8") as fh:
+            if not json.load(fh).get("fine_tuned"):
+                raise RuntimeError(f"{manifest_path} is not marked fine_tuned, PhoBERT stage disabled")
+        self.phobert = PhoBERTWithAttentionWrapper.load_exported(path)
+        return True
+
+
+# Singleton instance
+_cascade: Optional[ModerationCascade] = None
+
+
+def get_moderation_cascade() -> ModerationCascade:
+    """Get or create the moderation cascade"""
+    global _cascade
+    if _cascade is None:
+        _cascade = ModerationCascade()
+    return _cascade
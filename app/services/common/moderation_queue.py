@@ -0,0 +1,318 @@
+"""
+Moderation Queue
+Mongo-backed job queue for asynchronous moderation (ASYNC_MODERATION=true).
+
+Write paths save the content as Pending / SCAN_QUEUED, call `enqueue()` and
+return right away. The background worker claims queued jobs in batches and
+hands each content type's jobs to its registered handler in one call, so the
+classifier scores the whole batch in a single vectorized pass. Voice journals
+use the same queue ("journal" jobs) for deferred transcription and sentiment,
+drained by their own worker one job at a time (get_journal_worker), so a slow
+transcription never holds up post and comment moderation.
+
+Jobs live in `moderation_jobs`:
+    {content_type, content_id, user_id, text, status, attempts,
+     available_at, locked_until, created_at, error}
+
+- Claiming is one find_one_and_update per job, so several workers (uvicorn
+  processes) can drain the same queue without double processing.
+- A claimed job holds a lease (MODERATION_JOB_LEASE_SECONDS), renewed while
+  its handler runs; jobs of a worker that died are claimed again once the
+  lease expires.
+- A worker only claims the content types it has handlers for.
+- Finished jobs are deleted; failed ones are retried with backoff and kept as
+  `failed` after MODERATION_JOB_MAX_ATTEMPTS, when the content type's
+  `on_failed` handler (if registered) finalizes the content.
+- There is at most one job per content (unique content_type + content_id), so
+  startup recovery (`requeue()`) can run in every process at once.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from app.core.config import settings
+
+JOBS_COLLECTION = "moderation_jobs"
+
+QUEUED = "queued"
+PROCESSING = "processing"
+FAILED = "failed"
+
+# ai_scan_result of content waiting for the worker. Distinct from the
+# cascade's "Not Scanned" (decided without a model); admin decisions clear it
+# so the worker never overwrites them.
+SCAN_QUEUED = "Queued"
+
+# handler(db, jobs) - moderates the jobs' content and writes the results
+JobHandler = Callable[[object, list[dict]], Awaitable[None]]
+
+
+def _new_job(content_type: str, content_id, user_id, text: str) -> dict:
+    now = datetime.utcnow()
+    return {
+        "content_type": content_type,
+        "content_id": content_id,
+        "user_id": str(user_id),
+        "text": text,
+        "status": QUEUED,
+        "attempts": 0,
+        "available_at": now,
+        "locked_until": None,
+        "created_at": now,
+    }
+
+
+def _wake_workers(content_type: str):
+    for worker in (_worker, _journal_worker):
+        if worker is not None and worker.handles(content_type):
+            worker.wake()
+
+
+async def enqueue(db, content_type: str, content_id, user_id, text: str) -> dict:
+    """Queue one piece of content for moderation and wake the local worker"""
+    job = _new_job(content_type, content_id, user_id, text)
+    result = await db[JOBS_COLLECTION].insert_one(job)
+    job["_id"] = result.inserted_id
+    _wake_workers(content_type)
+    return job
+
+
+async def requeue(db, content_type: str, content_id, user_id, text: str) -> bool:
+    """
+    Queue content unless it already has a job (queued, running or failed).
+    Idempotent, for startup recovery; returns True if a job was created.
+    """
+    try:
+        result = await db[JOBS_COLLECTION].update_one(
+            {"content_type": content_type, "content_id": content_id},
+            {"$setOnInsert": _new_job(content_type, content_id, user_id, text)},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False  # another process queued it first
+    if result.upserted_id is None:
+        return False
+    _wake_workers(content_type)
+    return True
+
+
+class ModerationWorker:
+    """
+    Usage:
+        worker = get_moderation_worker()
+        worker.register("post", handle_posts)
+        await worker.start(db, wait_for=lambda: registry.is_loading("toxic"))
+        await worker.stop()             # app shutdown
+    """
+
+    def __init__(self, name: str = "moderation", batch_size: Optional[int] = None):
+        self.name = name
+        self.batch_size = batch_size  # jobs claimed per round; None = MODERATION_WORKER_BATCH
+        self._handlers: dict[str, JobHandler] = {}
+        self._on_failed: dict[str, JobHandler] = {}
+        self._db = None
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._wait_for: Optional[Callable[[], bool]] = None
+        self.batches = 0
+        self.processed = 0
+        self.failed = 0
+        self.last_lag_seconds: Optional[float] = None
+
+    def register(self, content_type: str, handler: JobHandler, on_failed: Optional[JobHandler] = None):
+        """`on_failed(db, jobs)` runs for jobs that used up their attempts"""
+        self._handlers[content_type] = handler
+        if on_failed is not None:
+            self._on_failed[content_type] = on_failed
+
+    def handles(self, content_type: str) -> bool:
+        return content_type in self._handlers
+
+    async def start(self, db, wait_for: Optional[Callable[[], bool]] = None):
+        """
+        Start draining the queue. While `wait_for()` returns True (e.g. the
+        toxic model is still loading) no jobs are claimed, so queued content
+        is not scanned with the model missing.
+        """
+        self._db = db
+        self._wait_for = wait_for
+        self._wake = asyncio.Event()
+        await db[JOBS_COLLECTION].create_index([("content_type", 1), ("status", 1), ("available_at", 1)])
+        try:
+            await db[JOBS_COLLECTION].create_index([("content_type", 1), ("content_id", 1)], unique=True)
+        except OperationFailure as e:
+            # Duplicate jobs left by older versions; requeue() still upserts, only concurrent
+            # startups may race until they are cleaned up
+            print(f"⚠️ Unique job index not created: {e}")
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    def wake(self):
+        """New job in this process: skip the poll interval"""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            if self._wait_for is not None and self._wait_for():
+                await asyncio.sleep(settings.MODERATION_WORKER_POLL_SECONDS)
+                continue
+            try:
+                processed = await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ {self.name.capitalize()} worker error: {e}")
+                processed = 0
+            if processed == 0:
+                # Idle: wait for a local enqueue or the next poll
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=settings.MODERATION_WORKER_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                self._wake.clear()
+
+    async def _claim(self) -> Optional[dict]:
+        now = datetime.utcnow()
+        return await self._db[JOBS_COLLECTION].find_one_and_update(
+            {
+                "content_type": {"$in": list(self._handlers)},
+                "$or": [
+                    {"status": QUEUED, "available_at": {"$lte": now}},
+                    {"status": PROCESSING, "locked_until": {"$lt": now}},  # lease expired
+                ],
+            },
+            {
+                "$set": {"status": PROCESSING, "locked_until": now + timedelta(seconds=settings.MODERATION_JOB_LEASE_SECONDS)},
+                "$inc": {"attempts": 1},
+            },
+            sort=[("available_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def _renew_leases(self, ids: list):
+        """Extend the lease of the jobs being processed, so no other worker claims them meanwhile"""
+        lease = settings.MODERATION_JOB_LEASE_SECONDS
+        while True:
+            await asyncio.sleep(lease / 3)
+            await self._db[JOBS_COLLECTION].update_many(
+                {"_id": {"$in": ids}, "status": PROCESSING},
+                {"$set": {"locked_until": datetime.utcnow() + timedelta(seconds=lease)}}
+            )
+
+    async def run_once(self) -> int:
+        """Claim up to `batch_size` jobs and process them; returns the number claimed"""
+        jobs = []
+        while len(jobs) < (self.batch_size or settings.MODERATION_WORKER_BATCH):
+            job = await self._claim()
+            if job is None:
+                break
+            jobs.append(job)
+        if not jobs:
+            return 0
+
+        renewer = asyncio.create_task(self._renew_leases([job["_id"] for job in jobs]))
+        try:
+            await self._process(jobs)
+        finally:
+            renewer.cancel()
+        return len(jobs)
+
+    async def _process(self, jobs: list[dict]):
+        start = time.perf_counter()
+        by_type: dict[str, list[dict]] = {}
+        for job in jobs:
+            by_type.setdefault(job["content_type"], []).append(job)
+
+        collection = self._db[JOBS_COLLECTION]
+        for content_type, group in by_type.items():
+            ids = [job["_id"] for job in group]
+            handler = self._handlers.get(content_type)
+            try:
+                if handler is None:
+                    raise RuntimeError(f"no handler for content type '{content_type}'")
+                await handler(self._db, group)
+            except Exception as e:
+                print(f"⚠️ Processing of {len(group)} {content_type} job(s) failed: {e}")
+                await self._retry_later(content_type, group, str(e))
+                self.failed += len(group)
+                continue
+            await collection.delete_many({"_id": {"$in": ids}})
+            self.processed += len(group)
+
+        self.batches += 1
+        oldest = min(job["created_at"] for job in jobs)
+        self.last_lag_seconds = (datetime.utcnow() - oldest).total_seconds()
+        print(f"🛡️ Processed {len(jobs)} {self.name} job(s) in {time.perf_counter() - start:.3f}s")
+
+    async def _retry_later(self, content_type: str, jobs: list[dict], error: str):
+        collection = self._db[JOBS_COLLECTION]
+        failed = []
+        for job in jobs:
+            attempts = job.get("attempts", 1)
+            if attempts >= settings.MODERATION_JOB_MAX_ATTEMPTS:
+                update = {"status": FAILED, "error": error, "locked_until": None}
+                failed.append(job)
+            else:
+                # 2s, 4s, 8s, ...
+                delay = 2 ** attempts
+                update = {
+                    "status": QUEUED,
+                    "error": error,
+                    "locked_until": None,
+                    "available_at": datetime.utcnow() + timedelta(seconds=delay),
+                }
+            await collection.update_one({"_id": job["_id"]}, {"$set": update})
+
+        on_failed = self._on_failed.get(content_type)
+        if failed and on_failed is not None:
+            try:
+                await on_failed(self._db, failed)
+            except Exception as e:
+                print(f"⚠️ Finalizing {len(failed)} failed {content_type} job(s) failed: {e}")
+
+    async def metrics(self) -> dict:
+        counts = {}
+        if self._db is not None:
+            async for row in self._db[JOBS_COLLECTION].aggregate([
+                {"$match": {"content_type": {"$in": list(self._handlers)}}},
+                {"$group": {"_id": "$status", "count": {"$sum": 1}}},
+            ]):
+                counts[row["_id"]] = row["count"]
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "batches": self.batches,
+            "processed": self.processed,
+            "failed": self.failed,
+            "last_lag_seconds": round(self.last_lag_seconds, 3) if self.last_lag_seconds is not None else None,
+            "jobs": counts,
+        }
+
+
+# Singleton instances
+_worker: Optional[ModerationWorker] = None
+_journal_worker: Optional[ModerationWorker] = None
+
+
+def get_moderation_worker() -> ModerationWorker:
+    """Get or create the moderation worker"""
+    global _worker
+    if _worker is None:
+        _worker = ModerationWorker()
+    return _worker
+
+
+def get_journal_worker() -> ModerationWorker:
+    """Get or create the journal worker (one job per round: transcription can take minutes)"""
+    global _journal_worker
+    if _journal_worker is None:
+        _journal_worker = ModerationWorker("journal", batch_size=1)
+    return _journal_worker
@@ -0,0 +1,84 @@
+"""
+Phrase Index
+Token trie for multi-word lexicon entries ("đồ ngu", "cút khỏi đây").
+
+`rule_based_scoring` used to test `token in lexicon` for each whitespace token,
+so entries with more than one word never matched. The index groups entries by
+their first token; scanning walks the token stream once and, at each position,
+takes the longest phrase that starts there, then continues after it.
+
+Lookup cost per token is one dict probe, plus a short walk only when the token
+starts some phrase, so it stays flat as the lexicon grows to tens of thousands
+of entries.
+"""
+from typing import Mapping, NamedTuple
+
+# Trie node: {next_token: child_node, _PHRASE: (phrase, weight)}
+_PHRASE = None
+
+
+class PhraseMatch(NamedTuple):
+    phrase: str
+    weight: float
+    start: int  # token index
+    end: int    # exclusive
+
+
+class PhraseIndex:
+    """
+    Usage:
+        index = PhraseIndex({"ngu": 0.1, "cút khỏi đây": 0.18})
+        index.scan("mày cút khỏi đây đi".split())
+        # [PhraseMatch(phrase='cút khỏi đây', weight=0.18, start=1, end=4)]
+    """
+
+    def __init__(self, lexicon: Mapping[str, float]):
+        self._first: dict = {}
+        self.max_tokens = 0
+        self.size = 0
+        for phrase, weight in lexicon.items():
+            tokens = phrase.split()
+            if not tokens:
+                continue
+            node = self._first.setdefault(tokens[0], {})
+            for token in tokens[1:]:
+                node = node.setdefault(token, {})
+            try:
+                weight = float(weight)
+            except (TypeError, ValueError):
+                weight = 0.0
+            if _PHRASE not in node:
+                self.size += 1
+            node[_PHRASE] = (phrase, weight)
+            self.max_tokens = max(self.max_tokens, len(tokens))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def scan(self, tokens: list[str]) -> list[PhraseMatch]:
+        """Longest non-overlapping matches, left to right"""
+        first = self._first
+        matches = []
+        n = len(tokens)
+        resume = 0  # first position not covered by the previous match
+        # Only positions whose token starts some phrase need a trie walk
+        for i in [i for i, token in enumerate(tokens) if token in first]:
+            if i < resume:
+                continue
+            node = first[tokens[i]]
+            best = node.get(_PHRASE)
+            best_end = i + 1
+            j = i + 1
+            while j < n:
+                node = node.get(tokens[j])
+                if node is None:
+                    break
+                j += 1
+                hit = node.get(_PHRASE)
+                if hit is not None:
+                    best, best_end = hit, j
+
+            if best is not None:
+                matches.append(PhraseMatch(best[0], best[1], i, best_end))
+                resume = best_end
+        return matches
@@ -0,0 +1,213 @@
+"""
+Sentiment Analysis Service
+Shared RoBERTa / DistilBERT sentiment pipeline used by journals and the /ai routes.
+
+The HuggingFace pipeline is built lazily, once per process. With the default
+configuration it lives in the inference process pool, so the API process never
+pays for loading it.
+
+Concurrent requests are micro-batched: calls arriving within
+SENTIMENT_BATCH_WINDOW_MS of each other run as one padded batch. Results are
+kept in the shared inference cache, keyed by the exact text (the tokenizer is
+case- and whitespace-sensitive) and the model name.
+
+Long texts (journals with a transcript, up to 5,000 chars on /ai/sentiment)
+would be cut at the model's 512-token limit. `analyze_long_sentiment_async`
+splits them into sentence windows of at most SENTIMENT_CHUNK_CHARS, scores the
+windows through the micro-batcher (one padded batch per SENTIMENT_MAX_BATCH_SIZE
+windows, so memory stays bounded) and returns the length-weighted aggregate
+together with the per-window segments.
+"""
+import asyncio
+import re
+from typing import Optional
+
+from app.core.config import settings
+from app.services.common.inference_cache import get_inference_cache
+from app.services.common.inference_executor import get_inference_executor
+from app.services.common.micro_batcher import MicroBatcher
+
+# Initialize sentiment analysis model name
+if settings.SENTIMENT_MODEL_PATH:
+    SENTIMENT_MODEL = settings.SENTIMENT_MODEL_PATH
+elif settings.SENTIMENT_MODEL.lower() == "roberta":
+    SENTIMENT_MODEL = "cardiffnlp/twitter-roberta-base-sentiment"
+else:
+    SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+
+LABEL_MAP = {"LABEL_0": "Negative", "LABEL_1": "Neutral", "LABEL_2": "Positive"}
+
+_sentiment_pipeline = None
+
+
+def get_sentiment_pipeline():
+    """Build the sentiment pipeline on first use in the current process"""
+    global _sentiment_pipeline
+    if _sentiment_pipeline is None:
+        from transformers import pipeline
+        _sentiment_pipeline = pipeline(
+            "sentiment-analysis",
+            model=SENTIMENT_MODEL,
+            framework="pt"
+        )
+    return _sentiment_pipeline
+
+
+def _to_label_score(result: dict):
+    raw_label = result["label"]
+    label = LABEL_MAP.get(raw_label, "Neutral")
+    score = result["score"] if label == "Positive" else -result["score"] if label == "Negative" else 0.0
+    return label, score
+
+
+def analyze_sentiment(text: str):
+    """Analyze sentiment of the given text."""
+    if not text:
+        return "Neutral", 0.0
+    result = get_sentiment_pipeline()(text)[0]
+    return _to_label_score(result)
+
+
+def analyze_sentiment_batch(texts: list[str]) -> list:
+    """Analyze sentiment of many texts in one padded forward pass."""
+    # The pipeline pads every batch to its longest member
+    results = get_sentiment_pipeline()(
+        texts,
+        batch_size=len(texts),
+        truncation=True
+    )
+    return [_to_label_score(result) for result in results]
+
+
+async def _run_sentiment_batch(texts: list[str]) -> list:
+    return await get_inference_executor().run_model(analyze_sentiment_batch, texts)
+
+
+_batcher: Optional[MicroBatcher] = None
+
+
+def get_sentiment_batcher() -> MicroBatcher:
+    """Get or create the sentiment micro-batcher"""
+    global _batcher
+    if _batcher is None:
+        _batcher = MicroBatcher(
+            _run_sentiment_batch,
+            max_batch_size=settings.SENTIMENT_MAX_BATCH_SIZE,
+            window_ms=settings.SENTIMENT_BATCH_WINDOW_MS
+        )
+    return _batcher
+
+
+async def warm_up_sentiment():
+    """Load the pipeline in every inference worker (model registry loader)"""
+    workers = max(1, settings.INFERENCE_PROCESS_WORKERS)
+    await asyncio.gather(*[
+        get_inference_executor().run_model(analyze_sentiment_batch, ["warm up"])
+        for _ in range(workers)
+    ])
+
+
+async def analyze_sentiment_async(text: str):
+    """Analyze sentiment in the inference process pool (non-blocking, micro-batched)."""
+    if not text:
+        return "Neutral", 0.0
+    cache = get_inference_cache()
+    cached = cache.get("sentiment", SENTIMENT_MODEL, text)
+    if cached is not None:
+        return cached
+    result = await get_sentiment_batcher().submit(text)
+    cache.set("sentiment", SENTIMENT_MODEL, text, result)
+    return result
+
+
+# Sentence ends (., !, ?, … and their runs) followed by whitespace, or line breaks
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+|\n+")
+
+
+def split_sentence_windows(text: str, max_chars: Optional[int] = None) -> list[tuple[int, int]]:
+    """
+    (start, end) offsets of consecutive windows of whole sentences, each at
+    most `max_chars` long. A single longer sentence is cut at word boundaries.
+    """
+    max_chars = max_chars or settings.SENTIMENT_CHUNK_CHARS
+    sentences, start = [], 0
+    for match in _SENTENCE_END.finditer(text):
+        if text[start:match.start()].strip():
+            sentences.append((start, match.start()))
+        start = match.end()
+    if text[start:].strip():
+        sentences.append((start, len(text)))
+
+    windows: list[tuple[int, int]] = []
+    for s_start, s_end in sentences:
+        # Over-long sentence: cut at the last space before the limit
+        while s_end - s_start > max_chars:
+            cut = text.rfind(" ", s_start, s_start + max_chars)
+            cut = cut if cut > s_start else s_start + max_chars
+            windows.append((s_start, cut))
+            s_start = cut
+            while s_start < s_end and text[s_start].isspace():
+                s_start += 1
+        if s_start >= s_end:
+            continue
+        # Append to the previous window while it stays within the limit
+        if windows and s_end - windows[-1][0] <= max_chars:
+            windows[-1] = (windows[-1][0], s_end)
+        else:
+            windows.append((s_start, s_end))
+    return windows
+
+
+# Weakest |score| of a Positive / Negative window: its label is the argmax of
+# three classes, so its probability is above 1/3 (above 1/2 with two classes)
+POLAR_MIN_SCORE = 1 / 3
+
+
+def score_to_label(score: float) -> str:
+    """Label of a signed score; for a single window it is the model's own label"""
+    if score >= POLAR_MIN_SCORE:
+        return "Positive"
+    if score <= -POLAR_MIN_SCORE:
+        return "Negative"
+    return "Neutral"
+
+
+def aggregate_sentiment(segments: list[dict]):
+    """
+    Length-weighted aggregate of scored segments: the score is the weighted
+    mean and the label is derived from it (score_to_label), so they agree.
+    """
+    if not segments:
+        return "Neutral", 0.0
+    total = sum(seg["end"] - seg["start"] for seg in segments)
+    score = sum(seg["score"] * (seg["end"] - seg["start"]) for seg in segments) / total
+    return score_to_label(score), score
+
+
+async def analyze_sentiment_segments_async(text: str, windows: Optional[list[tuple[int, int]]] = None) -> list[dict]:
+    """Per-window sentiment: [{"start", "end", "label", "score"}] with offsets into `text`"""
+    windows = split_sentence_windows(text) if windows is None else windows
+    segments = []
+    # One batch's worth of windows at a time: a huge input never pads more than that at once
+    step = settings.SENTIMENT_MAX_BATCH_SIZE
+    for i in range(0, len(windows), step):
+        group = windows[i:i + step]
+        results = await asyncio.gather(*[analyze_sentiment_async(text[start:end]) for start, end in group])
+        for (start, end), (label, score) in zip(group, results):
+            segments.append({"start": start, "end": end, "label": label, "score": round(score, 4)})
+    return segments
+
+
+async def analyze_long_sentiment_async(text: str):
+    """
+    Sentiment of text of any length: (label, score, segments).
+    Text that fits one window is scored as a whole, exactly like analyze_sentiment_async.
+    """
+    windows = split_sentence_windows(text) if text else []
+    if len(windows) <= 1:
+        label, score = await analyze_sentiment_async(text)
+        segments = [{"start": start, "end": end, "label": label, "score": round(score, 4)} for start, end in windows]
+        return label, score, segments
+    segments = await analyze_sentiment_segments_async(text, windows)
+    label, score = aggregate_sentiment(segments)
+    return label, score, segments
@@ -0,0 +1,195 @@
+"""
+Speech-to-Text
+Pluggable transcription backends for journal voice notes, chosen by STT_BACKEND:
+
+- "assemblyai"     - cloud API (ASSEMBLYAI_API_KEY). Upload + polling, the
+                     whole transcript arrives at once.
+- "faster_whisper" - local CPU engine (CTranslate2 Whisper, int8 by default).
+                     No network, no per-minute cost; works air-gapped when
+                     STT_MODEL points at a local model directory. Segments
+                     are yielded as they decode, so callers can stream them.
+
+Backends are imported lazily: only the configured one has to be installed.
+Transcription runs in the inference executor's STT thread pool (STT_WORKERS,
+bounded by STT_MAX_QUEUE, 503 on overload), apart from toxic scoring -
+CTranslate2 releases the GIL while decoding.
+"""
+import asyncio
+import io
+import threading
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Iterator, Optional
+
+from app.core.config import settings
+from app.services.common.inference_executor import get_inference_executor
+
+ASSEMBLYAI = "assemblyai"
+FASTER_WHISPER = "faster_whisper"
+
+STT_MODEL = "stt"  # model registry name (local backends only)
+
+
+class STTEngine(ABC):
+    """Base class: `transcribe()` / `stream()` are blocking, call them off the event loop"""
+    name = "base"
+    local = False
+
+    def load(self):
+        """Load models / clients (idempotent)"""
+
+    def stream(self, audio: bytes) -> Iterator[str]:
+        """Yield transcript segments in order as they are decoded"""
+        yield self.transcribe(audio)
+
+    @abstractmethod
+    def transcribe(self, audio: bytes) -> str:
+        """Full transcript of the audio"""
+
+
+class AssemblyAIEngine(STTEngine):
+    name = ASSEMBLYAI
+
+    def __init__(self, api_key: Optional[str]):
+        self.api_key = api_key
+        self._aai = None
+
+    def load(self):
+        if self._aai is not None:
+            return
+        if not self.api_key:
+            raise RuntimeError("ASSEMBLYAI_API_KEY is not set (or use STT_BACKEND=faster_whisper)")
+        import assemblyai as aai
+        aai.settings.api_key = self.api_key
+        self._aai = aai
+
+    def transcribe(self, audio: bytes) -> str:
+        self.load()
+        transcript = self._aai.Transcriber().transcribe(audio)
+        if transcript.status == self._aai.TranscriptStatus.error:
+            raise Exception(f"Transcription error: {transcript.error}")
+        return transcript.text or ""
+
+
+class FasterWhisperEngine(STTEngine):
+    name = FASTER_WHISPER
+    local = True
+
+    def __init__(self, model: str, compute_type: str = "int8", language: Optional[str] = None,
+                 beam_size: int = 1, cpu_threads: int = 0):
+        self.model_name = model
+        self.compute_type = compute_type
+        self.language = language
+        self.beam_size = beam_size
+        self.cpu_threads = cpu_threads
+        self._model = None
+        self._lock = threading.Lock()  # startup preload vs. first request
+
+    def load(self):
+        with self._lock:
+            if self._model is not None:
+                return
+            try:
+                from faster_whisper import WhisperModel
+            except ImportError:
+                raise RuntimeError("faster-whisper is not installed: pip install faster-whisper")
+            self._model = WhisperModel(
+                self.model_name,
+                device="cpu",
+                compute_type=self.compute_type,
+                cpu_threads=self.cpu_threads
+            )
+        print(f"✅ STT model loaded (faster-whisper {self.model_name}, {self.compute_type})")
+
+    def stream(self, audio: bytes) -> Iterator[str]:
+        self.load()
+        # `segments` is lazy: audio is decoded window by window while we iterate
+        segments, _ = self._model.transcribe(
+            io.BytesIO(audio),
+            language=self.language,
+            beam_size=self.beam_size,
+            vad_filter=True
+        )
+        for segment in segments:
+            text = segment.text.strip()
+            if text:
+                yield text
+
+    def transcribe(self, audio: bytes) -> str:
+        return " ".join(self.stream(audio))
+
+
+def create_stt_engine(backend: Optional[str] = None) -> STTEngine:
+    backend = (backend or settings.STT_BACKEND).lower()
+    if backend == ASSEMBLYAI:
+        return AssemblyAIEngine(settings.ASSEMBLYAI_API_KEY)
+    if backend == FASTER_WHISPER:
+        return FasterWhisperEngine(
+            settings.STT_MODEL,
+            compute_type=settings.STT_COMPUTE_TYPE,
+            language=settings.STT_LANGUAGE,
+            beam_size=settings.STT_BEAM_SIZE
+        )
+    raise ValueError(f"Unknown STT_BACKEND: {backend!r} (use {ASSEMBLYAI} or {FASTER_WHISPER})")
+
+
+async def transcribe_audio(audio: bytes, engine: Optional[STTEngine] = None) -> str:
+    """Full transcript of an audio file (bytes)"""
+    if not audio:
+        raise ValueError("Audio content is empty")
+    engine = engine or get_stt_engine()
+    return await get_inference_executor().run_stt(engine.transcribe, audio)
+
+
+async def stream_transcription(audio: bytes, engine: Optional[STTEngine] = None) -> AsyncIterator[str]:
+    """
+    Transcript segments as the engine decodes them.
+    The engine runs in the STT thread pool and hands each segment to the
+    event loop, so the first words arrive before the whole file is decoded.
+    If the consumer stops early (client disconnected), decoding stops after
+    the current segment instead of running through the whole file.
+    """
+    if not audio:
+        raise ValueError("Audio content is empty")
+    engine = engine or get_stt_engine()
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    done = object()
+    stop = threading.Event()
+
+    def drain():
+        for text in engine.stream(audio):
+            if stop.is_set():
+                break  # closes the engine's generator: no more windows are decoded
+            loop.call_soon_threadsafe(queue.put_nowait, text)
+
+    async def run():
+        try:
+            await get_inference_executor().run_stt(drain)
+        finally:
+            loop.call_soon_threadsafe(queue.put_nowait, done)
+
+    task = asyncio.create_task(run())
+    try:
+        while True:
+            item = await queue.get()
+            if item is done:
+                break
+            yield item
+        await task  # re-raise decoding errors
+    finally:
+        # Cancelling the task does not interrupt the thread; the flag does
+        stop.set()
+        if not task.done():
+            task.cancel()
+
+
+# Singleton instance
+_engine: Optional[STTEngine] = None
+
+
+def get_stt_engine() -> STTEngine:
+    """Get or create the configured STT engine (models load on first use or via the model registry)"""
+    global _engine
+    if _engine is None:
+        _engine = create_stt_engine()
+    return _engine
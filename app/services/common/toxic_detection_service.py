@@ -3,64 +3,38 @@ Toxic Content Detection Service - Integrated Version
 Directly loads and uses the TF-IDF + Logistic Regression model.
 No external Flask API required.
 """
+import asyncio
 import pickle
-import re
+import threading
+import time
+from datetime import datetime
 from pathlib import Path
 from typing import Optional
 from pydantic import BaseModel
+from app.core.config import settings
+from app.services.common.inference_executor import get_inference_executor, InferenceQueueFull
+from app.services.common.inference_cache import get_inference_cache, model_fingerprint
+from app.services.common.toxic_normalizer import normalize_for_toxic
+from app.services.common.toxic_model_format import CompactToxicModel, load_compact_model, COMPACT_DIR_NAME
+from app.services.common.model_versions import activate_version, read_current, resolve_model_dir
 
 
 # ===========================
-# Global Variables & Patterns (from Flask app)
+# Global Variables
 # ===========================
 
-# Profanity patterns
-PROFANITY_PATTERNS = [
-    (r'f[\W_]*u[\W_]*c[\W_]*k', 'fuck'),
-    (r'sh[\W_]*i[\W_]*t', 'shit'),
-    (r'b[\W_]*i[\W_]*t[\W_]*c[\W_]*h', 'bitch'),
-    (r'a[\W_]*s[\W_]*s[\W_]*h?[\W_]*o?[\W_]*l[\W_]*e?', 'asshole'),
-    (r'd[\W_]*a[\W_]*m[\W_]*n', 'damn'),
-    (r'h[\W_]*e[\W_]*l[\W_]*l', 'hell'),
-    (r'idi0t', 'idiot'),
-    (r'st\*pid', 'stupid'),
-]
+# Label columns
+LABEL_COLS = ['toxic', 'severe_toxic', 'obscene', 'threat', 'insult', 'identity_hate']
 
-# Chat lingo normalization
-CHAT_MAP = {
-    r'\bu\b': 'you',
-    r'\bur\b': 'your',
-    r'\br\b': 'are',
-}
+PICKLE_FILES = ['lr_models.pkl', 'tfidf_word.pkl', 'tfidf_char.pkl']
 
-# Positive words for context-aware profanity normalization
-POSITIVE_WORDS = [
-    "good", "great", "awesome", "amazing", "nice",
-    "cool", "fun", "funny", "love", "lovely", "beautiful",
-    "perfect", "excellent", "fantastic", "wonderful", "brilliant",
-    "superb", "outstanding", "impressive", "incredible", "fabulous",
-    "terrific", "magnificent", "marvelous", "spectacular", "phenomenal",
-    "cute", "sweet", "adorable", "delightful", "charming",
-    "interesting", "exciting", "thrilling", "enjoyable", "pleasant",
-    "happy", "glad", "joyful", "pleased", "satisfied",
-    "best", "better", "top", "fine", "solid", "strong",
-    "smart", "clever", "genius", "wise", "talented"
+# Scored once by every freshly loaded model before it takes traffic
+WARMUP_TEXTS = [
+    "Hôm nay mình cảm thấy rất vui",
+    "you are an idiot and I hate you",
+    "Cảm ơn mọi người đã lắng nghe",
 ]
 
-# Create regex patterns
-positive_pattern = "|".join(POSITIVE_WORDS)
-BENIGN_PROFANITY_PATTERN = re.compile(
-    rf"\b(fucking|fuckin|fking|freaking)\s+({positive_pattern})\b",
-    flags=re.IGNORECASE
-)
-INTENSIFIED_PATTERN = re.compile(
-    rf"\b(so|really|very|pretty|quite)\s+(fucking|fuckin|fking)\s+({positive_pattern})\b",
-    flags=re.IGNORECASE
-)
-
-# Label columns
-LABEL_COLS = ['toxic', 'severe_toxic', 'obscene', 'threat', 'insult', 'identity_hate']
-
 
 class ToxicPrediction(BaseModel):
     """Result from toxic content prediction"""
@@ -70,21 +44,141 @@ class ToxicPrediction(BaseModel):
     confidence: float
     toxic_labels: list[str] = []
     predictions: dict = {}
+    model_version: Optional[str] = None  # model that produced the scores
+
+
+class LoadedToxicModel:
+    """
+    One loaded model version: vectorizers + LR weights (or the compact export).
+    Never mutated after loading; a reload builds a new instance and the service
+    swaps its reference, so a request in flight finishes on the model it started with.
+    """
+
+    def __init__(self, path: Path, version: Optional[str], manifest: Optional[dict] = None):
+        self.path = path
+        self.version = version
+        self.manifest = manifest
+        self.loaded_at = datetime.utcnow()
+        self.compact_model: Optional[CompactToxicModel] = None
+        self.lr_models = None
+        self.tfidf_word = None
+        self.tfidf_char = None
+        self._coef = None
+        self._intercept = None
+
+    @staticmethod
+    def exists(path: Path) -> bool:
+        """Check if a compact export or all required pickle files exist"""
+        if CompactToxicModel.exists(path / COMPACT_DIR_NAME):
+            return True
+        return all((path / f).exists() for f in PICKLE_FILES)
+
+    @classmethod
+    def load(cls, path: Path, manifest: Optional[dict] = None) -> "LoadedToxicModel":
+        """Load the artifacts in `path` (blocking). Raises if they are missing or broken."""
+        model = cls(path, version=None, manifest=manifest)
+        
+        # Prefer the memory-mapped compact export: no unpickling, pages shared by all workers
+        model.compact_model = load_compact_model(path)
+        if model.compact_model is not None:
+            model.version = manifest["version"] if manifest else model_fingerprint(model.compact_model.model_dir.iterdir())
+            return model
+        
+        # Lazy imports - only import when loading models
+        from scipy.sparse import hstack
+        model._hstack = hstack  # Store for later use
+        
+        # Load models
+        with open(path / 'lr_models.pkl', 'rb') as f:
+            model.lr_models = pickle.load(f)
+        
+        # Load vectorizers
+        with open(path / 'tfidf_word.pkl', 'rb') as f:
+            model.tfidf_word = pickle.load(f)
+        
+        with open(path / 'tfidf_char.pkl', 'rb') as f:
+            model.tfidf_char = pickle.load(f)
+        
+        # Stack the per-label LR weights so a batch is scored in one matrix product
+        model._stack_lr_weights()
+        
+        model.version = manifest["version"] if manifest else model_fingerprint(path / f for f in PICKLE_FILES)
+        return model
+    
+    @property
+    def format(self) -> str:
+        return "compact" if self.compact_model is not None else "pickle"
+    
+    def _stack_lr_weights(self):
+        """
+        Stack the six binary LR models into one (n_features, n_labels) weight matrix.
+        Falls back to per-label predict_proba if a model has no linear coefficients.
+        """
+        import numpy as np
+        
+        try:
+            self._coef = np.ascontiguousarray(
+                np.vstack([self.lr_models[label].coef_[0] for label in LABEL_COLS]).T
+            )
+            self._intercept = np.array([self.lr_models[label].intercept_[0] for label in LABEL_COLS])
+        except (AttributeError, IndexError):
+            print("⚠️ LR models have no linear coefficients, using per-label predict_proba")
+    
+    def _vectorize(self, normalized_texts: list[str]):
+        """Vectorize all texts into a single sparse (n_texts, n_features) matrix"""
+        vec_word = self.tfidf_word.transform(normalized_texts)
+        vec_char = self.tfidf_char.transform(normalized_texts)
+        return self._hstack([vec_word, vec_char]).tocsr()
+    
+    def score_normalized(self, normalized: list[str]):
+        """(n_texts, n_labels) probabilities for already-normalized texts"""
+        import numpy as np
+        from scipy.special import expit
+        
+        if self.compact_model is not None:
+            return self.compact_model.predict_proba(normalized)
+        
+        vec = self._vectorize(normalized)
+        
+        if self._coef is not None:
+            # Binary LR: P(y=1) = sigmoid(X @ w + b), all labels at once
+            probs = expit(vec @ self._coef + self._intercept)
+        else:
+            probs = np.column_stack([
+                self.lr_models[label].predict_proba(vec)[:, 1] for label in LABEL_COLS
+            ])
+        
+        return np.asarray(probs)
+    
+    def to_dict(self) -> dict:
+        return {
+            "version": self.version,
+            "path": str(self.path),
+            "format": self.format,
+            "loaded_at": self.loaded_at.isoformat(),
+            "created_at": self.manifest.get("created_at") if self.manifest else None,
+        }
 
 
 class ToxicDetectionService:
     """
     Service for detecting toxic/violation content.
     Directly loads and uses TF-IDF + Logistic Regression models.
+    
+    The active model can be replaced while serving: `reload()` loads a version
+    next to the current one, warms it up and swaps it in with a single
+    reference assignment. `start_watching()` does this automatically when
+    models/CURRENT points at a new version (see model_versions).
     """
     
-    def __init__(self, models_path: str = None, threshold: float = 0.5):
+    def __init__(self, models_path: str = None, threshold: float = 0.5, load: bool = True):
         self.threshold = threshold
-        self.models_loaded = False
-        self.lr_models = None
-        self.tfidf_word = None
-        self.tfidf_char = None
-        self.lemmatizer = None
+        self._model: Optional[LoadedToxicModel] = None
+        self._reload_lock = threading.Lock()
+        self._watch_task: Optional[asyncio.Task] = None
+        self._failed_version: Optional[str] = None  # CURRENT target that failed to load; not retried by the watcher
+        self.reloads = 0
+        self.last_reload: Optional[dict] = None
         
         # Determine models path
         if models_path is None:
@@ -96,13 +190,37 @@ class ToxicDetectionService:
             self.models_path = Path(models_path).resolve()
             self.only_model_path = Path(models_path).resolve().parent
         
-        # Try to load models
-        self._load_models()
+        # Try to load models (the app singleton defers this to the model registry)
+        if load:
+            self.load()
+    
+    @property
+    def models_loaded(self) -> bool:
+        return self._model is not None
+    
+    @property
+    def model_version(self) -> Optional[str]:
+        """Version of the model currently serving (manifest version, or a file fingerprint for the flat layout)"""
+        model = self._model
+        return model.version if model is not None else None
+    
+    def load(self) -> bool:
+        """Load models (blocking). Returns True when models are ready."""
+        if not self.models_loaded:
+            self._load_models()
+        return self.models_loaded
+    
+    def has_model_files(self) -> bool:
+        """True when a trained model is on disk (load() may still auto-train without one)"""
+        return self.models_path.exists() and self._check_models_exist()
     
     def _check_models_exist(self) -> bool:
-        """Check if all required model files exist"""
-        required_files = ['lr_models.pkl', 'tfidf_word.pkl', 'tfidf_char.pkl']
-        return all((self.models_path / f).exists() for f in required_files)
+        """Check if the active version (or the flat layout) has a loadable model"""
+        try:
+            path, _ = resolve_model_dir(self.models_path)
+        except (FileNotFoundError, ValueError):
+            return False
+        return LoadedToxicModel.exists(path)
     
     def _auto_train(self) -> bool:
         """Automatically train models if train.csv exists"""
@@ -149,95 +267,185 @@ class ToxicDetectionService:
                 print(f"⚠️ Toxic models not found at: {self.models_path}")
                 
                 # Try auto-train
-                if self._auto_train():
+                if settings.TOXIC_AUTO_TRAIN and self._auto_train():
                     print("✅ Auto-training completed!")
                 else:
                     print("   Models not available. Posts will be approved without AI scan.")
                     return
             
-            # Lazy imports - only import when loading models
-            from nltk.stem import WordNetLemmatizer
-            from scipy.sparse import hstack
-            self._hstack = hstack  # Store for later use
-            
-            # Load models
-            with open(self.models_path / 'lr_models.pkl', 'rb') as f:
-                self.lr_models = pickle.load(f)
-            
-            # Load vectorizers
-            with open(self.models_path / 'tfidf_word.pkl', 'rb') as f:
-                self.tfidf_word = pickle.load(f)
-            
-            with open(self.models_path / 'tfidf_char.pkl', 'rb') as f:
-                self.tfidf_char = pickle.load(f)
-            
-            # Initialize lemmatizer
-            self.lemmatizer = WordNetLemmatizer()
-            
-            self.models_loaded = True
-            print("✅ Toxic detection models loaded successfully!")
+            path, manifest = resolve_model_dir(self.models_path)
+            model = LoadedToxicModel.load(path, manifest)
+            self._warm_up(model)
+            self._model = model
+            print(f"✅ Toxic detection models loaded ({model.format}, version {model.version})")
             
         except FileNotFoundError as e:
             print(f"⚠️ Toxic model files not found: {e}")
-            print("   Run: cd Only_Model && python save_models.py")
+            print("   Run: cd Only_Model && python auto_train.py --retrain")
         except Exception as e:
             import traceback
             print(f"❌ Error loading toxic models: {e}")
             traceback.print_exc()
     
-    def _normalize_for_toxic(self, text: str) -> str:
-        """Normalize text for toxic detection"""
-        # Lowercase
-        text = text.lower()
-        
-        # Remove HTML tags
-        text = re.sub(r'<[^>]+>', ' ', text)
-        
-        # Replace benign profanity with intensifiers
-        text = INTENSIFIED_PATTERN.sub(lambda m: f"{m.group(1)} very {m.group(3)}", text)
-        text = BENIGN_PROFANITY_PATTERN.sub(lambda m: f"very {m.group(2)}", text)
+    @staticmethod
+    def _warm_up(model: LoadedToxicModel):
+        """Score a few texts so the first real request does not pay for page faults / lazy init"""
+        model.score_normalized([normalize_for_toxic(text) for text in WARMUP_TEXTS])
+    
+    # ----- hot reload -----
+    
+    def reload(self, version: Optional[str] = None, activate: bool = False) -> dict:
+        """
+        Load `version` (default: the one CURRENT points at), warm it up and swap
+        it in (blocking; run it off the event loop). The old model keeps serving
+        until the swap and finishes the requests that already hold it.
         
-        # Normalize leet speak: @ → a
-        text = re.sub(r'@', 'a', text)
+        activate=True also points CURRENT at the version once it loaded, so the
+        other worker processes follow through their watcher.
         
-        # Collapse repeated characters
-        text = re.sub(r'(.)\1{2,}', r'\1\1', text)
+        Raises:
+            FileNotFoundError / ValueError: unknown version
+            Exception: the version failed to load or score; the old model stays active
+        """
+        with self._reload_lock:
+            start = time.perf_counter()
+            path, manifest = resolve_model_dir(self.models_path, version)
+            model = LoadedToxicModel.load(path, manifest)
+            self._warm_up(model)
+            if activate and manifest is not None:
+                activate_version(self.models_path, model.version)
+            
+            previous = self.model_version
+            self._model = model  # atomic swap
+            self._failed_version = None
+            self.reloads += 1
+            self.last_reload = {
+                "from": previous,
+                "to": model.version,
+                "seconds": round(time.perf_counter() - start, 3),
+                "at": datetime.utcnow().isoformat(),
+            }
+        print(f"🔄 Toxic model swapped: {previous} → {model.version} ({self.last_reload['seconds']}s)")
+        return self.last_reload
+    
+    async def reload_async(self, version: Optional[str] = None, activate: bool = False) -> dict:
+        """reload() in a worker thread; requests keep being served meanwhile"""
+        return await asyncio.to_thread(self.reload, version, activate)
+    
+    async def start_watching(self):
+        """Poll models/CURRENT and hot-swap when it points at another version"""
+        if settings.TOXIC_MODEL_WATCH_SECONDS <= 0:
+            return
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.create_task(self._watch())
+    
+    async def stop_watching(self):
+        if self._watch_task is not None and not self._watch_task.done():
+            self._watch_task.cancel()
+    
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(settings.TOXIC_MODEL_WATCH_SECONDS)
+            # The first load belongs to the model registry
+            if not self.models_loaded:
+                continue
+            current = read_current(self.models_path)
+            if current is None or current == self.model_version or current == self._failed_version:
+                continue
+            try:
+                await self.reload_async(current)
+            except Exception as e:
+                self._failed_version = current
+                print(f"❌ Toxic model {current} failed to load, keeping {self.model_version}: {e}")
+    
+    def status(self) -> dict:
+        model = self._model
+        return {
+            "loaded": model is not None,
+            "active": model.to_dict() if model is not None else None,
+            "current_pointer": read_current(self.models_path),
+            "watching": self._watch_task is not None and not self._watch_task.done(),
+            "reloads": self.reloads,
+            "last_reload": self.last_reload,
+            "failed_version": self._failed_version,
+        }
+    
+    def _normalize_for_toxic(self, text: str) -> str:
+        """Normalize text for toxic detection (shared with Only_Model training)"""
+        return normalize_for_toxic(text)
+    
+    def _predict_proba_batch(self, texts: list[str]):
+        """
+        Score all labels for a batch of texts.
+        Texts already scored by the same model version come from the inference
+        cache; the rest (deduplicated) are vectorized in one pass.
         
-        # Collapse repeated punctuation
-        text = re.sub(r'!{2,}', '!', text)
-        text = re.sub(r'\?{2,}', '?', text)
-        text = re.sub(r'\.{2,}', '.', text)
+        Returns:
+            (probs, normalized, version) where probs is an (n_texts, n_labels)
+            array ordered like LABEL_COLS and version the model that scored it
+        """
+        import numpy as np
         
-        # Normalize obfuscated profanity
-        for pattern, repl in PROFANITY_PATTERNS:
-            text = re.sub(pattern, repl, text, flags=re.IGNORECASE)
+        # One reference for the whole batch: a concurrent swap does not mix models
+        model = self._model
+        normalized = [self._normalize_for_toxic(text) for text in texts]
+        cache = get_inference_cache()
         
-        # Normalize chat lingo
-        for pattern, repl in CHAT_MAP.items():
-            text = re.sub(pattern, repl, text)
+        probs = np.empty((len(texts), len(LABEL_COLS)))
+        missing: dict[str, list[int]] = {}
+        for i, text in enumerate(normalized):
+            cached = cache.get("toxic", model.version, text)
+            if cached is not None:
+                probs[i] = cached
+            else:
+                missing.setdefault(text, []).append(i)
         
-        # Remove extra whitespaces
-        text = re.sub(r'\s+', ' ', text).strip()
+        if missing:
+            to_score = list(missing)
+            scored = model.score_normalized(to_score)
+            for text, row in zip(to_score, scored):
+                probs[missing[text]] = row
+                cache.set("toxic", model.version, text, tuple(float(p) for p in row))
         
-        return text
+        return probs, normalized, model.version
     
-    def _predict_toxicity(self, text: str) -> tuple[dict, str]:
+    def _predict_toxicity(self, text: str) -> tuple[dict, str, str]:
         """Predict toxicity for given text"""
-        # Normalize text
-        normalized = self._normalize_for_toxic(text)
-        
-        # Vectorize
-        vec_word = self.tfidf_word.transform([normalized])
-        vec_char = self.tfidf_char.transform([normalized])
-        vec = self._hstack([vec_word, vec_char])
+        probs, normalized, version = self._predict_proba_batch([text])
+        predictions = {label: float(prob) for label, prob in zip(LABEL_COLS, probs[0])}
+        return predictions, normalized[0], version
+    
+    def _build_prediction(self, text: str, predictions: dict, threshold: float,
+                          version: Optional[str] = None) -> ToxicPrediction:
+        """Turn per-label probabilities into a ToxicPrediction"""
+        # Determine toxicity
+        toxic_labels = [label for label, prob in predictions.items() if prob > threshold]
+        is_toxic = len(toxic_labels) > 0
         
-        # Predict
-        predictions = {}
-        for label in LABEL_COLS:
-            prob = self.lr_models[label].predict_proba(vec)[0, 1]
-            predictions[label] = float(prob)
+        # Find max toxicity
+        max_label = max(predictions.items(), key=lambda x: x[1])
         
-        return predictions, normalized
+        return ToxicPrediction(
+            text=text,
+            is_violation=is_toxic,
+            label="VIOLATION" if is_toxic else "CLEAN",
+            confidence=max_label[1],
+            toxic_labels=toxic_labels,
+            predictions=predictions,
+            model_version=version
+        )
+    
+    @staticmethod
+    def _fallback_prediction(text: str, label: str) -> ToxicPrediction:
+        """Safe default when models are unavailable or scoring failed"""
+        return ToxicPrediction(
+            text=text,
+            is_violation=False,
+            label=label,
+            confidence=0.0,
+            toxic_labels=[],
+            predictions={}
+        )
     
     async def check_health(self) -> bool:
         """Check if toxic detection models are loaded"""
@@ -253,49 +461,61 @@ class ToxicDetectionService:
         
         Returns:
             ToxicPrediction with violation status and details
+        
+        Raises:
+            InferenceQueueFull: if the inference executor is saturated
         """
         threshold = threshold or self.threshold
         
         if not self.models_loaded:
             # Models not loaded - return safe default
-            return ToxicPrediction(
-                text=text,
-                is_violation=False,
-                label="NOT_LOADED",
-                confidence=0.0,
-                toxic_labels=[],
-                predictions={}
-            )
+            return self._fallback_prediction(text, "NOT_LOADED")
         
         try:
-            predictions, normalized = self._predict_toxicity(text)
-            
-            # Determine toxicity
-            toxic_labels = [label for label, prob in predictions.items() if prob > threshold]
-            is_toxic = len(toxic_labels) > 0
-            
-            # Find max toxicity
-            max_label = max(predictions.items(), key=lambda x: x[1])
-            
-            return ToxicPrediction(
-                text=text,
-                is_violation=is_toxic,
-                label="VIOLATION" if is_toxic else "CLEAN",
-                confidence=max_label[1],
-                toxic_labels=toxic_labels,
-                predictions=predictions
-            )
+            # CPU-bound scoring runs in the inference thread pool, off the event loop
+            predictions, normalized, version = await get_inference_executor().run_cpu(self._predict_toxicity, text)
+            return self._build_prediction(text, predictions, threshold, version)
             
+        except InferenceQueueFull:
+            raise
         except Exception as e:
             print(f"Toxic analysis error: {e}")
-            return ToxicPrediction(
-                text=text,
-                is_violation=False,
-                label="ERROR",
-                confidence=0.0,
-                toxic_labels=[],
-                predictions={}
-            )
+            return self._fallback_prediction(text, "ERROR")
+    
+    async def analyze_texts(self, texts: list[str], threshold: Optional[float] = None) -> list[ToxicPrediction]:
+        """
+        Analyze many texts in one vectorized pass.
+        
+        All texts are normalized, vectorized into a single sparse matrix and
+        scored against the stacked LR weights in one matrix product.
+        
+        Args:
+            texts: The texts to analyze
+            threshold: Classification threshold (default: 0.5)
+        
+        Returns:
+            One ToxicPrediction per input text, in order
+        """
+        threshold = threshold or self.threshold
+        
+        if not texts:
+            return []
+        
+        if not self.models_loaded:
+            return [self._fallback_prediction(text, "NOT_LOADED") for text in texts]
+        
+        try:
+            probs, _, version = await get_inference_executor().run_cpu(self._predict_proba_batch, texts)
+        except InferenceQueueFull:
+            raise
+        except Exception as e:
+            print(f"Toxic batch analysis error: {e}")
+            return [self._fallback_prediction(text, "ERROR") for text in texts]
+        
+        return [
+            self._build_prediction(text, {label: float(prob) for label, prob in zip(LABEL_COLS, row)}, threshold, version)
+            for text, row in zip(texts, probs)
+        ]
     
     async def analyze_batch(self, texts: list[str], threshold: Optional[float] = None) -> dict:
         """
@@ -309,22 +529,24 @@ class ToxicDetectionService:
             Dict with results and summary
         """
         threshold = threshold or self.threshold
+        texts = texts[:100]
+        
+        predictions = await self.analyze_texts(texts, threshold)
         
         results = []
         toxic_count = 0
         
-        for text in texts[:100]:
-            result = await self.analyze_text(text, threshold)
-            
+        for result in predictions:
             if result.is_violation:
                 toxic_count += 1
             
             results.append({
-                "text": text,
+                "text": result.text,
                 "is_violation": result.is_violation,
                 "label": result.label,
                 "confidence": result.confidence,
-                "toxic_labels": result.toxic_labels
+                "toxic_labels": result.toxic_labels,
+                "model_version": result.model_version
             })
         
         return {
@@ -344,8 +566,11 @@ _toxic_service: Optional[ToxicDetectionService] = None
 
 
 def get_toxic_detection_service() -> ToxicDetectionService:
-    """Get or create toxic detection service instance"""
+    """
+    Get or create toxic detection service instance.
+    Models are loaded in the background by the model registry at startup.
+    """
     global _toxic_service
     if _toxic_service is None:
-        _toxic_service = ToxicDetectionService()
+        _toxic_service = ToxicDetectionService(models_path=settings.TOXIC_MODELS_PATH, load=False)
     return _toxic_service
@@ -0,0 +1,276 @@
+"""
+Compact Toxic Model Format
+Memory-mappable replacement for the pickled TF-IDF vectorizers and LR models.
+
+Layout of a compact model directory:
+    manifest.json      analyzer settings, labels, feature counts
+    word_keys.npy      uint64, sorted 64-bit hashes of the word n-gram vocabulary
+    word_cols.npy      int32, feature column of each hash (aligned with word_keys)
+    word_idf.npy       float32, IDF weight per word column
+    char_keys.npy      same three arrays for the char n-gram vectorizer
+    char_cols.npy
+    char_idf.npy
+    coef.npy           float32 (n_word + n_char, n_labels), stacked LR weights
+    intercept.npy      float64 (n_labels,)
+
+All arrays are opened with mmap_mode='r', so every uvicorn worker shares the
+same physical pages and loading takes milliseconds instead of unpickling an
+80k-entry Python dict per process.
+
+The vectorization below reproduces sklearn's TfidfVectorizer for the
+configurations used by Only_Model (built-in 'word' / 'char' analyzers,
+lowercase, sublinear_tf, smooth idf, l2 norm). Exporting any other
+configuration is refused.
+
+This module is shared by training (Only_Model/auto_train.py, save_models.py)
+and serving (ToxicDetectionService); keep it free of app imports.
+"""
+import hashlib
+import json
+import re
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+FORMAT_NAME = "soulspace-tfidf-lr"
+FORMAT_VERSION = 1
+COMPACT_DIR_NAME = "compact"
+
+# sklearn's char analyzer collapses runs of whitespace before building n-grams
+_WHITE_SPACES = re.compile(r"\s\s+")
+
+
+# ===========================
+# N-gram analyzers (sklearn-compatible)
+# ===========================
+
+def word_ngrams(text: str, token_pattern: re.Pattern, ngram_range: tuple[int, int]) -> list[str]:
+    """Same output as TfidfVectorizer(analyzer='word').build_analyzer()"""
+    tokens = token_pattern.findall(text.lower())
+    min_n, max_n = ngram_range
+    n_tokens = len(tokens)
+
+    ngrams = list(tokens) if min_n == 1 else []
+    for n in range(max(min_n, 2), min(max_n + 1, n_tokens + 1)):
+        for i in range(n_tokens - n + 1):
+            ngrams.append(" ".join(tokens[i:i + n]))
+    return ngrams
+
+
+def char_ngrams(text: str, ngram_range: tuple[int, int]) -> list[str]:
+    """Same output as TfidfVectorizer(analyzer='char').build_analyzer()"""
+    text = _WHITE_SPACES.sub(" ", text.lower())
+    min_n, max_n = ngram_range
+    text_len = len(text)
+
+    ngrams = []
+    for n in range(min_n, min(max_n + 1, text_len + 1)):
+        ngrams.extend(text[i:i + n] for i in range(text_len - n + 1))
+    return ngrams
+
+
+def hash_terms(terms: list[str]) -> np.ndarray:
+    """Stable 64-bit hashes (blake2b) for a list of terms"""
+    if not terms:
+        return np.empty(0, dtype="<u8")
+    digests = b"".join(hashlib.blake2b(t.encode("utf-8"), digest_size=8).digest() for t in terms)
+    return np.frombuffer(digests, dtype="<u8")
+
+
+# ===========================
+# Export (training side)
+# ===========================
+
+def _check_supported(vectorizer, analyzer: str):
+    params = vectorizer.get_params()
+    unsupported = {
+        "analyzer": (params["analyzer"], analyzer),
+        "lowercase": (params["lowercase"], True),
+        "preprocessor": (params["preprocessor"], None),
+        "tokenizer": (params["tokenizer"], None),
+        "stop_words": (params["stop_words"], None),
+        "strip_accents": (params["strip_accents"], None),
+        "use_idf": (params["use_idf"], True),
+        "binary": (params["binary"], False),
+        "norm": (params["norm"], "l2"),
+    }
+    for name, (value, expected) in unsupported.items():
+        if value != expected:
+            raise ValueError(f"Cannot export {analyzer} vectorizer: {name}={value!r} (expected {expected!r})")
+
+
+def _export_vectorizer(vectorizer, prefix: str, out_dir: Path) -> dict:
+    terms = list(vectorizer.vocabulary_.keys())
+    cols = np.fromiter((vectorizer.vocabulary_[t] for t in terms), dtype=np.int32, count=len(terms))
+    keys = hash_terms(terms)
+
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+    cols = cols[order]
+    if len(keys) > 1 and np.any(keys[1:] == keys[:-1]):
+        raise ValueError(f"Hash collision in {prefix} vocabulary")
+
+    np.save(out_dir / f"{prefix}_keys.npy", keys)
+    np.save(out_dir / f"{prefix}_cols.npy", cols)
+    np.save(out_dir / f"{prefix}_idf.npy", vectorizer.idf_.astype(np.float32))
+
+    params = vectorizer.get_params()
+    return {
+        "n_features": len(vectorizer.idf_),
+        "ngram_range": list(params["ngram_range"]),
+        "token_pattern": params["token_pattern"],
+        "sublinear_tf": bool(params["sublinear_tf"]),
+    }
+
+
+def export_compact_model(lr_models: dict, tfidf_word, tfidf_char, out_dir, labels: list[str]) -> Path:
+    """
+    Write vectorizers and stacked LR weights in the compact format.
+
+    Returns:
+        Path of the written directory
+    """
+    _check_supported(tfidf_word, "word")
+    _check_supported(tfidf_char, "char")
+
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    word_meta = _export_vectorizer(tfidf_word, "word", out_dir)
+    char_meta = _export_vectorizer(tfidf_char, "char", out_dir)
+
+    coef = np.vstack([lr_models[label].coef_[0] for label in labels]).T.astype(np.float32)
+    intercept = np.array([lr_models[label].intercept_[0] for label in labels], dtype=np.float64)
+    if coef.shape[0] != word_meta["n_features"] + char_meta["n_features"]:
+        raise ValueError(f"LR models expect {coef.shape[0]} features, vectorizers produce "
+                         f"{word_meta['n_features'] + char_meta['n_features']}")
+    np.save(out_dir / "coef.npy", np.ascontiguousarray(coef))
+    np.save(out_dir / "intercept.npy", intercept)
+
+    manifest = {
+        "format": FORMAT_NAME,
+        "format_version": FORMAT_VERSION,
+        "labels": list(labels),
+        "word": word_meta,
+        "char": char_meta,
+        "created_at": datetime.utcnow().isoformat(),
+    }
+    # Manifest last: its presence marks a complete export
+    with open(out_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    return out_dir
+
+
+# ===========================
+# Load & predict (serving side)
+# ===========================
+
+class _HashedVocabulary:
+    """Memory-mapped hashed vocabulary + IDF for one vectorizer"""
+
+    def __init__(self, model_dir: Path, prefix: str, meta: dict):
+        self.keys = np.load(model_dir / f"{prefix}_keys.npy", mmap_mode="r")
+        self.cols = np.load(model_dir / f"{prefix}_cols.npy", mmap_mode="r")
+        self.idf = np.load(model_dir / f"{prefix}_idf.npy", mmap_mode="r")
+        self.n_features = meta["n_features"]
+        self.ngram_range = tuple(meta["ngram_range"])
+        self.sublinear_tf = meta["sublinear_tf"]
+        self.token_pattern = re.compile(meta["token_pattern"]) if prefix == "word" else None
+
+    def analyze(self, text: str) -> list[str]:
+        if self.token_pattern is not None:
+            return word_ngrams(text, self.token_pattern, self.ngram_range)
+        return char_ngrams(text, self.ngram_range)
+
+    def transform(self, texts: list[str]):
+        """TF-IDF (l2-normalized) sparse matrix for the given texts"""
+        from scipy.sparse import csr_matrix
+
+        # Count n-grams per text, then hash each distinct n-gram of the batch once
+        doc_counts = [Counter(self.analyze(text)) for text in texts]
+        unique_terms = list(set().union(*doc_counts)) if doc_counts else []
+        term_index = {term: i for i, term in enumerate(unique_terms)}
+        unique_hashes = hash_terms(unique_terms)
+
+        rows = np.repeat(np.arange(len(texts), dtype=np.int32), [len(c) for c in doc_counts])
+        term_ids = np.fromiter((term_index[t] for c in doc_counts for t in c), dtype=np.int64, count=len(rows))
+        tf = np.fromiter((n for c in doc_counts for n in c.values()), dtype=np.float64, count=len(rows))
+        hashes = unique_hashes[term_ids]
+
+        # Vectorized vocabulary lookup: binary search of all n-grams at once
+        pos = np.searchsorted(self.keys, hashes)
+        pos[pos >= len(self.keys)] = 0
+        hit = self.keys[pos] == hashes if len(self.keys) else np.zeros(len(hashes), dtype=bool)
+        cols = np.asarray(self.cols[pos[hit]])
+        rows = rows[hit]
+        tf = tf[hit]
+
+        counts = csr_matrix((tf, (rows, cols)), shape=(len(texts), self.n_features))
+        counts.sum_duplicates()
+
+        if self.sublinear_tf:
+            np.log(counts.data, counts.data)
+            counts.data += 1
+        counts.data *= np.asarray(self.idf)[counts.indices]
+
+        # Row-wise l2 normalization
+        norms = np.sqrt(np.asarray(counts.multiply(counts).sum(axis=1)).ravel())
+        norms[norms == 0] = 1.0
+        counts.data /= np.repeat(norms, np.diff(counts.indptr))
+        return counts
+
+
+class CompactToxicModel:
+    """
+    Memory-mapped TF-IDF + stacked LR model.
+
+    Usage:
+        model = CompactToxicModel.load(models_path / "compact")
+        probs = model.predict_proba(normalized_texts)   # (n_texts, n_labels)
+    """
+
+    def __init__(self, model_dir: Path, manifest: dict):
+        self.model_dir = model_dir
+        self.manifest = manifest
+        self.labels = manifest["labels"]
+        self.word = _HashedVocabulary(model_dir, "word", manifest["word"])
+        self.char = _HashedVocabulary(model_dir, "char", manifest["char"])
+        self.coef = np.load(model_dir / "coef.npy", mmap_mode="r")
+        self.intercept = np.load(model_dir / "intercept.npy")
+
+    @staticmethod
+    def exists(model_dir) -> bool:
+        return (Path(model_dir) / "manifest.json").exists()
+
+    @classmethod
+    def load(cls, model_dir) -> "CompactToxicModel":
+        model_dir = Path(model_dir)
+        with open(model_dir / "manifest.json", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("format") != FORMAT_NAME or manifest.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported model format in {model_dir}: "
+                             f"{manifest.get('format')} v{manifest.get('format_version')}")
+        return cls(model_dir, manifest)
+
+    def transform(self, normalized_texts: list[str]):
+        from scipy.sparse import hstack
+        return hstack([self.word.transform(normalized_texts), self.char.transform(normalized_texts)]).tocsr()
+
+    def predict_proba(self, normalized_texts: list[str], vec=None) -> np.ndarray:
+        """Probability of each label for each text, ordered like self.labels"""
+        from scipy.special import expit
+        if vec is None:
+            vec = self.transform(normalized_texts)
+        return expit(vec @ self.coef + self.intercept)
+
+
+def load_compact_model(models_path) -> Optional[CompactToxicModel]:
+    """Load `<models_path>/compact` if an export exists there"""
+    model_dir = Path(models_path) / COMPACT_DIR_NAME
+    if not CompactToxicModel.exists(model_dir):
+        return None
+    return CompactToxicModel.load(model_dir)
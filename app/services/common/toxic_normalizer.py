@@ -0,0 +1,124 @@
+"""
+Toxic Text Normalizer
+Single, precompiled normalization pipeline shared by training
+(Only_Model/auto_train.py, Only_Model/app.py) and serving (ToxicDetectionService).
+
+The original implementation ran ~15 `re.sub` passes per text and went
+through the `re` module cache for every pattern on every call. Here all
+patterns are compiled once at import and fused wherever the result stays
+identical to the sequential pipeline:
+
+    1. strip HTML tags
+    2. benign / intensified profanity in one pass ("so fucking good" -> "so very good")
+    3. repeated characters and repeated punctuation in one pass
+    4. obfuscated profanity: one combined scan; the per-pattern passes only run
+       when it finds something (replacements can cascade, e.g. "b.i.t.c.h.e.l.l",
+       so they are not fused)
+    5. chat lingo in one pass
+
+plus plain string operations for lowercasing, "@" -> "a" and whitespace.
+Run `python scripts/bench_toxic_normalizer.py` to check equivalence and throughput.
+
+Keep this module free of app imports: Only_Model loads it from a bare checkout.
+"""
+import re
+
+# Profanity patterns (obfuscated spelling -> canonical word)
+PROFANITY_PATTERNS = [
+    (r'f[\W_]*u[\W_]*c[\W_]*k', 'fuck'),
+    (r'sh[\W_]*i[\W_]*t', 'shit'),
+    (r'b[\W_]*i[\W_]*t[\W_]*c[\W_]*h', 'bitch'),
+    (r'a[\W_]*s[\W_]*s[\W_]*h?[\W_]*o?[\W_]*l[\W_]*e?', 'asshole'),
+    (r'd[\W_]*a[\W_]*m[\W_]*n', 'damn'),
+    (r'h[\W_]*e[\W_]*l[\W_]*l', 'hell'),
+    (r'idi0t', 'idiot'),
+    (r'st\*pid', 'stupid'),
+]
+
+# Chat lingo normalization
+CHAT_MAP = {
+    'u': 'you',
+    'ur': 'your',
+    'r': 'are',
+}
+
+# Positive words for context-aware profanity normalization
+POSITIVE_WORDS = [
+    "good", "great", "awesome", "amazing", "nice",
+    "cool", "fun", "funny", "love", "lovely", "beautiful",
+    "perfect", "excellent", "fantastic", "wonderful", "brilliant",
+    "superb", "outstanding", "impressive", "incredible", "fabulous",
+    "terrific", "magnificent", "marvelous", "spectacular", "phenomenal",
+    "cute", "sweet", "adorable", "delightful", "charming",
+    "interesting", "exciting", "thrilling", "enjoyable", "pleasant",
+    "happy", "glad", "joyful", "pleased", "satisfied",
+    "best", "better", "top", "fine", "solid", "strong",
+    "smart", "clever", "genius", "wise", "talented"
+]
+
+_positive = "|".join(POSITIVE_WORDS)
+
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+
+# Intensified form first: at any position it is tried before the plain benign form,
+# exactly like running the intensified pass before the benign pass.
+BENIGN_PROFANITY_PATTERN = re.compile(
+    rf"\b(?:"
+    rf"(?P<intensifier>so|really|very|pretty|quite)\s+(?:fucking|fuckin|fking)\s+(?P<intensified>{_positive})"
+    rf"|(?:fucking|fuckin|fking|freaking)\s+(?P<benign>{_positive})"
+    rf")\b",
+    flags=re.IGNORECASE
+)
+# Every benign match contains one of these (letters without case-folding variants once lowercased)
+_BENIGN_MARKERS = ("fuc", "fk", "freak")
+
+# Runs of ! ? . collapse to one; any other char repeated 3+ times collapses to two
+REPEAT_PATTERN = re.compile(r'([!?.])\1+|(.)\2{2,}')
+
+_COMPILED_PROFANITY = [(re.compile(pattern, flags=re.IGNORECASE), repl) for pattern, repl in PROFANITY_PATTERNS]
+# No hit for the union means no single pattern can match either: skip all passes.
+# On lowercased text IGNORECASE only matters for "ı" and "ſ" (they match i / s);
+# without them the case-sensitive union, which the regex engine scans much faster, is exact.
+ANY_PROFANITY_PATTERN = re.compile("|".join(pattern for pattern, _ in PROFANITY_PATTERNS), flags=re.IGNORECASE)
+_ANY_PROFANITY_LOWER = re.compile("|".join(pattern for pattern, _ in PROFANITY_PATTERNS))
+_CASE_FOLD_SPECIALS = ("ı", "ſ")
+
+CHAT_PATTERN = re.compile(r"\b(%s)\b" % "|".join(sorted(CHAT_MAP, key=len, reverse=True)))
+
+
+def _benign_repl(m: re.Match) -> str:
+    if m.group("intensifier") is not None:
+        return f"{m.group('intensifier')} very {m.group('intensified')}"
+    return f"very {m.group('benign')}"
+
+
+def _repeat_repl(m: re.Match) -> str:
+    punct = m.group(1)
+    return punct if punct is not None else m.group(2) * 2
+
+
+def _chat_repl(m: re.Match) -> str:
+    return CHAT_MAP[m.group(1)]
+
+
+def _has_profanity(text: str) -> bool:
+    if any(c in text for c in _CASE_FOLD_SPECIALS):
+        return ANY_PROFANITY_PATTERN.search(text) is not None
+    return _ANY_PROFANITY_LOWER.search(text) is not None
+
+
+def normalize_for_toxic(text: str) -> str:
+    """Normalize text for toxic detection (training and serving)"""
+    text = text.lower()
+    text = HTML_TAG_PATTERN.sub(' ', text)
+    if any(marker in text for marker in _BENIGN_MARKERS):
+        text = BENIGN_PROFANITY_PATTERN.sub(_benign_repl, text)
+    # Leet speak: @ -> a
+    text = text.replace('@', 'a')
+    text = REPEAT_PATTERN.sub(_repeat_repl, text)
+    if _has_profanity(text):
+        for pattern, repl in _COMPILED_PROFANITY:
+            text = pattern.sub(repl, text)
+    text = CHAT_PATTERN.sub(_chat_repl, text)
+    # Collapse whitespace
+    return " ".join(text.split())
@@ -0,0 +1,32 @@
+"""
+Trending Score
+"Log-hot" ranking (the Reddit hot formula, without downvotes):
+
+    trending_score = log10(max(1, likes + TRENDING_COMMENT_WEIGHT * comments))
+                     + (created_at - EPOCH) / TRENDING_DECAY_SECONDS
+
+Every TRENDING_DECAY_SECONDS of age is worth 10x the engagement, so newer
+posts need less engagement to rank equally. Unlike Hacker News' divide-by-age
+formula, the score does not depend on the current time: it only changes when
+a counter changes. It is stored on the post (`trending_score`), recomputed
+on every like / comment, and `GET /anon-posts/trending` reads the top-K
+straight from the (moderation_status, trending_score) index.
+"""
+import math
+from datetime import datetime
+
+from app.core.config import settings
+
+EPOCH = datetime(2024, 1, 1)
+
+
+def trending_score(like_count: int, comment_count: int, created_at: datetime) -> float:
+    engagement = max(0, like_count or 0) + settings.TRENDING_COMMENT_WEIGHT * max(0, comment_count or 0)
+    age = (created_at - EPOCH).total_seconds() / settings.TRENDING_DECAY_SECONDS
+    return round(math.log10(max(1.0, engagement)) + age, 7)
+
+
+def score_post(post: dict) -> float:
+    # Documents without created_at fall back to their ObjectId timestamp
+    created_at = post.get("created_at") or post["_id"].generation_time.replace(tzinfo=None)
+    return trending_score(post.get("like_count", 0), post.get("comment_count", 0), created_at)
@@ -3,41 +3,26 @@ from app.repositories.anon_comment_repository import AnonCommentRepository
 from app.repositories.anon_post_repository import AnonPostRepository
 from app.models.anon_comment_model import AnonComment
 from app.repositories.moderation_log_repository import ModerationLogRepository
+from app.core.config import settings
+from app.services.common.lexicon_store import get_lexicon_store
+from app.services.common.moderation_queue import SCAN_QUEUED, enqueue
 from bson import ObjectId
-import re
 
 class AnonCommentService:
     def __init__(self, db):
         self.comment_repo = AnonCommentRepository(db)
         self.post_repo = AnonPostRepository(db)
         self.log_repo = ModerationLogRepository(db)
-        self.keywords_collection = db["sensitive_keywords"]
+        self.db = db
 
     async def create_comment(self, user_id: str, post_id: str, content: str, is_preset: bool):
-        detected = []
-        action = "Approved"
-        scan_result = "Safe"
-        flagged_reason = None
-
-        # --- load sensitive keywords ---
-        keywords = await self.keywords_collection.find().to_list(length=1000)
-
-        for kw in keywords:
-            base = kw["keyword"].lower()
-            variations = [v.lower() for v in kw.get("variations", [])]
-            all_terms = [base] + variations
-            for term in all_terms:
-                if re.search(rf"\b{re.escape(term)}\b", content, re.IGNORECASE):
-                    detected.append(term)
-                    if kw["severity"] == "hard":
-                        action = "Blocked"
-                        scan_result = "Unsafe"
-                        flagged_reason = f"Hard block keyword detected: {term}"
-                    elif kw["severity"] == "soft" and action != "Blocked":
-                        action = "Pending"
-                        scan_result = "Suspicious"
-                        flagged_reason = f"Soft block keyword detected: {term}"
-
+        if settings.ASYNC_MODERATION:
+            # Save as pending and return; the moderation worker scans it in a batch
+            action, detected = "Pending", None
+        else:
+            # --- scan sensitive keywords (in-memory snapshot, one pass over the automaton) ---
+            lexicons = await get_lexicon_store().ensure_loaded(self.db)
+            action, detected = self._scan(lexicons, content)
 
         # --- build comment object ---
         # Ensure user_id is ObjectId for consistency
@@ -58,24 +43,57 @@ class AnonCommentService:
         # Ensure ObjectId types for database
         comment_data["user_id"] = user_oid
         comment_data["post_id"] = ObjectId(post_id)
+        if detected is None:
+            comment_data["ai_scan_result"] = SCAN_QUEUED
 
         new_comment = await self.comment_repo.create(comment_data)
 
+        if detected is None:
+            await enqueue(self.db, "comment", new_comment["_id"], user_id, content)
+        else:
+            await self._apply(new_comment, user_id, action, detected)
+
+        return new_comment
+
+    @staticmethod
+    def _scan(lexicons, content: str) -> tuple[str, list[str]]:
+        """(action, detected keywords) theo mức độ của từ khóa nhạy cảm"""
+        detected = []
+        action = "Approved"
+        for hit in lexicons.keyword_matcher.match(content):
+            detected.append(hit.term)
+            if hit.severity == "hard":
+                action = "Blocked"
+            elif hit.severity == "soft" and action != "Blocked":
+                action = "Pending"
+        return action, detected
+
+    async def _apply(self, comment: dict, user_id, action: str, detected: list[str]):
         # --- update comment_count của post ---
         if action == "Approved":
-            await self.post_repo.increment_comment_count(post_id)
+            await self.post_repo.increment_comment_count(str(comment["post_id"]))
 
         # --- log moderation ---
         await self.log_repo.create_log(
-            content_id=new_comment["_id"],
+            content_id=comment["_id"],
             content_type="comment",
             user_id=user_id,
-            text=content,
+            text=comment["content"],
             detected_keywords=detected,
             action=action
         )
 
-        return new_comment
+    async def moderate_queued(self, jobs: list[dict]):
+        """
+        Moderation worker: scan queued comments against the keyword snapshot and apply the results.
+        Comments an admin already reviewed (no longer SCAN_QUEUED) are left untouched.
+        """
+        lexicons = await get_lexicon_store().ensure_loaded(self.db)
+        for job in jobs:
+            action, detected = self._scan(lexicons, job["text"])
+            comment = await self.comment_repo.apply_moderation(job["content_id"], action)
+            if comment is not None:
+                await self._apply(comment, job["user_id"], action, detected)
     
     async def increment_comment_count(self, post_id: str):
         await self.collection.update_one(
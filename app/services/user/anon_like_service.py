@@ -1,7 +1,6 @@
 from datetime import datetime
 from app.repositories.anon_like_repository import AnonLikeRepository
 from app.repositories.anon_post_repository import AnonPostRepository
-from bson import ObjectId
 
 class AnonLikeService:
     def __init__(self, db):
@@ -11,19 +10,13 @@ class AnonLikeService:
     async def like_post(self, user_id: str, post_id: str):
         # thêm like
         new_like = await self.like_repo.like(post_id, user_id, datetime.utcnow())
-        # tăng like_count trong post
-        await self.post_repo.collection.update_one(
-            {"_id": new_like["post_id"]},
-            {"$inc": {"like_count": 1}}
-        )
+        # tăng like_count trong post (+ trending_score)
+        await self.post_repo.increment_counters(new_like["post_id"], {"like_count": 1})
         return {"liked": True}
 
     async def unlike_post(self, user_id: str, post_id: str):
         # xóa like
         await self.like_repo.unlike(post_id, user_id)
-        # giảm like_count trong post
-        await self.post_repo.collection.update_one(
-            {"_id": ObjectId(post_id)},
-            {"$inc": {"like_count": -1}}
-        )
+        # giảm like_count trong post (+ trending_score)
+        await self.post_repo.increment_counters(post_id, {"like_count": -1})
         return {"liked": False}
\ No newline at end of file
@@ -1,19 +1,24 @@
-import re
 from datetime import datetime
 from typing import Optional
 from app.repositories.anon_post_repository import AnonPostRepository
+from app.repositories.hashtag_repository import HashtagRepository, normalize_hashtags
 from app.models.anon_post_model import AnonPost
 from app.repositories.moderation_log_repository import ModerationLogRepository
 from app.services.common.notification_service import NotificationService
-from app.services.common.toxic_detection_service import get_toxic_detection_service
+from app.core.config import settings
+from app.services.common.moderation_cascade import ModerationDecision, get_moderation_cascade
+from app.services.common.moderation_queue import SCAN_QUEUED, enqueue
+from app.services.common.approved_timeline import get_approved_timeline
+from app.services.common.trending import score_post
 
 class AnonPostService:
     def __init__(self, db):
         self.db = db
         self.post_repo = AnonPostRepository(db)
+        self.hashtag_repo = HashtagRepository(db)
         self.log_repo = ModerationLogRepository(db)
         self.notification_service = NotificationService(db)
-        self.toxic_service = get_toxic_detection_service()
+        self.moderation = get_moderation_cascade()
 
     async def create_post(self, user_id: str, content: str, is_anonymous: bool = True, hashtags: list[str] = [], image_url: str = None):
         """
@@ -24,67 +29,31 @@ class AnonPostService:
         """
         from bson import ObjectId
         
-        # Default values
-        action = "Approved"
-        scan_result = "Safe"
-        flagged_reason = None
-        toxic_labels = []
-        toxic_confidence = 0.0
-        toxic_predictions = {}
-        
-        # --- AI Toxic Detection ---
-        try:
-            # Check if toxic API is available
-            is_api_healthy = await self.toxic_service.check_health()
-            
-            if is_api_healthy:
-                # Use AI model for toxic detection
-                toxic_result = await self.toxic_service.analyze_text(content, threshold=0.5)
-                
-                toxic_labels = toxic_result.toxic_labels
-                toxic_confidence = toxic_result.confidence
-                toxic_predictions = toxic_result.predictions
-                
-                if toxic_result.is_violation:
-                    # Check severity based on toxic types
-                    severe_types = ["severe_toxic", "threat", "identity_hate"]
-                    has_severe = any(label in toxic_labels for label in severe_types)
-                    
-                    if has_severe or toxic_confidence >= 0.8:
-                        action = "Blocked"
-                        scan_result = "Unsafe"
-                        flagged_reason = f"AI detected toxic content: {', '.join(toxic_labels)} (confidence: {toxic_confidence:.2%})"
-                    else:
-                        action = "Pending"
-                        scan_result = "Suspicious"
-                        flagged_reason = f"AI flagged for review: {', '.join(toxic_labels)} (confidence: {toxic_confidence:.2%})"
-            else:
-                # Fallback: API not available, approve but flag for manual review
-                scan_result = "Not Scanned"
-                flagged_reason = "AI service unavailable - manual review required"
-                
-        except Exception as e:
-            # Error in AI detection - approve but log error
-            scan_result = "Error"
-            flagged_reason = f"AI scan error: {str(e)}"
-        
-        # --- Basic content validation (keep these checks) ---
-        # Check for links
-        if re.search(r"(https?:\/\/\S+|(?:www\.)?[a-zA-Z0-9-]+\.[a-z]{2,}(\/\S*)?)", content, re.IGNORECASE):
-            if action == "Approved":
-                action = "Pending"
-                scan_result = "Suspicious"
-            flagged_reason = (flagged_reason or "") + " | Contains link"
-        
-        # Check for phone numbers
-        if re.search(r"\b(?:\+?\d[\d\-\s]{8,14}\d)\b", content):
-            if action == "Approved":
-                action = "Pending"
-                scan_result = "Suspicious"
-            flagged_reason = (flagged_reason or "") + " | Contains phone number"
+        # --- Moderation ---
+        if settings.ASYNC_MODERATION:
+            # Save as pending and return; the moderation worker scans it in a batch
+            decision = None
+            action, scan_result, flagged_reason = "Pending", SCAN_QUEUED, None
+            toxic_labels, toxic_confidence, toxic_predictions = [], 0.0, {}
+            model_version = None
+        else:
+            # Moderation cascade: lexicon → link/phone → TF-IDF → PhoBERT
+            decision = await self.moderation.moderate(content, db=self.db)
+            action = decision.action
+            scan_result = decision.scan_result
+            flagged_reason = decision.flagged_reason
+            toxic_labels = decision.toxic_labels
+            toxic_confidence = decision.toxic_confidence
+            toxic_predictions = decision.toxic_predictions
+            model_version = decision.model_version
         
         # --- Create post ---
         user_oid = ObjectId(user_id) if isinstance(user_id, str) else user_id
+        hashtags = normalize_hashtags(hashtags)
+        # MongoDB stores milliseconds; the approved timeline buffers this document,
+        # so its created_at must equal the stored one or cursors skip / repeat posts
+        now = datetime.utcnow()
+        created_at = now.replace(microsecond=now.microsecond // 1000 * 1000)
         
         post_data = AnonPost(
             user_id=user_oid,
@@ -92,7 +61,7 @@ class AnonPostService:
             is_anonymous=is_anonymous,
             hashtags=hashtags,
             image_url=image_url,
-            created_at=datetime.utcnow(),
+            created_at=created_at,
             moderation_status=action,
             ai_scan_result=scan_result,
             flagged_reason=flagged_reason,
@@ -104,6 +73,7 @@ class AnonPostService:
         post_data["toxic_labels"] = toxic_labels
         post_data["toxic_confidence"] = toxic_confidence
         post_data["toxic_predictions"] = toxic_predictions
+        post_data["model_version"] = model_version
         
         # Remove the auto-generated _id and let MongoDB generate a proper ObjectId
         if "_id" in post_data:
@@ -111,55 +81,104 @@ class AnonPostService:
         
         # Restore user_id as ObjectId (dict() serializes it to string)
         post_data["user_id"] = user_oid
+        post_data["trending_score"] = score_post(post_data)
+        # Tags count toward popular hashtags once the post is approved (count_hashtags)
+        post_data["hashtags_counted"] = action == "Approved"
 
         new_post = await self.post_repo.create(post_data)
+        if action == "Approved":
+            await self.hashtag_repo.record_usage(hashtags)
+        # Fan out to the feed timeline before enrichment rewrites user_id
+        await get_approved_timeline().added(self.db, new_post)
 
-        # --- Log moderation ---
-        await self.log_repo.create_log(
-            content_id=new_post["_id"],
-            content_type="post",
-            user_id=user_id,
-            text=content,
-            detected_keywords=toxic_labels,
-            action=action
-        )
+        if decision is None:
+            await enqueue(self.db, "post", new_post["_id"], user_id, content)
+        else:
+            await self._log_and_notify(new_post["_id"], user_id, content, decision)
         
         # Enrich post với author info
         enriched_post = await self.post_repo._enrich_post(new_post, str(user_id))
-        enriched_post["detected_keywords"] = toxic_labels
+        enriched_post["detected_keywords"] = decision.detected_keywords if decision else []
         enriched_post["toxic_confidence"] = toxic_confidence
         enriched_post["toxic_predictions"] = toxic_predictions
+        
+        return enriched_post
+
+    async def moderate_queued(self, jobs: list[dict]):
+        """
+        Moderation worker: scan queued posts in one cascade batch and apply the results.
+        Posts an admin already reviewed (no longer SCAN_QUEUED) are left untouched.
+        """
+        decisions = await self.moderation.moderate_batch([job["text"] for job in jobs], db=self.db)
+        approved = []
+        for job, decision in zip(jobs, decisions):
+            applied = await self.post_repo.apply_moderation(job["content_id"], {
+                "moderation_status": decision.action,
+                "ai_scan_result": decision.scan_result,
+                "flagged_reason": decision.flagged_reason,
+                "toxic_labels": decision.toxic_labels,
+                "toxic_confidence": decision.toxic_confidence,
+                "toxic_predictions": decision.toxic_predictions,
+                "model_version": decision.model_version,
+            })
+            if applied:
+                if decision.action == "Approved":
+                    approved.append(job["content_id"])
+                await self._log_and_notify(job["content_id"], job["user_id"], job["text"], decision)
+        if approved:
+            await self.post_repo.count_hashtags(approved)
+            await get_approved_timeline().changed(self.db)
+
+    async def _log_and_notify(self, post_id, user_id, content: str, decision: ModerationDecision):
+        """Ghi moderation log và thông báo cho tác giả nếu bài bị chặn / chờ duyệt."""
+        await self.log_repo.create_log(
+            content_id=post_id,
+            content_type="post",
+            user_id=user_id,
+            text=content,
+            detected_keywords=decision.detected_keywords,
+            action=decision.action
+        )
 
-        # --- Notification Logic ---
-        if action == "Blocked":
+        if decision.action == "Blocked":
             await self.notification_service.create_notification(
                 user_id=user_id,
                 title="Bài viết bị chặn",
                 message=f"Bài viết của bạn đã bị chặn vì phát hiện nội dung không phù hợp. Nếu bạn cần hỗ trợ, hãy liên hệ với chuyên gia tâm lý.",
                 type="alert"
             )
-        elif action == "Pending":
+        elif decision.action == "Pending":
              await self.notification_service.create_notification(
                 user_id=user_id,
                 title="Bài viết đang chờ duyệt",
                 message="Bài viết của bạn đang được xem xét. Chúng tôi sẽ thông báo khi có kết quả.",
                 type="system"
             )
-        
-        return enriched_post
 
-    async def list_posts(self, limit: int = 20, current_user_id: Optional[str] = None) -> list:
+    async def list_posts(self, limit: int = 20, current_user_id: Optional[str] = None, cursor: Optional[str] = None,
+                         tag: Optional[str] = None) -> list:
         """
-        Lấy danh sách bài viết đã được duyệt.
+        Lấy danh sách bài viết đã được duyệt (lọc theo hashtag nếu có `tag`).
         Nếu có current_user_id, sẽ check is_liked và is_owner.
         """
-        return await self.post_repo.list(limit=limit, current_user_id=current_user_id)
+        tags = normalize_hashtags([tag]) if tag else []
+        if tag and not tags:
+            return []
+        return await self.post_repo.list(limit=limit, current_user_id=current_user_id, cursor=cursor,
+                                         tag=tags[0] if tags else None)
+
+    async def list_popular_hashtags(self, limit: int = 20) -> list:
+        return await self.hashtag_repo.list_popular(limit)
+
+    async def list_trending(self, limit: int = 20, current_user_id: Optional[str] = None) -> list:
+        """Bài viết đã duyệt xếp theo trending_score."""
+        return await self.post_repo.list_trending(limit=limit, current_user_id=current_user_id)
 
-    async def get_my_posts(self, user_id: str, limit: int = 50) -> list:
+    async def get_my_posts(self, user_id: str, limit: int = 50, cursor: Optional[str] = None) -> list:
         """
         Lấy tất cả bài viết của user (bao gồm Pending, Blocked).
         """
-        return await self.post_repo.list_by_user(user_id=user_id, limit=limit)
+        return await self.post_repo.list_by_user(user_id=user_id, limit=limit, cursor=cursor)
 
     async def get_post_detail(self, post_id: str, current_user_id: Optional[str] = None) -> dict:
         """
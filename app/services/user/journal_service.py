@@ -1,87 +1,105 @@
-import asyncio
 from bson import ObjectId
 from app.repositories.journal_repository import JournalRepository
 from app.schemas.user.journal_schema import JournalCreate
 from app.models.journal_model import Journal
 from app.core.constants import ICON_SENTIMENT_MAP
-from app.core.config import settings
 from app.services.common.toxic_detection_service import get_toxic_detection_service
-import assemblyai as aai
-from transformers import pipeline
+from app.services.common.sentiment_service import analyze_long_sentiment_async, aggregate_sentiment
+from app.services.common.inference_executor import InferenceQueueFull
+from app.services.common.model_registry import get_model_registry
+from app.services.common import speech_to_text
+from app.services.common.moderation_queue import enqueue, requeue, JOBS_COLLECTION, FAILED as JOB_FAILED
+from app.services.common.notification_service import NotificationService
 from datetime import datetime
+import os
 
-# Set AssemblyAI API key
-aai.settings.api_key = settings.ASSEMBLYAI_API_KEY
-
-# Initialize sentiment analysis pipeline
-if settings.SENTIMENT_MODEL.lower() == "roberta":
-    SENTIMENT_MODEL = "cardiffnlp/twitter-roberta-base-sentiment"
-else:
-    SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
-sentiment_pipeline = pipeline(
-    "sentiment-analysis",
-    model=SENTIMENT_MODEL,
-    framework="pt"
-)
-
-def analyze_sentiment(text: str):
-    """Analyze sentiment of the given text."""
-    if not text:
-        return "Neutral", 0.0
-    result = sentiment_pipeline(text)[0]
-    raw_label = result["label"]
-    label_map = {"LABEL_0": "Negative", "LABEL_1": "Neutral", "LABEL_2": "Positive"}
-    label = label_map.get(raw_label, "Neutral")
-    score = result["score"] if label == "Positive" else -result["score"] if label == "Negative" else 0.0
-    return label, score
+JOURNAL_JOB = "journal"  # moderation queue content type
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"  # the job ran out of attempts; sentiment stays the user's emotion
 
 class JournalService:
     def __init__(self, journal_repo: JournalRepository):
         self.journal_repo = journal_repo
+        self._db = journal_repo.collection.database if journal_repo else None
         self.toxic_service = get_toxic_detection_service()
 
     async def transcribe_audio(self, audio_content: bytes) -> str:
-        """Transcribe an English MP3 audio from bytes using AssemblyAI (async wrapper)."""
+        """Transcribe audio bytes with the configured STT backend (STT_BACKEND)."""
         try:
-            if not audio_content:
-                raise ValueError("Audio content is empty")
-
-            def _transcribe():
-                transcriber = aai.Transcriber()
-                transcript = transcriber.transcribe(audio_content)
-                if transcript.status == aai.TranscriptStatus.error:
-                    raise Exception(f"Transcription error: {transcript.error}")
-                return transcript.text
-
-            transcription = await asyncio.to_thread(_transcribe)
-            return transcription
+            return await speech_to_text.transcribe_audio(audio_content)
         except Exception as e:
             return f"Transcription error: {str(e)}"
 
     async def create_journal(self, user_id: str, data: JournalCreate) -> Journal:
-        """Create a new journal entry with STT, sentiment analysis, and toxic detection."""
+        """
+        Save the journal right away as processing_status="pending".
+        STT, toxic detection and sentiment run in the background journal worker
+        (`enrich_queued`); until then the sentiment comes from the user's emotion.
+        """
         journal_dict = data.dict(exclude_unset=True)
         journal_dict["user_id"] = ObjectId(user_id)
         journal_dict["created_at"] = datetime.utcnow()
+        label, score = ICON_SENTIMENT_MAP.get(data.emotion_label, ("Neutral", 0.0))
+        journal_dict["sentiment_label"] = label
+        journal_dict["sentiment_score"] = round(score, 2)
+        journal_dict["tags"] = data.tags or []
+        journal_dict["processing_status"] = PENDING
+        journal = await self.journal_repo.create(journal_dict)
+        await enqueue(self._db, JOURNAL_JOB, journal.id, user_id, data.text_content or "")
+        return journal
+
+    async def enrich_queued(self, jobs: list[dict]):
+        """
+        Journal worker: transcribe, score and finish the queued journals.
+        Every step is idempotent - a transcript is saved before scoring so a
+        retried job does not run STT again, and results are only applied while
+        the journal is still pending.
+        """
+        journals = {doc["_id"]: doc for doc in await self.journal_repo.get_many([job["content_id"] for job in jobs])}
+        for job in jobs:
+            journal = journals.get(job["content_id"])
+            if journal is None or journal.get("processing_status") != PENDING:
+                continue
+            if journal.get("voice_note_path") and journal.get("voice_text") is None:
+                journal["voice_text"] = await self._transcribe_file(journal["voice_note_path"])
+                await self.journal_repo.update_fields(journal["_id"], {"voice_text": journal["voice_text"]})
+
+            result = await self._analyze(journal)
+            result["processing_status"] = DONE
+            if await self.journal_repo.update_fields(journal["_id"], result, status=PENDING):
+                self._remove_voice_file(journal.get("voice_note_path"))
+                if journal.get("voice_note_path"):
+                    await self._notify_ready(journal["user_id"])
 
+    async def _transcribe_file(self, path: str) -> str:
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            return await speech_to_text.transcribe_audio(audio)
+        except InferenceQueueFull:
+            # STT pool is saturated: retry the job later instead of saving an error
+            raise
+        except Exception as e:
+            return f"Transcription error: {str(e)}"
+
+    async def _analyze(self, journal: dict) -> dict:
+        """Toxic detection + sentiment for a journal's text and transcript."""
         # Collect all text sources for comprehensive sentiment analysis
-        text_sources = []
-        # Process voice note if provided
-        if data.voice_note_path:
-            with open(data.voice_note_path, "rb") as f:
-                voice_text = await self.transcribe_audio(f.read())
-            journal_dict["voice_text"] = voice_text
-            if voice_text and not voice_text.startswith("Transcription error"):
-                text_sources.append(voice_text)
-        # Add text content if provided
-        if data.text_content:
-            text_sources.append(data.text_content)
-        # Combine all text for sentiment analysis
-        combined_text = " ".join(text_sources).strip()
+        text_sources = {}
+        voice_text = journal.get("voice_text")
+        if voice_text and not voice_text.startswith("Transcription error"):
+            text_sources["voice_text"] = voice_text
+        if journal.get("text_content"):
+            text_sources["text_content"] = journal["text_content"]
+        # Combine all text for toxic detection
+        combined_text = " ".join(text_sources.values()).strip()
 
         # --- AI Toxic Detection ---
         toxic_labels = []
         toxic_confidence = 0.0
+        toxic_model_version = None
         is_toxic = False
         if combined_text:
             try:
@@ -92,20 +110,32 @@ class JournalService:
                     toxic_labels = toxic_result.toxic_labels
                     toxic_confidence = toxic_result.confidence
                     is_toxic = toxic_result.is_violation
+                    toxic_model_version = toxic_result.model_version
+            except InferenceQueueFull:
+                # Overloaded: the worker retries the job later
+                raise
             except Exception as e:
                 # Log error but don't block journal creation
                 print(f"Toxic detection error: {e}")
-        # Store toxic analysis results
-        journal_dict["is_toxic"] = is_toxic
-        journal_dict["toxic_labels"] = toxic_labels
-        journal_dict["toxic_confidence"] = toxic_confidence
 
         # --- Sentiment Analysis ---
-        if combined_text:
-            # AI sentiment analysis on combined text
-            ai_label, ai_score = analyze_sentiment(combined_text)
+        ai_result = None
+        segments = []
+        # Until the model has loaded, fall back to the user's emotion
+        if combined_text and get_model_registry().is_ready("sentiment"):
+            # Each source is scored in sentence windows (inference process pool);
+            # offsets in the segments refer to that field, for highlighting.
+            # InferenceQueueFull propagates so the job is retried with backoff
+            for source, text in text_sources.items():
+                _, _, source_segments = await analyze_long_sentiment_async(text)
+                segments.extend({"source": source, **seg} for seg in source_segments)
+            # Length-weighted over all windows of text + transcript
+            ai_result = aggregate_sentiment(segments) if segments else None
+        emotion_label = journal.get("emotion_label")
+        if ai_result:
+            ai_label, ai_score = ai_result
             # User emotion from icon selection
-            icon_label, icon_score = ICON_SENTIMENT_MAP.get(data.emotion_label, ("Neutral", 0.0))
+            icon_label, icon_score = ICON_SENTIMENT_MAP.get(emotion_label, ("Neutral", 0.0))
             # Weighted combination: 70% AI + 30% user emotion
             # Use AI label but blend scores for nuanced result
             if ai_label == icon_label:
@@ -118,13 +148,68 @@ class JournalService:
                 # Use AI label unless user picked strong emotion (|icon_score| > 0.7)
                 label = icon_label if abs(icon_score) > 0.7 else ai_label
         else:
-            # No text: use only user emotion
-            label, score = ICON_SENTIMENT_MAP.get(data.emotion_label, ("Neutral", 0.0))
+            # No text (or no AI result): use only user emotion
+            label, score = ICON_SENTIMENT_MAP.get(emotion_label, ("Neutral", 0.0))
 
-        journal_dict["sentiment_label"] = label
-        journal_dict["sentiment_score"] = round(score, 2)
-        journal_dict["tags"] = data.tags or []
-        return await self.journal_repo.create(journal_dict)
+        return {
+            "is_toxic": is_toxic,
+            "toxic_labels": toxic_labels,
+            "toxic_confidence": toxic_confidence,
+            "toxic_model_version": toxic_model_version,
+            "sentiment_label": label,
+            "sentiment_score": round(score, 2),
+            "sentiment_segments": segments,
+        }
+
+    @staticmethod
+    def _remove_voice_file(path: str):
+        """The upload is only kept on disk until it has been transcribed"""
+        if path and os.path.exists(path):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    async def _notify_ready(self, user_id):
+        try:
+            await NotificationService(self._db).create_notification(
+                str(user_id),
+                title="Nhật ký đã sẵn sàng",
+                message="Ghi âm nhật ký của bạn đã được chuyển thành văn bản và phân tích cảm xúc.",
+                type="system"
+            )
+        except Exception as e:
+            print(f"Journal notification error: {e}")
+
+    async def fail_queued(self, jobs: list[dict]):
+        """Journal worker gave up on these jobs: mark the journals failed and drop the uploads"""
+        for doc in await self.journal_repo.get_many([job["content_id"] for job in jobs]):
+            if await self.journal_repo.update_fields(doc["_id"], {"processing_status": FAILED}, status=PENDING):
+                self._remove_voice_file(doc.get("voice_note_path"))
+
+    async def requeue_pending(self) -> int:
+        """
+        Startup: queue pending journals that have no job (e.g. the process died
+        between insert and enqueue). Journals whose job already failed are
+        finalized instead of retried.
+        """
+        pending = await self.journal_repo.list_ids_by_status(PENDING)
+        if not pending:
+            return 0
+        failed = await self._db[JOBS_COLLECTION].find(
+            {"content_type": JOURNAL_JOB, "content_id": {"$in": pending}, "status": JOB_FAILED}
+        ).to_list(length=None)
+        if failed:
+            await self.fail_queued(failed)
+
+        failed_ids = {job["content_id"] for job in failed}
+        requeued = 0
+        for doc in await self.journal_repo.get_many([i for i in pending if i not in failed_ids]):
+            if await requeue(self._db, JOURNAL_JOB, doc["_id"], doc["user_id"], doc.get("text_content") or ""):
+                requeued += 1
+        if requeued:
+            print(f"📝 Requeued {requeued} pending journal(s)")
+        return requeued
 
     async def get_user_journals(self, user_id: str) -> list[Journal]:
         """Retrieve all journals for a user."""
@@ -0,0 +1,70 @@
+"""
+Keyset (cursor) pagination for lists sorted newest first.
+
+A cursor is the opaque, url-safe encoding of the (created_at, _id) of the last
+item of a page. The next page asks for items strictly older than it, so with a
+compound index ending in (created_at -1, _id -1) every page is one index range
+scan - page 1,000 costs the same as page 1, unlike skip/limit.
+
+    query = apply_cursor({"moderation_status": "Approved"}, cursor)
+    docs = await collection.find(query).sort(KEYSET_SORT).limit(limit).to_list(length=limit)
+    set_next_cursor(response, docs, limit)   # X-Next-Cursor, absent on the last page
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from bson import ObjectId
+from fastapi import HTTPException, Response
+
+KEYSET_SORT = [("created_at", -1), ("_id", -1)]
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(doc: dict) -> str:
+    payload = json.dumps({"t": doc["created_at"].isoformat(), "id": str(doc["_id"])}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, ObjectId]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["t"]), ObjectId(payload["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def apply_cursor(query: dict, cursor: Optional[str]) -> dict:
+    """Restrict `query` to the items after `cursor` in KEYSET_SORT order"""
+    if not cursor:
+        return query
+    created_at, _id = decode_cursor(cursor)
+    after = {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "_id": {"$lt": _id}},
+    ]}
+    if not query:
+        return after
+    return {"$and": [query, after]}
+
+
+def next_cursor(docs: list, limit: int) -> Optional[str]:
+    """
+    Cursor for the page after `docs`, None when this was the last page.
+    Call it before the documents are serialized (needs raw created_at / _id).
+    """
+    if len(docs) < limit or not docs:
+        return None
+    last = docs[-1]
+    return encode_cursor({"created_at": last["created_at"], "_id": ObjectId(str(last["_id"]))})
+
+
+def set_next_cursor(response: Response, docs: list, limit: int) -> Optional[str]:
+    """Put the next page's cursor in the X-Next-Cursor header (list endpoints)"""
+    cursor = next_cursor(docs, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
+    return cursor
@@ -0,0 +1,99 @@
+"""
+Chuẩn hoá hashtag của các bài viết đã có (trước khi create_post chuẩn hoá) và
+tính lại bảng `hashtags` từ bài đã duyệt:
+- anon_posts.hashtags: '#Sharing', ' sharing ' -> 'sharing', bỏ trùng / rỗng
+- hashtags: gộp các tag trùng sau chuẩn hoá, usage_count = số bài Approved có tag
+- Đánh dấu hashtags_counted cho bài Approved, để lần duyệt lại không đếm thêm
+Sau đó tạo unique index `name` (thất bại nếu còn tag trùng). Chỉ cần chạy một lần.
+
+Usage: python scripts/backfill_hashtags.py [--batch-size 500]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pymongo import DeleteOne, UpdateOne  # noqa: E402
+
+from app.core.database import init_db, close_db, get_db  # noqa: E402
+from app.repositories.hashtag_repository import HashtagRepository, normalize_hashtags  # noqa: E402
+
+
+async def normalize_posts(db, batch_size: int) -> tuple[int, Counter]:
+    """Rewrite post hashtags; returns (posts updated, usage per tag over Approved posts)"""
+    usage = Counter()
+    updated, ops = 0, []
+    cursor = db["anon_posts"].find({}, {"hashtags": 1, "moderation_status": 1}).batch_size(batch_size)
+    async for post in cursor:
+        tags = normalize_hashtags(post.get("hashtags") or [])
+        approved = post.get("moderation_status") == "Approved"
+        if approved:
+            usage.update(tags)
+        ops.append(UpdateOne({"_id": post["_id"]}, {"$set": {"hashtags": tags, "hashtags_counted": approved}}))
+        if len(ops) >= batch_size:
+            updated += (await db["anon_posts"].bulk_write(ops, ordered=False)).modified_count
+            ops = []
+    if ops:
+        updated += (await db["anon_posts"].bulk_write(ops, ordered=False)).modified_count
+    return updated, usage
+
+
+async def rebuild_hashtags(db, usage: Counter) -> tuple[int, int]:
+    """Merge duplicate tags and set usage_count; returns (tags, duplicates removed)"""
+    kept: dict[str, dict] = {}
+    ops = []
+    async for tag in db["hashtags"].find({}).sort("created_at", 1):
+        names = normalize_hashtags([tag.get("name", "")])
+        if not names or names[0] in kept:
+            ops.append(DeleteOne({"_id": tag["_id"]}))  # empty / duplicate of an older tag
+            continue
+        kept[names[0]] = tag
+    removed = len(ops)
+
+    now = datetime.utcnow()
+    names = set(kept) | set(usage)
+    for name in names:
+        if name in kept:
+            ops.append(UpdateOne({"_id": kept[name]["_id"]}, {"$set": {"name": name, "usage_count": usage[name]}}))
+        else:
+            ops.append(UpdateOne(
+                {"name": name},
+                {"$set": {"usage_count": usage[name]}, "$setOnInsert": {"created_at": now, "last_used_at": now}},
+                upsert=True
+            ))
+    if ops:
+        await db["hashtags"].bulk_write(ops, ordered=True)  # deletes first: renames must not collide
+    return len(names), removed
+
+
+async def backfill(batch_size: int):
+    print("🏷️ SoulSpace - Backfill hashtags")
+    await init_db()
+    db = None
+    async for database in get_db():
+        db = database
+        break
+    if db is None:
+        print("❌ Không thể kết nối database!")
+        return
+
+    start = time.perf_counter()
+    updated, usage = await normalize_posts(db, batch_size)
+    tags, removed = await rebuild_hashtags(db, usage)
+    await HashtagRepository(db).ensure_indexes()
+    print(f"✅ Updated {updated} posts, {tags} tags ({removed} duplicates removed) "
+          f"in {time.perf_counter() - start:.1f}s")
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(backfill(args.batch_size))
@@ -0,0 +1,43 @@
+"""
+Tính trending_score cho các bài viết đã có (trước khi có trending feed) hoặc
+sau khi đổi TRENDING_DECAY_SECONDS / TRENDING_COMMENT_WEIGHT.
+Bài mới và mỗi lần like / bình luận đã tự cập nhật điểm, chỉ cần chạy một lần.
+
+Usage: python scripts/backfill_trending_scores.py [--batch-size 500]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.core.database import init_db, close_db, get_db  # noqa: E402
+from app.repositories.anon_post_repository import AnonPostRepository  # noqa: E402
+
+
+async def backfill(batch_size: int):
+    print("📈 SoulSpace - Backfill trending_score")
+    await init_db()
+    db = None
+    async for database in get_db():
+        db = database
+        break
+    if db is None:
+        print("❌ Không thể kết nối database!")
+        return
+
+    start = time.perf_counter()
+    updated = await AnonPostRepository(db).refresh_trending_scores(batch_size=batch_size)
+    total = await db["anon_posts"].count_documents({})
+    print(f"✅ Updated {updated}/{total} posts in {time.perf_counter() - start:.1f}s")
+    await close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(backfill(args.batch_size))
@@ -0,0 +1,481 @@
+"""
+Benchmark + regression check cho đường AI: /ai/sentiment, /ai/toxic, bản batch, và kiểm duyệt trong create_post
+
+Chạy offline trên CPU:
+- Model toxic tí hon (TF-IDF + LR, train trên dữ liệu tổng hợp, publish như một model version)
+- Model sentiment tí hon (BERT 2 lớp, tokenizer WordLevel) thay cho RoBERTa
+- mongomock-motor thay cho MongoDB
+(--toxic-models / --sentiment-model để đo trên model thật)
+
+Đo:
+- cold_start:  import app, nạp model toxic, dựng pipeline sentiment, RSS sau mỗi bước (process mới)
+- latency_ms:  p50/p95/p99 của từng request đơn, gửi tuần tự (cache kết quả tắt)
+- throughput:  items/s cho endpoint batch và request đơn chạy song song
+- memory_mb:   RSS của process API và các worker inference
+
+So sánh với baseline: --save-baseline lưu kết quả, --baseline so sánh và trả exit code 1 nếu
+một chỉ số xấu đi quá --tolerance (mặc định 20%). Baseline chỉ có nghĩa trên cùng một máy.
+
+Chạy: pip install mongomock-motor httpx && python scripts/bench_ai_endpoints.py [--requests 200] [--concurrency 16]
+      python scripts/bench_ai_endpoints.py --save-baseline bench_baseline.json
+      python scripts/bench_ai_endpoints.py --baseline bench_baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+LABEL_COLS = ['toxic', 'severe_toxic', 'obscene', 'threat', 'insult', 'identity_hate']
+
+CLEAN_WORDS = (
+    "hôm nay mình thấy vui cảm ơn bạn nhiều lắm đi học làm việc gia đình bạn bè cà phê sáng "
+    "trời đẹp nghỉ ngơi đọc sách nghe nhạc happy thanks friend good morning lovely day"
+).split()
+TOXIC_WORDS = {
+    "toxic": "ngu đần idiot stupid".split(),
+    "severe_toxic": "khốn nạn súc sinh".split(),
+    "obscene": "địt đéo fuck shit".split(),
+    "threat": "giết chém kill murder".split(),
+    "insult": "óc chó loser moron".split(),
+    "identity_hate": "bọn mọi rợ racist".split(),
+}
+
+# Metrics where a higher value is a regression; everything else is higher-is-better
+LOWER_IS_BETTER = ("cold_start", "latency_ms", "memory_mb")
+
+
+# ===========================
+# Fixtures
+# ===========================
+
+def make_texts(rng: random.Random, count: int, toxic_rate: float = 0.3) -> list[tuple[str, dict]]:
+    samples = []
+    for _ in range(count):
+        words = [rng.choice(CLEAN_WORDS) for _ in range(rng.randint(5, 40))]
+        labels = {label: 0 for label in LABEL_COLS}
+        if rng.random() < toxic_rate:
+            for label in rng.sample(LABEL_COLS, rng.randint(1, 2)):
+                labels[label] = 1
+                labels["toxic"] = 1
+                words.insert(rng.randrange(len(words)), rng.choice(TOXIC_WORDS[label]))
+        samples.append((" ".join(words), labels))
+    return samples
+
+
+def build_tiny_toxic_model(models_dir: Path) -> str:
+    """Train a small TF-IDF + LR model and publish it as a model version"""
+    import pickle
+    from scipy.sparse import hstack
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from app.services.common import model_versions
+    from app.services.common.toxic_model_format import COMPACT_DIR_NAME, export_compact_model
+    from app.services.common.toxic_normalizer import normalize_for_toxic
+
+    samples = make_texts(random.Random(1), 3000)
+    texts = [normalize_for_toxic(text) for text, _ in samples]
+    tfidf_word = TfidfVectorizer(analyzer="word", ngram_range=(1, 2), sublinear_tf=True, token_pattern=r"\b\w+\b")
+    tfidf_char = TfidfVectorizer(analyzer="char", ngram_range=(3, 4), max_features=20000, sublinear_tf=True)
+    X = hstack([tfidf_word.fit_transform(texts), tfidf_char.fit_transform(texts)]).tocsr()
+    lr_models = {
+        label: LogisticRegression(C=4.0, max_iter=1000).fit(X, [labels[label] for _, labels in samples])
+        for label in LABEL_COLS
+    }
+
+    models_dir.mkdir(parents=True, exist_ok=True)
+    staged = model_versions.staging_dir(models_dir)
+    for name, obj in (("lr_models.pkl", lr_models), ("tfidf_word.pkl", tfidf_word), ("tfidf_char.pkl", tfidf_char)):
+        with open(staged / name, "wb") as f:
+            pickle.dump(obj, f)
+    export_compact_model(lr_models, tfidf_word, tfidf_char, staged / COMPACT_DIR_NAME, LABEL_COLS)
+    return model_versions.publish_version(models_dir, staged, {"labels": LABEL_COLS, "source": "bench fixture"})
+
+
+def build_tiny_sentiment_model(model_dir: Path):
+    """2-layer BERT with random weights and a WordLevel tokenizer (3 labels like cardiffnlp)"""
+    from tokenizers import Tokenizer, models, pre_tokenizers, trainers
+    from transformers import BertConfig, BertForSequenceClassification, PreTrainedTokenizerFast
+
+    corpus = [text for text, _ in make_texts(random.Random(2), 2000)]
+    tokenizer = Tokenizer(models.WordLevel(unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = pre_tokenizers.Whitespace()
+    tokenizer.train_from_iterator(corpus, trainers.WordLevelTrainer(special_tokens=["[PAD]", "[UNK]", "[CLS]", "[SEP]"]))
+    fast = PreTrainedTokenizerFast(
+        tokenizer_object=tokenizer, pad_token="[PAD]", unk_token="[UNK]",
+        cls_token="[CLS]", sep_token="[SEP]", model_max_length=128
+    )
+    config = BertConfig(
+        vocab_size=fast.vocab_size, hidden_size=32, num_hidden_layers=2, num_attention_heads=2,
+        intermediate_size=64, max_position_embeddings=128, num_labels=3, pad_token_id=fast.pad_token_id
+    )
+    BertForSequenceClassification(config).save_pretrained(model_dir)
+    fast.save_pretrained(model_dir)
+
+
+# ===========================
+# Measurement helpers
+# ===========================
+
+def rss_mb(pid="self", field="VmRSS"):
+    """Resident memory of a process from /proc (Linux); peak RSS of this process elsewhere"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    if pid == "self":
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    return None
+
+
+def percentiles(durations: list[float]) -> dict:
+    ordered = sorted(durations)
+
+    def pick(p):
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000
+
+    return {
+        "p50": round(pick(0.50), 3),
+        "p95": round(pick(0.95), 3),
+        "p99": round(pick(0.99), 3),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 3),
+    }
+
+
+async def timed_sequential(make_call, count: int) -> list[float]:
+    durations = []
+    for i in range(count):
+        start = time.perf_counter()
+        await make_call(i)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+async def timed_concurrent(make_call, count: int, concurrency: int) -> float:
+    """Seconds to finish `count` calls with at most `concurrency` in flight"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            await make_call(i)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(count)])
+    return time.perf_counter() - start
+
+
+def check(response):
+    if response.status_code != 200:
+        raise RuntimeError(f"{response.request.url.path} -> {response.status_code}: {response.text[:200]}")
+    return response
+
+
+# ===========================
+# Cold start (fresh process)
+# ===========================
+
+async def _import_app():
+    # Like uvicorn: routers start their schedulers at import and need a running loop
+    import app.main  # noqa: F401
+
+
+def cold_start_child():
+    """Runs in a new interpreter; prints one JSON line"""
+    result = {"rss_start": rss_mb()}
+    start = time.perf_counter()
+    asyncio.run(_import_app())
+    result["import_app_s"] = round(time.perf_counter() - start, 3)
+    result["rss_after_import"] = rss_mb()
+
+    from app.core.config import settings
+    from app.services.common.toxic_detection_service import ToxicDetectionService
+    start = time.perf_counter()
+    assert ToxicDetectionService(models_path=settings.TOXIC_MODELS_PATH).load(), "toxic model did not load"
+    result["toxic_load_s"] = round(time.perf_counter() - start, 3)
+    result["rss_after_toxic"] = rss_mb()
+
+    from app.services.common.sentiment_service import analyze_sentiment_batch
+    start = time.perf_counter()
+    analyze_sentiment_batch(["warm up"])
+    result["sentiment_load_s"] = round(time.perf_counter() - start, 3)
+    result["rss_after_sentiment"] = rss_mb()
+    print(json.dumps(result))
+
+
+def measure_cold_start() -> dict:
+    output = subprocess.run(
+        [sys.executable, __file__, "--cold-start-child"],
+        capture_output=True, text=True, env=os.environ.copy(), cwd=str(ROOT)
+    )
+    if output.returncode != 0:
+        raise RuntimeError(f"cold start child failed:\n{output.stderr[-2000:]}")
+    child = json.loads(output.stdout.strip().splitlines()[-1])
+    return {
+        "import_app_s": child["import_app_s"],
+        "toxic_load_s": child["toxic_load_s"],
+        "sentiment_load_s": child["sentiment_load_s"],
+        "rss_after_import_mb": child["rss_after_import"],
+        "rss_after_models_mb": child["rss_after_sentiment"],
+    }
+
+
+# ===========================
+# Warm benchmarks
+# ===========================
+
+async def run_benchmarks(args) -> dict:
+    import httpx
+    from bson import ObjectId
+    from fastapi import FastAPI
+    from mongomock_motor import AsyncMongoMockClient
+
+    from app.api.common.ai_router import router as ai_router
+    from app.core.config import settings
+    from app.services.common.inference_executor import get_inference_executor, shutdown_inference_executor
+    from app.services.common.lexicon_store import SENSITIVE_KEYWORDS
+    from app.services.common.model_registry import get_model_registry
+    from app.services.common.sentiment_service import warm_up_sentiment
+    from app.services.common.toxic_detection_service import get_toxic_detection_service
+    from app.services.user.anon_post_service import AnonPostService
+
+    rng = random.Random(3)
+    # Unique texts per request: nothing is answered from a cache
+    n = args.requests
+    texts = [f"{text} {i}" for i, (text, _) in enumerate(make_texts(rng, n * 10))]
+    windows = iter(range(10))
+
+    def window():
+        start = next(windows) * n
+        return texts[start:start + n]
+
+    registry = get_model_registry()
+    registry.register("toxic", get_toxic_detection_service().load)
+    registry.register("sentiment", warm_up_sentiment)
+    await registry.start()
+    while not registry.all_ready():
+        if any(entry["status"] == "failed" for entry in registry.status().values()):
+            raise RuntimeError(f"model failed to load: {registry.status()}")
+        await asyncio.sleep(0.1)
+
+    app = FastAPI()
+    app.include_router(ai_router, prefix="/api/v1")
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench/api/v1")
+
+    db = AsyncMongoMockClient()["soulspace_bench"]
+    await db[SENSITIVE_KEYWORDS].insert_many([
+        {"keyword": "giết", "severity": "hard", "variations": []},
+        {"keyword": "ngu", "severity": "soft", "variations": []},
+    ])
+    settings.ASYNC_MODERATION = False
+    post_service = AnonPostService(db)
+    user_id = str(ObjectId())
+
+    calls = {
+        "sentiment": lambda batch: lambda i: client.post("/ai/sentiment", json={"text": batch[i]}),
+        "toxic": lambda batch: lambda i: client.post("/ai/toxic", json={"text": batch[i]}),
+        "create_post": lambda batch: lambda i: post_service.create_post(user_id, batch[i]),
+    }
+
+    async def checked(call):
+        result = await call
+        return check(result) if isinstance(result, httpx.Response) else result
+
+    results = {"latency_ms": {}, "throughput": {}}
+    for name, factory in calls.items():
+        call = factory(window())
+        await checked(call(0))  # first-call effects out of the way
+        durations = await timed_sequential(lambda i: checked(call(i)), n)
+        results["latency_ms"][name] = percentiles(durations)
+        print(f"   {name:12} latency  {results['latency_ms'][name]}")
+
+    for name, factory in calls.items():
+        call = factory(window())
+        seconds = await timed_concurrent(lambda i: checked(call(i)), n, args.concurrency)
+        key = f"{name}_concurrent_{args.concurrency}"
+        results["throughput"][key] = round(n / seconds, 2)
+        print(f"   {key:28} {results['throughput'][key]:>10} req/s")
+
+    batch_calls = {
+        "toxic_batch": ("/ai/toxic/batch", args.toxic_batch),
+        "sentiment_batch": ("/ai/sentiment/batch", args.sentiment_batch),
+    }
+    for name, (path, size) in batch_calls.items():
+        batch = window()
+        rounds = max(5, n // size)
+        start = time.perf_counter()
+        for r in range(rounds):
+            chunk = [batch[(r * size + j) % len(batch)] for j in range(size)]
+            check(await client.post(path, json={"texts": chunk}))
+        key = f"{name}_{size}"
+        results["throughput"][key] = round(rounds * size / (time.perf_counter() - start), 2)
+        print(f"   {key:28} {results['throughput'][key]:>10} items/s")
+
+    executor = get_inference_executor()
+    pool = executor._process_pool
+    worker_pids = list(pool._processes) if pool is not None and pool._processes else []
+    results["memory_mb"] = {"api_rss": rss_mb(), "api_peak_rss": rss_mb(field="VmHWM")}
+    for i, pid in enumerate(worker_pids):
+        results["memory_mb"][f"model_worker_{i}_rss"] = rss_mb(pid)
+    results["executor"] = executor.metrics()
+
+    await client.aclose()
+    await registry.stop()
+    shutdown_inference_executor()
+    return results
+
+
+# ===========================
+# Baseline comparison
+# ===========================
+
+def flatten(results: dict) -> dict:
+    flat = {}
+    for section in ("cold_start", "latency_ms", "throughput", "memory_mb"):
+        for key, value in results.get(section, {}).items():
+            if isinstance(value, dict):
+                for sub, v in value.items():
+                    flat[f"{section}.{key}.{sub}"] = v
+            elif isinstance(value, (int, float)):
+                flat[f"{section}.{key}"] = value
+    return flat
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Print a comparison table; returns the metrics that regressed beyond `tolerance`"""
+    now, before = flatten(current), flatten(baseline)
+    regressions = []
+    print(f"\n{'metric':48} {'baseline':>12} {'current':>12} {'change':>9}")
+    for key in sorted(set(now) & set(before)):
+        old, new = before[key], now[key]
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        worse = change > tolerance if key.startswith(LOWER_IS_BETTER) else change < -tolerance
+        if worse:
+            regressions.append(key)
+        print(f"{key:48} {old:>12} {new:>12} {change:>+8.1%}{'  ❌' if worse else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200, help="requests per measurement")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--toxic-batch", type=int, default=100, help="texts per /ai/toxic/batch call (max 100)")
+    parser.add_argument("--sentiment-batch", type=int, default=20, help="texts per /ai/sentiment/batch call (max 20)")
+    parser.add_argument("--process-workers", type=int, default=None, help="INFERENCE_PROCESS_WORKERS (default: settings)")
+    parser.add_argument("--toxic-models", default=None, help="real toxic models dir instead of the tiny fixture")
+    parser.add_argument("--sentiment-model", default=None, help="real sentiment model dir / hub id instead of the tiny fixture")
+    parser.add_argument("--cache", action="store_true", help="keep the inference result cache on")
+    parser.add_argument("--skip-cold-start", action="store_true")
+    parser.add_argument("--out", default=None, help="write the results JSON here")
+    parser.add_argument("--save-baseline", default=None, help="write the results as the new baseline")
+    parser.add_argument("--baseline", default=None, help="compare against this baseline, exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown (0.2 = 20%%)")
+    parser.add_argument("--cold-start-child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--build-fixtures", nargs="+", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cold_start_child:
+        cold_start_child()
+        return
+    if args.build_fixtures:
+        workdir, *names = args.build_fixtures
+        if "toxic" in names:
+            print(f"   tiny toxic model {build_tiny_toxic_model(Path(workdir) / 'toxic')}")
+        if "sentiment" in names:
+            build_tiny_sentiment_model(Path(workdir) / "sentiment")
+            print("   tiny sentiment model")
+        return
+
+    try:
+        import httpx  # noqa: F401
+        from mongomock_motor import AsyncMongoMockClient  # noqa: F401
+    except ImportError:
+        print("❌ Cần cài mongomock-motor và httpx: pip install mongomock-motor httpx")
+        sys.exit(1)
+
+    # Settings are read from the environment, also by the spawned inference workers
+    workdir = Path(tempfile.mkdtemp(prefix="soulspace-bench-"))
+    os.environ["HF_HUB_OFFLINE"] = "1"
+    os.environ["TOXIC_AUTO_TRAIN"] = "false"
+    os.environ["TOXIC_MODEL_WATCH_SECONDS"] = "0"
+    if not args.cache:
+        os.environ["INFERENCE_CACHE_SIZE"] = "0"
+    if args.process_workers is not None:
+        os.environ["INFERENCE_PROCESS_WORKERS"] = str(args.process_workers)
+
+    print("🔧 Preparing models...")
+    build = []
+    if args.toxic_models:
+        os.environ["TOXIC_MODELS_PATH"] = str(Path(args.toxic_models).resolve())
+    else:
+        os.environ["TOXIC_MODELS_PATH"] = str(workdir / "toxic")
+        build.append("toxic")
+    if args.sentiment_model:
+        os.environ["SENTIMENT_MODEL_PATH"] = args.sentiment_model
+    else:
+        os.environ["SENTIMENT_MODEL_PATH"] = str(workdir / "sentiment")
+        build.append("sentiment")
+    if build:
+        # Separate process: sklearn / torch imported for training would inflate this process' RSS
+        subprocess.run([sys.executable, __file__, "--build-fixtures", str(workdir), *build], check=True, cwd=str(ROOT))
+
+    from app.core.config import settings
+
+    results = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "toxic_models": args.toxic_models or "tiny fixture",
+            "sentiment_model": args.sentiment_model or "tiny fixture",
+            "inference_thread_workers": settings.INFERENCE_THREAD_WORKERS,
+            "inference_process_workers": settings.INFERENCE_PROCESS_WORKERS,
+            "cache": args.cache,
+        }
+    }
+
+    if not args.skip_cold_start:
+        print("\n🧊 Cold start (fresh process)...")
+        results["cold_start"] = measure_cold_start()
+        print(f"   {results['cold_start']}")
+
+    print("\n🔥 Warm benchmarks...")
+    results.update(asyncio.run(run_benchmarks(args)))
+    print(f"\n💾 Memory: {results['memory_mb']}")
+
+    for path in (args.out, args.save_baseline):
+        if path:
+            Path(path).write_text(json.dumps(results, indent=2, ensure_ascii=False), encoding="utf-8")
+            print(f"   saved {path}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} metric(s) regressed more than {args.tolerance:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\n✅ No regression beyond {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Micro-benchmark: toxic text normalizer
+So sánh normalizer dùng chung (app/services/common/toxic_normalizer.py) với bản
+tuần tự cũ (~15 lần re.sub mỗi text), kiểm tra output giống hệt nhau rồi đo throughput.
+
+Chạy: python scripts/bench_toxic_normalizer.py [--posts 200] [--length 10000]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.common.toxic_normalizer import (  # noqa: E402
+    CHAT_MAP,
+    POSITIVE_WORDS,
+    PROFANITY_PATTERNS,
+    normalize_for_toxic,
+)
+
+# ===========================
+# Legacy implementation (reference)
+# ===========================
+
+_positive = "|".join(POSITIVE_WORDS)
+_LEGACY_BENIGN = re.compile(rf"\b(fucking|fuckin|fking|freaking)\s+({_positive})\b", flags=re.IGNORECASE)
+_LEGACY_INTENSIFIED = re.compile(
+    rf"\b(so|really|very|pretty|quite)\s+(fucking|fuckin|fking)\s+({_positive})\b",
+    flags=re.IGNORECASE
+)
+_LEGACY_CHAT = {rf"\b{word}\b": repl for word, repl in CHAT_MAP.items()}
+
+
+def legacy_normalize(text: str) -> str:
+    text = text.lower()
+    text = re.sub(r'<[^>]+>', ' ', text)
+    text = _LEGACY_INTENSIFIED.sub(lambda m: f"{m.group(1)} very {m.group(3)}", text)
+    text = _LEGACY_BENIGN.sub(lambda m: f"very {m.group(2)}", text)
+    text = re.sub(r'@', 'a', text)
+    text = re.sub(r'(.)\1{2,}', r'\1\1', text)
+    text = re.sub(r'!{2,}', '!', text)
+    text = re.sub(r'\?{2,}', '?', text)
+    text = re.sub(r'\.{2,}', '.', text)
+    for pattern, repl in PROFANITY_PATTERNS:
+        text = re.sub(pattern, repl, text, flags=re.IGNORECASE)
+    for pattern, repl in _LEGACY_CHAT.items():
+        text = re.sub(pattern, repl, text)
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+# ===========================
+# Corpus
+# ===========================
+
+WORDS = [
+    "hôm", "nay", "mình", "thấy", "rất", "mệt", "today", "i", "feel", "tired", "and", "alone",
+    "u", "ur", "r", "so", "really", "fucking", "freaking", "good", "great", "love", "idi0t",
+    "st*pid", "f.u.c.k", "sh!t", "s_h_i_t", "b.i.t.c.h", "a$$hole", "d@mn", "h.e.l.l",
+    "<b>bold</b>", "soooo", "nooooo", "!!!", "???", "....", "@", "ok", "haha", "b.i.t.c.h.e.l.l",
+    "st*pid.a.m.n", "st*pidi0t", "\n", "\t", "FUCKING", "Great", "U", "UR",
+    "ſhıt", "FUCKİNG", "fuc\u212aing", "ıdi0t", "\u00a0", "<a href='x'>", "f---ing", "freaking",
+]
+
+
+def make_post(rng: random.Random, length: int) -> str:
+    parts, size = [], 0
+    while size < length:
+        word = rng.choice(WORDS)
+        parts.append(word)
+        size += len(word) + 1
+    return " ".join(parts)[:length]
+
+
+def make_clean_post(rng: random.Random, length: int) -> str:
+    clean = ["hôm", "nay", "mình", "thấy", "rất", "vui", "today", "was", "a", "calm", "day", "with", "friends"]
+    parts, size = [], 0
+    while size < length:
+        word = rng.choice(clean)
+        parts.append(word)
+        size += len(word) + 1
+    return " ".join(parts)[:length]
+
+
+def check_equivalence(rng: random.Random, n: int) -> int:
+    mismatches = 0
+    for i in range(n):
+        text = make_post(rng, rng.randint(1, 400))
+        expected, actual = legacy_normalize(text), normalize_for_toxic(text)
+        if expected != actual:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"   ❌ mismatch #{i}: {text!r}\n      legacy: {expected!r}\n      shared: {actual!r}")
+    return mismatches
+
+
+def bench(fn, texts: list[str], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=200, help="number of long posts per run")
+    parser.add_argument("--length", type=int, default=10000, help="characters per post (router limit: 10000)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per implementation (best is reported)")
+    parser.add_argument("--check", type=int, default=5000, help="random short texts for the equivalence check")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+
+    print("=" * 60)
+    print("Toxic normalizer micro-benchmark")
+    print("=" * 60)
+
+    print(f"\n[1] Equivalence check on {args.check} random texts...")
+    mismatches = check_equivalence(rng, args.check)
+    print(f"    {'✅ identical output' if mismatches == 0 else f'❌ {mismatches} mismatches'}")
+
+    corpora = {
+        "noisy (obfuscated profanity, chat lingo)": [make_post(rng, args.length) for _ in range(args.posts)],
+        "clean": [make_clean_post(rng, args.length) for _ in range(args.posts)],
+    }
+    for step, (name, texts) in enumerate(corpora.items(), start=2):
+        megabytes = sum(len(t.encode("utf-8")) for t in texts) / 1e6
+        print(f"\n[{step}] {args.posts} posts × {args.length} chars, {name}")
+        legacy = bench(legacy_normalize, texts, args.repeat)
+        shared = bench(normalize_for_toxic, texts, args.repeat)
+        for label, seconds in (("legacy", legacy), ("shared", shared)):
+            print(f"    {label:7s} {len(texts) / seconds:9.1f} posts/s  {megabytes / seconds:7.2f} MB/s  "
+                  f"{seconds / len(texts) * 1000:7.3f} ms/post")
+        print(f"    speedup ×{legacy / shared:.2f}")
+
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
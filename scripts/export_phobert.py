@@ -0,0 +1,72 @@
+"""
+Export PhoBERT + attention head sang int8 (ONNX hoặc TorchScript) để serve trên CPU,
+rồi so sánh điểm và tốc độ với model PyTorch gốc.
+
+Chạy:
+    python scripts/export_phobert.py --out models/phobert-int8 --backend onnx
+    python scripts/export_phobert.py --out models/phobert-int8-ts --backend torchscript
+
+--fine-tuned ghi "fine_tuned": true vào export.json. Chỉ dùng khi head đã được
+train; moderation cascade (MODERATION_PHOBERT_MODEL) từ chối export không có cờ này.
+
+ONNX cần: pip install onnx onnxruntime
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models.text_classtification.text_classtification import (  # noqa: E402
+    BACKEND_ONNX, BACKEND_TORCHSCRIPT, PhoBERTWithAttentionWrapper
+)
+
+SAMPLES = [
+    "Mình rất vui khi thấy bài viết này",
+    "mày là đồ ngu cút khỏi đây đi",
+    "hôm nay mình thấy rất mệt và không muốn làm gì cả",
+    "Cảm ơn đã chia sẻ",
+    "tụi mày muốn bị đánh à",
+] * 8
+
+
+def timed(wrapper, texts, batch_size):
+    start = time.perf_counter()
+    results = wrapper.predict_batch(texts, batch_size=batch_size)
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="vinai/phobert-base")
+    parser.add_argument("--out", required=True)
+    parser.add_argument("--backend", choices=[BACKEND_ONNX, BACKEND_TORCHSCRIPT], default=BACKEND_ONNX)
+    parser.add_argument("--max-len", type=int, default=128)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--fine-tuned", action="store_true", help="head đã được train (cho phép dùng trong moderation cascade)")
+    args = parser.parse_args()
+
+    print(f"[1] Load {args.model} (PyTorch, CPU)...")
+    eager = PhoBERTWithAttentionWrapper(args.model, max_len=args.max_len)
+    eager.load(device="cpu")
+
+    print(f"[2] Export int8 ({args.backend}) → {args.out}")
+    eager.export_quantized(args.out, backend=args.backend, fine_tuned=args.fine_tuned)
+
+    print("[3] Load exported model")
+    quantized = PhoBERTWithAttentionWrapper.load_exported(args.out)
+
+    print(f"[4] So sánh trên {len(SAMPLES)} câu (batch {args.batch_size})")
+    eager.predict_batch(SAMPLES[:2])
+    quantized.predict_batch(SAMPLES[:2])
+    ref, ref_s = timed(eager, SAMPLES, args.batch_size)
+    got, got_s = timed(quantized, SAMPLES, args.batch_size)
+    max_diff = max(abs(a["safety_score"] - b["safety_score"]) for a, b in zip(ref, got))
+    print(f"    eager  {len(SAMPLES) / ref_s:7.1f} texts/s")
+    print(f"    int8   {len(SAMPLES) / got_s:7.1f} texts/s  (×{ref_s / got_s:.2f})")
+    print(f"    max |Δ safety_score| = {max_diff:.4f}")
+
+
+if __name__ == "__main__":
+    main()
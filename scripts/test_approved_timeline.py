@@ -0,0 +1,76 @@
+"""
+Test ApprovedTimeline + keyset cursor trên mongomock-motor
+- Bài mới (create_post) vào buffer, trang 1 phục vụ từ buffer
+- Cursor tạo từ bài trong buffer vẫn khớp created_at đã lưu (MongoDB chỉ giữ millisecond):
+  sau khi buffer rebuild (changed()), trang 2 không lặp lại bài của trang 1
+- Trang vượt quá buffer rơi về query, không thiếu / trùng bài
+
+Chạy: pip install mongomock-motor && python scripts/test_approved_timeline.py
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    from mongomock_motor import AsyncMongoMockClient
+except ImportError:
+    print("❌ Cần cài mongomock-motor: pip install mongomock-motor")
+    sys.exit(1)
+
+from bson import ObjectId  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.repositories.anon_post_repository import AnonPostRepository  # noqa: E402
+from app.services.common import approved_timeline  # noqa: E402
+from app.services.common.toxic_detection_service import ToxicDetectionService  # noqa: E402
+from app.services.user.anon_post_service import AnonPostService  # noqa: E402
+from app.utils.pagination import next_cursor  # noqa: E402
+
+
+async def read_all(repo, limit):
+    contents, cursor = [], None
+    while True:
+        posts = await repo.list(limit=limit, cursor=cursor)
+        contents += [post["content"] for post in posts]
+        cursor = next_cursor(posts, limit)
+        if cursor is None:
+            return contents
+
+
+async def test_timeline():
+    db = AsyncMongoMockClient()["soulspace_test"]
+    settings.ASYNC_MODERATION = False
+    settings.FEED_TIMELINE_POLL_SECONDS = 0
+    approved_timeline._timeline = approved_timeline.ApprovedTimeline(3)
+    timeline = approved_timeline.get_approved_timeline()
+
+    service = AnonPostService(db)
+    service.moderation.toxic_service = ToxicDetectionService(models_path="/nonexistent", load=False)
+    user_id = str(ObjectId())
+    repo = AnonPostRepository(db)
+    assert await repo.list(limit=2) == []  # buffer đã load: bài mới được thêm thẳng vào buffer
+    for i in range(1, 5):
+        await service.create_post(user_id, f"post {i}")
+        await asyncio.sleep(0.002)
+
+    print("[1] Trang 1 từ buffer, rebuild, trang 2 với cùng cursor")
+    page1 = await repo.list(limit=2)
+    assert [p["content"] for p in page1] == ["post 4", "post 3"]
+    cursor = next_cursor(page1, 2)
+    await timeline.changed(db)  # vd. admin đổi trạng thái một bài
+    page2 = await repo.list(limit=2, cursor=cursor)
+    print(f"    trang 1: {[p['content'] for p in page1]}  trang 2: {[p['content'] for p in page2]}")
+    assert [p["content"] for p in page2] == ["post 2", "post 1"]
+
+    print("\n[2] Duyệt hết feed (buffer 3 bài, trang 2 bài → trang cuối rơi về query)")
+    contents = await read_all(repo, 2)
+    print(f"    {contents}  status={timeline.status()}")
+    assert contents == ["post 4", "post 3", "post 2", "post 1"]
+
+    print("\n✅ Approved timeline OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_timeline())
@@ -0,0 +1,103 @@
+"""
+Test InferenceExecutor: phục hồi process pool, pool STT riêng
+- run_model chạy trong process con (pid khác server)
+- Kill process con → call đang dở / call kế tiếp lỗi BrokenProcessPool, pool bị bỏ
+- Call sau đó spawn pool mới và chạy bình thường (không cần restart server)
+- STT chạy trong pool riêng: toxic scoring (run_cpu) không phải chờ phiên âm
+- stream_transcription: consumer dừng sớm → thread decode dừng sau đoạn hiện tại
+
+Chạy: python scripts/test_inference_executor.py
+"""
+import asyncio
+import os
+import signal
+import sys
+import threading
+import time
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.services.common import inference_executor, speech_to_text  # noqa: E402
+from app.services.common.inference_executor import InferenceExecutor  # noqa: E402
+
+
+class SlowEngine(speech_to_text.STTEngine):
+    """Giả lập engine: mỗi đoạn decode mất 0.2s"""
+    name = "slow"
+
+    def __init__(self):
+        self.decoded = 0
+
+    def stream(self, audio):
+        for i in range(20):
+            time.sleep(0.2)
+            self.decoded += 1
+            yield f"đoạn {i}"
+
+    def transcribe(self, audio):
+        return " ".join(self.stream(audio))
+
+
+async def test_recovery():
+    executor = InferenceExecutor(thread_workers=1, process_workers=1)
+    try:
+        print("[1] run_model chạy trong process con")
+        worker_pid = await executor.run_model(os.getpid)
+        assert worker_pid != os.getpid()
+        print(f"    worker pid={worker_pid}")
+
+        print("\n[2] Kill worker → BrokenProcessPool, pool bị bỏ")
+        os.kill(worker_pid, signal.SIGKILL)
+        broken = False
+        # Pool phát hiện worker chết bất đồng bộ; call đầu tiên sau đó phải lỗi
+        for _ in range(50):
+            try:
+                await executor.run_model(time.sleep, 0.01)
+            except BrokenProcessPool:
+                broken = True
+                break
+            await asyncio.sleep(0.05)
+        assert broken, "pool không báo lỗi sau khi worker chết"
+        assert executor._process_pool is None
+        print(f"    failed={executor.metrics()['model']['failed']}")
+
+        print("\n[3] Call kế tiếp spawn pool mới")
+        new_pid = await executor.run_model(os.getpid)
+        assert new_pid not in (worker_pid, os.getpid())
+        print(f"    worker pid={new_pid}")
+    finally:
+        executor.shutdown()
+
+    print("\n[4] STT pool riêng: run_cpu không chờ phiên âm")
+    executor = InferenceExecutor(thread_workers=1, process_workers=0, stt_workers=1)
+    inference_executor._executor = executor
+    try:
+        engine = SlowEngine()
+        transcription = asyncio.create_task(speech_to_text.transcribe_audio(b"audio", engine))
+        await asyncio.sleep(0.1)
+        start = time.perf_counter()
+        assert await executor.run_cpu(threading.current_thread) is not None
+        waited = time.perf_counter() - start
+        print(f"    run_cpu chờ {waited * 1000:.1f}ms trong lúc STT chạy")
+        assert waited < 0.5
+        await transcription
+
+        print("\n[5] Consumer dừng sau 2 đoạn → decode dừng")
+        engine = SlowEngine()
+        stream = speech_to_text.stream_transcription(b"audio", engine)
+        parts = [await stream.__anext__(), await stream.__anext__()]
+        await stream.aclose()
+        await asyncio.sleep(0.6)
+        print(f"    nhận {parts}, decode {engine.decoded}/20 đoạn")
+        assert engine.decoded <= 4
+    finally:
+        executor.shutdown()
+        inference_executor._executor = None
+
+    print("\n✅ Inference executor OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_recovery())
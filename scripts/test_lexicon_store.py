@@ -0,0 +1,96 @@
+"""
+Test LexiconStore trên MongoDB giả lập (mongomock-motor, không cần server)
+- Load snapshot, fallback polling khi không có change stream
+- Version stamp + reload từng collection
+- Áp dụng change event (insert / update / delete) không đọc lại DB
+- rule_based_scoring đọc negative_lexicon từ snapshot
+
+Chạy: pip install mongomock-motor && python scripts/test_lexicon_store.py
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    from mongomock_motor import AsyncMongoMockClient
+except ImportError:
+    print("❌ Cần cài mongomock-motor: pip install mongomock-motor")
+    sys.exit(1)
+
+from app.core.config import settings  # noqa: E402
+from app.services.common.lexicon_store import (  # noqa: E402
+    LexiconStore, POLLING, SENSITIVE_KEYWORDS, NEGATIVE_LEXICON
+)
+from app.models.text_classtification.text_classtification import rule_based_scoring  # noqa: E402
+import app.services.common.lexicon_store as lexicon_store_module  # noqa: E402
+
+
+async def test_lexicon_store():
+    db = AsyncMongoMockClient()["soulspace_test"]
+    await db[SENSITIVE_KEYWORDS].insert_many([
+        {"keyword": "kill", "severity": "hard", "category": "violence", "variations": ["k1ll"]},
+        {"keyword": "buồn", "severity": "soft", "category": "sadness", "variations": []},
+    ])
+    await db[NEGATIVE_LEXICON].insert_many([
+        {"word": "ngu", "weight": 0.1},
+        {"word": "cút", "weight": 0.18},
+    ])
+
+    store = LexiconStore()
+    lexicon_store_module._store = store
+    settings.LEXICON_POLL_SECONDS = 0.05
+
+    print("[1] start() → load + change stream không hỗ trợ → polling")
+    await store.start(db)
+    for _ in range(50):
+        if store.mode == POLLING:
+            break
+        await asyncio.sleep(0.02)
+    print(f"    {store.status()}")
+    assert store.loaded and store.mode == POLLING
+    hits = store.snapshot.keyword_matcher.match("I will K1LL you, buồn quá")
+    print(f"    hits: {[(h.term, h.severity) for h in hits]}")
+    assert [h.term for h in hits] == ["k1ll", "buồn"]
+
+    print("\n[2] Ghi qua repository → version stamp tăng, snapshot cập nhật ngay")
+    from app.repositories.sensitive_keyword_repository import SensitiveKeywordRepository
+    version = store.snapshot.version
+    await SensitiveKeywordRepository(db).create({"keyword": "die", "severity": "hard", "variations": []})
+    stamp = await db["lexicon_versions"].find_one({"_id": SENSITIVE_KEYWORDS})
+    print(f"    stamp: {stamp['version']}, snapshot version: {version} → {store.snapshot.version}")
+    assert store.snapshot.version > version
+    assert [h.term for h in store.snapshot.keyword_matcher.match("i want to die")] == ["die"]
+
+    print("\n[3] Worker khác ghi (chỉ bump stamp) → poll_once() reload collection đó")
+    await db[NEGATIVE_LEXICON].insert_one({"word": "đồ điên", "weight": 0.3})
+    await db["lexicon_versions"].update_one({"_id": NEGATIVE_LEXICON}, {"$inc": {"version": 1}}, upsert=True)
+    await store.poll_once()
+    print(f"    negative_lexicon: {dict(store.snapshot.negative_lexicon)}")
+    assert "đồ điên" in store.snapshot.negative_lexicon
+
+    print("\n[4] Change event (insert / update / delete) áp dụng trực tiếp, không đọc DB")
+    doc = {"_id": "kw-test", "keyword": "hopeless", "severity": "soft", "variations": []}
+    await store._apply_change({"operationType": "insert", "ns": {"coll": SENSITIVE_KEYWORDS},
+                               "documentKey": {"_id": "kw-test"}, "fullDocument": doc})
+    assert [h.severity for h in store.snapshot.keyword_matcher.match("so hopeless")] == ["soft"]
+    await store._apply_change({"operationType": "update", "ns": {"coll": SENSITIVE_KEYWORDS},
+                               "documentKey": {"_id": "kw-test"}, "fullDocument": {**doc, "severity": "hard"}})
+    assert [h.severity for h in store.snapshot.keyword_matcher.match("so hopeless")] == ["hard"]
+    await store._apply_change({"operationType": "delete", "ns": {"coll": SENSITIVE_KEYWORDS},
+                               "documentKey": {"_id": "kw-test"}})
+    assert store.snapshot.keyword_matcher.match("so hopeless") == []
+    print(f"    changes_applied: {store.changes_applied}")
+
+    print("\n[5] rule_based_scoring mặc định dùng snapshot negative_lexicon")
+    result = rule_based_scoring("mày ngu quá cút đi")
+    print(f"    {result}")
+    assert result["violation_words"] == ["ngu", "cút"] and result["penalty"] == 0.28
+
+    await store.stop()
+    print("\n✅ LexiconStore OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_lexicon_store())
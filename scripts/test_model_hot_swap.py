@@ -0,0 +1,132 @@
+"""
+Test phiên bản model + hot swap cho ToxicDetectionService
+- Publish 2 phiên bản (versions/<id>/ + manifest.json) từ bộ model có sẵn, CURRENT trỏ tới bản 1
+- reload(version, activate=True) trong lúc đang có request: không request nào lỗi,
+  mỗi kết quả ghi model_version của model đã chấm nó, CURRENT chuyển sang bản 2
+- Watcher: đổi CURRENT từ bên ngoài → service tự nạp và chuyển theo
+- Phiên bản hỏng: reload báo lỗi, model cũ tiếp tục chạy, watcher không thử lại liên tục
+- Bài viết tạo qua cascade lưu model_version
+
+Chạy: pip install mongomock-motor && python scripts/test_model_hot_swap.py --models Only_Model/models
+(--models: thư mục có lr_models.pkl / tfidf_*.pkl hoặc compact/)
+"""
+import argparse
+import asyncio
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.core.config import settings  # noqa: E402
+from app.services.common import model_versions  # noqa: E402
+from app.services.common.toxic_detection_service import PICKLE_FILES, ToxicDetectionService  # noqa: E402
+from app.services.common.toxic_model_format import COMPACT_DIR_NAME  # noqa: E402
+
+TEXTS = ["Hôm nay mình thấy vui lắm", "I will kill you", "you are stupid", "cảm ơn bạn nhiều"]
+
+
+def publish_copy(source: Path, models_dir: Path, activate: bool) -> str:
+    staged = model_versions.staging_dir(models_dir)
+    for name in PICKLE_FILES:
+        if (source / name).exists():
+            shutil.copy2(source / name, staged / name)
+    if (source / COMPACT_DIR_NAME).exists():
+        shutil.copytree(source / COMPACT_DIR_NAME, staged / COMPACT_DIR_NAME)
+    return model_versions.publish_version(models_dir, staged, {"source": str(source)}, activate=activate)
+
+
+async def hammer(service: ToxicDetectionService, stop: asyncio.Event) -> list[str]:
+    versions = []
+    while not stop.is_set():
+        results = await service.analyze_texts(TEXTS)
+        assert all(r.label in ("VIOLATION", "CLEAN") for r in results), [r.label for r in results]
+        assert len({r.model_version for r in results}) == 1  # one batch, one model
+        versions.append(results[0].model_version)
+        await asyncio.sleep(0)
+    return versions
+
+
+async def test_hot_swap(source: Path):
+    models_dir = Path(tempfile.mkdtemp()) / "models"
+    models_dir.mkdir()
+    v1 = publish_copy(source, models_dir, activate=True)
+    v2 = publish_copy(source, models_dir, activate=False)
+    print(f"[1] Published {v1} (active), {v2}")
+    print(f"    {[(m['version'], m['active']) for m in model_versions.list_versions(models_dir)]}")
+
+    service = ToxicDetectionService(models_path=str(models_dir))
+    assert service.model_version == v1, service.model_version
+    result = await service.analyze_text("I will kill you")
+    assert result.model_version == v1
+
+    print("\n[2] reload(v2, activate=True) while requests are running")
+    stop = asyncio.Event()
+    load = asyncio.create_task(hammer(service, stop))
+    await asyncio.sleep(0.2)
+    info = await service.reload_async(v2, activate=True)
+    await asyncio.sleep(0.2)
+    stop.set()
+    seen = await load
+    print(f"    {info}")
+    print(f"    {len(seen)} batches served: {seen.count(v1)} by {v1}, {seen.count(v2)} by {v2}")
+    assert seen[-1] == v2 and service.model_version == v2
+    assert model_versions.read_current(models_dir) == v2
+
+    print("\n[3] Watcher follows CURRENT")
+    settings.TOXIC_MODEL_WATCH_SECONDS = 0.1
+    await service.start_watching()
+    model_versions.activate_version(models_dir, v1)
+    for _ in range(50):
+        if service.model_version == v1:
+            break
+        await asyncio.sleep(0.1)
+    assert service.model_version == v1
+    print(f"    swapped back to {service.model_version}")
+
+    print("\n[4] Broken version keeps the old model")
+    staged = model_versions.staging_dir(models_dir)
+    for name in PICKLE_FILES:
+        (staged / name).write_bytes(b"not a pickle")
+    broken = model_versions.publish_version(models_dir, staged, activate=False)
+    try:
+        await service.reload_async(broken)
+        raise AssertionError("broken version loaded")
+    except Exception as e:
+        print(f"    reload({broken}) failed: {type(e).__name__}")
+    assert service.model_version == v1
+    model_versions.activate_version(models_dir, broken)
+    await asyncio.sleep(0.5)
+    status = service.status()
+    assert status["active"]["version"] == v1 and status["failed_version"] == broken
+    print(f"    still serving {v1}, watcher gave up on {broken}")
+    await service.stop_watching()
+
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        print("\n(skip [5]: pip install mongomock-motor)")
+    else:
+        from bson import ObjectId
+        from app.services.user.anon_post_service import AnonPostService
+
+        print("\n[5] Posts store the model version")
+        db = AsyncMongoMockClient()["soulspace_test"]
+        settings.ASYNC_MODERATION = False
+        post_service = AnonPostService(db)
+        post_service.moderation.toxic_service = service
+        post = await post_service.create_post(str(ObjectId()), "Hôm nay mình thấy vui lắm")
+        doc = await db["anon_posts"].find_one({"_id": post["_id"]})
+        print(f"    {doc['moderation_status']} model_version={doc['model_version']}")
+        assert doc["model_version"] == v1
+
+    shutil.rmtree(models_dir.parent, ignore_errors=True)
+    print("\n✅ Model hot swap OK")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", required=True, help="Only_Model/models (TF-IDF pickles / compact dir)")
+    args = parser.parse_args()
+    asyncio.run(test_hot_swap(Path(args.models).resolve()))
@@ -0,0 +1,114 @@
+"""
+Test ModerationCascade (mongomock-motor, không cần MongoDB server)
+- Từ khóa hard trong lexicon → Blocked ngay, không chạy TF-IDF
+- Link / số điện thoại → Pending, lý do nối " | Contains ..."
+- Không có PhoBERT: quyết định giống logic cũ của create_post (so sánh từng câu)
+- Thống kê từng tầng (hit rate, độ trễ)
+
+Chạy: pip install mongomock-motor && python scripts/test_moderation_cascade.py [--models Only_Model/models]
+"""
+import argparse
+import asyncio
+import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    from mongomock_motor import AsyncMongoMockClient
+except ImportError:
+    print("❌ Cần cài mongomock-motor: pip install mongomock-motor")
+    sys.exit(1)
+
+from app.services.common.lexicon_store import SENSITIVE_KEYWORDS  # noqa: E402
+from app.services.common.moderation_cascade import ModerationCascade  # noqa: E402
+from app.services.common.toxic_detection_service import ToxicDetectionService  # noqa: E402
+
+TEXTS = [
+    "Hôm nay mình thấy vui lắm",
+    "you are a stupid idiot, shut up",
+    "I will kill you and your family",
+    "xem thêm tại https://example.com nhé",
+    "gọi mình 0912 345 678 để nói chuyện",
+    "I feel so hopeless today",
+    "thank you for sharing, have a nice day",
+    "what a dumb post, go away loser",
+]
+
+
+async def legacy_decision(toxic_service, content: str) -> tuple:
+    """create_post trước khi có cascade (TF-IDF rồi regex link / phone)"""
+    action, scan_result, flagged_reason = "Approved", "Safe", None
+    try:
+        if await toxic_service.check_health():
+            result = await toxic_service.analyze_text(content, threshold=0.5)
+            if result.is_violation:
+                has_severe = any(label in result.toxic_labels for label in ["severe_toxic", "threat", "identity_hate"])
+                if has_severe or result.confidence >= 0.8:
+                    action, scan_result = "Blocked", "Unsafe"
+                    flagged_reason = f"AI detected toxic content: {', '.join(result.toxic_labels)} (confidence: {result.confidence:.2%})"
+                else:
+                    action, scan_result = "Pending", "Suspicious"
+                    flagged_reason = f"AI flagged for review: {', '.join(result.toxic_labels)} (confidence: {result.confidence:.2%})"
+        else:
+            scan_result = "Not Scanned"
+            flagged_reason = "AI service unavailable - manual review required"
+    except Exception as e:
+        scan_result = "Error"
+        flagged_reason = f"AI scan error: {str(e)}"
+    if re.search(r"(https?:\/\/\S+|(?:www\.)?[a-zA-Z0-9-]+\.[a-z]{2,}(\/\S*)?)", content, re.IGNORECASE):
+        if action == "Approved":
+            action, scan_result = "Pending", "Suspicious"
+        flagged_reason = (flagged_reason or "") + " | Contains link"
+    if re.search(r"\b(?:\+?\d[\d\-\s]{8,14}\d)\b", content):
+        if action == "Approved":
+            action, scan_result = "Pending", "Suspicious"
+        flagged_reason = (flagged_reason or "") + " | Contains phone number"
+    return action, scan_result, flagged_reason
+
+
+async def test_cascade(models_path):
+    db = AsyncMongoMockClient()["soulspace_test"]
+    toxic_service = ToxicDetectionService(models_path=models_path, load=False)
+    if models_path:
+        toxic_service.load()
+    print(f"TF-IDF models loaded: {toxic_service.models_loaded}")
+
+    print("\n[1] Không có lexicon, không có PhoBERT → giống logic cũ")
+    cascade = ModerationCascade(["lexicon", "patterns", "tfidf", "phobert"])
+    cascade.toxic_service = toxic_service
+    decisions = await cascade.moderate_batch(TEXTS, db=db)
+    for text, decision in zip(TEXTS, decisions):
+        expected = await legacy_decision(toxic_service, text)
+        got = (decision.action, decision.scan_result, decision.flagged_reason)
+        print(f"    {decision.action:8} {decision.decided_by or '-':8} {text[:40]}")
+        assert got == expected, f"{text!r}: {got} != {expected}"
+
+    print("\n[2] Từ khóa hard → Blocked ở tầng lexicon, TF-IDF không chạy")
+    await db[SENSITIVE_KEYWORDS].insert_one({"keyword": "kill", "severity": "hard", "variations": []})
+    from app.services.common.lexicon_store import LexiconStore
+    import app.services.common.lexicon_store as lexicon_store_module
+    lexicon_store_module._store = LexiconStore()
+    cascade = ModerationCascade(["lexicon", "patterns", "tfidf"])
+    cascade.toxic_service = toxic_service
+    decision = await cascade.moderate("I will kill you and your family", db=db)
+    print(f"    {decision.action} / {decision.flagged_reason} / stages={decision.stages}")
+    assert decision.action == "Blocked" and decision.decided_by == "lexicon"
+    assert decision.stages == ["lexicon"] and decision.detected_keywords == ["kill"]
+
+    print("\n[3] Thống kê từng tầng")
+    await cascade.moderate_batch(TEXTS, db=db)
+    for name, stats in cascade.metrics()["stats"].items():
+        print(f"    {name:8} {stats}")
+    assert cascade.stats["lexicon"].items == len(TEXTS) + 1
+    assert cascade.stats["tfidf"].items < cascade.stats["lexicon"].items
+
+    print("\n✅ ModerationCascade OK")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", default=None, help="Only_Model/models (TF-IDF pickles / compact dir)")
+    args = parser.parse_args()
+    asyncio.run(test_cascade(args.models))
@@ -0,0 +1,179 @@
+"""
+Test kiểm duyệt bất đồng bộ (ASYNC_MODERATION) trên mongomock-motor
+- create_post / create_comment lưu Pending + "Queued", tạo job, không chạy model
+- Worker claim job theo batch, chạy cascade một lần cho cả batch, cập nhật bài + log + thông báo
+- Bài / comment admin đã duyệt (qua repository update_status) trước khi worker chạy thì không bị ghi đè
+- Handler lỗi → job quay lại hàng đợi với backoff
+- Worker chỉ claim loại job nó có handler (journal không lẫn vào batch kiểm duyệt)
+- Lease được gia hạn trong lúc handler chạy lâu: worker khác không claim lại job
+- Journal hết lượt thử → processing_status="failed", file ghi âm bị xoá, không requeue lại;
+  requeue_pending chạy nhiều lần chỉ tạo một job
+- Hashtag chỉ được đếm khi bài được duyệt, và chỉ một lần dù duyệt lại
+
+Chạy: pip install mongomock-motor && python scripts/test_moderation_queue.py [--models Only_Model/models]
+"""
+import argparse
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    from mongomock_motor import AsyncMongoMockClient
+except ImportError:
+    print("❌ Cần cài mongomock-motor: pip install mongomock-motor")
+    sys.exit(1)
+
+from bson import ObjectId  # noqa: E402
+import mongomock.collection  # noqa: E402
+
+# mongomock chưa nhận tham số `sort` mà pymongo >= 4.9 truyền cho UpdateOne trong bulk_write
+_add_update = mongomock.collection.BulkOperationBuilder.add_update
+mongomock.collection.BulkOperationBuilder.add_update = (
+    lambda self, *args, sort=None, **kwargs: _add_update(self, *args, **kwargs)
+)
+
+from app.core.config import settings  # noqa: E402
+from app.services.common.lexicon_store import SENSITIVE_KEYWORDS  # noqa: E402
+from app.repositories.anon_comment_repository import AnonCommentRepository  # noqa: E402
+from app.repositories.anon_post_repository import AnonPostRepository  # noqa: E402
+from app.repositories.journal_repository import JournalRepository  # noqa: E402
+from app.services.common.moderation_queue import JOBS_COLLECTION, QUEUED, SCAN_QUEUED, ModerationWorker, enqueue  # noqa: E402
+from app.services.common.toxic_detection_service import ToxicDetectionService  # noqa: E402
+from app.services.user.anon_comment_service import AnonCommentService  # noqa: E402
+from app.services.user.anon_post_service import AnonPostService  # noqa: E402
+from app.services.user.journal_service import FAILED, PENDING, JournalService  # noqa: E402
+
+
+async def test_queue(models_path):
+    db = AsyncMongoMockClient()["soulspace_test"]
+    await db[SENSITIVE_KEYWORDS].insert_one({"keyword": "kill", "severity": "hard", "variations": []})
+    settings.ASYNC_MODERATION = True
+    user_id = str(ObjectId())
+
+    toxic_service = ToxicDetectionService(models_path=models_path, load=False)
+    if models_path:
+        toxic_service.load()
+
+    post_service = AnonPostService(db)
+    post_service.moderation.toxic_service = toxic_service
+
+    print("[1] create_post / create_comment → Pending, Queued, job trong hàng đợi")
+    texts = ["Hôm nay mình thấy vui lắm", "I will kill you", "xem tại https://example.com", "admin sẽ duyệt bài này"]
+    posts = [await post_service.create_post(user_id, text) for text in texts]
+    assert all(p["moderation_status"] == "Pending" and p["ai_scan_result"] == SCAN_QUEUED for p in posts)
+    comment = await AnonCommentService(db).create_comment(user_id, str(posts[0]["_id"]), "I will kill you", False)
+    manual_comment = await AnonCommentService(db).create_comment(user_id, str(posts[0]["_id"]), "kill the lights", False)
+    assert comment["moderation_status"] == "Pending"
+    assert await db[JOBS_COLLECTION].count_documents({"status": QUEUED}) == 6
+    assert await db["moderation_logs"].count_documents({}) == 0
+    print("    6 job queued, chưa có moderation log")
+
+    # Admin duyệt tay bài cuối và comment thứ hai trước khi worker chạy (đường cập nhật thật)
+    await AnonPostRepository(db).update_status(str(posts[3]["_id"]), "Hidden")
+    await AnonCommentRepository(db).update_status(str(manual_comment["_id"]), "Approved")
+
+    print("\n[2] Worker xử lý một batch")
+    worker = ModerationWorker()
+    worker.register("post", lambda db, jobs: AnonPostService(db).moderate_queued(jobs))
+    worker.register("comment", lambda db, jobs: AnonCommentService(db).moderate_queued(jobs))
+    worker._db = db
+    assert await worker.run_once() == 6
+    for post in posts:
+        doc = await db["anon_posts"].find_one({"_id": post["_id"]})
+        print(f"    {doc['moderation_status']:8} {doc['ai_scan_result']:12} {doc['content']}")
+    statuses = [(await db["anon_posts"].find_one({"_id": p["_id"]}))["moderation_status"] for p in posts]
+    assert statuses[1] == "Blocked" and statuses[2] == "Pending" and statuses[3] == "Hidden"
+    assert (await db["anon_posts"].find_one({"_id": posts[3]["_id"]}))["ai_scan_result"] == "Not Scanned"
+    comment_doc = await db["anon_comments"].find_one({"_id": comment["_id"]})
+    assert comment_doc["moderation_status"] == "Blocked" and "ai_scan_result" not in comment_doc
+    manual_doc = await db["anon_comments"].find_one({"_id": manual_comment["_id"]})
+    assert manual_doc["moderation_status"] == "Approved"
+    assert await db[JOBS_COLLECTION].count_documents({}) == 0
+    # 3 bài + 1 comment (bài / comment đã duyệt tay bị bỏ qua)
+    assert await db["moderation_logs"].count_documents({}) == 4
+    print(f"    metrics: {await worker.metrics()}")
+
+    print("\n[3] Handler lỗi → job quay lại hàng đợi, thử lại sau")
+    async def broken(db, jobs):
+        raise RuntimeError("model crashed")
+    worker.register("post", broken)
+    await post_service.create_post(user_id, "bài viết thứ năm")
+    assert await worker.run_once() == 1
+    job = await db[JOBS_COLLECTION].find_one({})
+    print(f"    status={job['status']} attempts={job['attempts']} error={job['error']}")
+    assert job["status"] == QUEUED and job["attempts"] == 1
+    assert await worker.run_once() == 0  # backoff: chưa tới available_at
+    await db[JOBS_COLLECTION].delete_many({})
+
+    print("\n[4] Journal job chỉ do journal worker claim, lease được gia hạn khi chạy lâu")
+    settings.MODERATION_JOB_LEASE_SECONDS = 0.3
+    await enqueue(db, "journal", ObjectId(), user_id, "")
+    assert await worker.run_once() == 0  # worker kiểm duyệt không có handler "journal"
+    other = ModerationWorker("journal", batch_size=1)
+    other.register("journal", lambda db, jobs: asyncio.sleep(0))
+    other._db = db
+
+    reclaimed = []
+
+    async def slow(db, jobs):
+        await asyncio.sleep(1.0)  # > lease
+        reclaimed.append(await other.run_once())
+
+    journal_worker = ModerationWorker("journal", batch_size=1)
+    journal_worker.register("journal", slow)
+    journal_worker._db = db
+    assert await journal_worker.run_once() == 1
+    assert reclaimed == [0], "job bị claim lại khi đang chạy"
+    assert await db[JOBS_COLLECTION].count_documents({}) == 0
+    print("    không bị claim lại sau 1s (lease 0.3s)")
+
+    print("\n[5] Journal hết lượt thử → failed, xoá file ghi âm; requeue_pending idempotent")
+    journal_service = JournalService(JournalRepository(db))
+    voice = tempfile.NamedTemporaryFile(suffix=".webm", delete=False)
+    voice.close()
+    journals = db["journals"]
+    pending_id = (await journals.insert_one({"user_id": ObjectId(user_id), "processing_status": PENDING})).inserted_id
+    voice_id = (await journals.insert_one({
+        "user_id": ObjectId(user_id), "processing_status": PENDING, "voice_note_path": voice.name
+    })).inserted_id
+    assert await journal_service.requeue_pending() == 2
+    assert await journal_service.requeue_pending() == 0  # process khác / lần khởi động sau
+    assert await db[JOBS_COLLECTION].count_documents({}) == 2
+
+    async def stt_down(db, jobs):
+        raise RuntimeError("STT unavailable")
+    settings.MODERATION_JOB_MAX_ATTEMPTS = 1
+    journal_worker.register("journal", stt_down, on_failed=lambda db, jobs: journal_service.fail_queued(jobs))
+    assert await journal_worker.run_once() == 1
+    assert await journal_worker.run_once() == 1
+    assert await journal_service.requeue_pending() == 0
+    statuses = {doc["_id"]: doc["processing_status"] async for doc in journals.find({})}
+    print(f"    processing_status={sorted(statuses.values())} file còn={Path(voice.name).exists()}")
+    assert statuses == {pending_id: FAILED, voice_id: FAILED}
+    assert not Path(voice.name).exists()
+    assert await db[JOBS_COLLECTION].count_documents({}) == 2  # job failed giữ lại để tra cứu
+
+    print("\n[6] Hashtag: bài Pending không được đếm, duyệt (lại) chỉ đếm một lần")
+    settings.MODERATION_JOB_MAX_ATTEMPTS = 3
+    worker.register("post", lambda db, jobs: AnonPostService(db).moderate_queued(jobs))
+    queued = await post_service.create_post(user_id, "bài có hashtag", hashtags=["#Chia_se"])
+    assert await db["hashtags"].find_one({"name": "chia_se"}) is None
+    assert await worker.run_once() == 1  # worker duyệt bài
+    repo = AnonPostRepository(db)
+    await repo.update_status(str(queued["_id"]), "Blocked")
+    await repo.update_status(str(queued["_id"]), "Approved")
+    tag = await db["hashtags"].find_one({"name": "chia_se"})
+    print(f"    usage_count={tag['usage_count']}")
+    assert tag["usage_count"] == 1
+
+    print("\n✅ Moderation queue OK")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", default=None, help="Only_Model/models (TF-IDF pickles / compact dir)")
+    args = parser.parse_args()
+    asyncio.run(test_queue(args.models))
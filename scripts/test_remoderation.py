@@ -0,0 +1,173 @@
+"""
+Test job re-moderation trên mongomock-motor
+- Quét anon_posts / anon_comments theo _id, batch nhỏ, checkpoint sau mỗi batch
+- Pause giữa chừng → resume tiếp từ checkpoint, không chấm lại
+- Mode escalate: chỉ siết trạng thái (Approved → Pending/Blocked), không tự duyệt
+- Bỏ qua nội dung admin đã duyệt tay (status_reason)
+- Admin duyệt tay trong lúc batch đang chấm: không log / không trừ comment_count cho bài đó
+- Runner chết (redeploy): watcher định kỳ nhận lại job khi heartbeat quá hạn
+
+Chạy: pip install mongomock-motor && python scripts/test_remoderation.py --models Only_Model/models
+"""
+import argparse
+import asyncio
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+try:
+    from mongomock_motor import AsyncMongoMockClient
+except ImportError:
+    print("❌ Cần cài mongomock-motor: pip install mongomock-motor")
+    sys.exit(1)
+
+from bson import ObjectId  # noqa: E402
+import mongomock.collection  # noqa: E402
+
+# mongomock chưa nhận tham số `sort` mà pymongo >= 4.9 truyền cho UpdateOne trong bulk_write
+_add_update = mongomock.collection.BulkOperationBuilder.add_update
+mongomock.collection.BulkOperationBuilder.add_update = (
+    lambda self, *args, sort=None, **kwargs: _add_update(self, *args, **kwargs)
+)
+
+from app.core.config import settings  # noqa: E402
+from app.services.admin import remoderation_service  # noqa: E402
+from app.services.admin.remoderation_service import RemoderationService  # noqa: E402
+from app.services.common.moderation_cascade import ModerationCascade, get_moderation_cascade  # noqa: E402
+from app.services.common.moderation_queue import SCAN_QUEUED  # noqa: E402
+from app.services.common.toxic_detection_service import ToxicDetectionService  # noqa: E402
+
+CLEAN = ["Hôm nay mình thấy vui lắm", "thank you for sharing", "have a nice day everyone"]
+TOXIC = ["you are a stupid idiot, shut up", "I will kill you and your family"]
+
+
+async def wait_for(service, job_id, statuses):
+    for _ in range(500):
+        status = await service.status(job_id)
+        if status["status"] in statuses:
+            return status
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job stuck in {status['status']}")
+
+
+async def test_remoderation(models_path):
+    db = AsyncMongoMockClient()["soulspace_test"]
+    cascade = get_moderation_cascade()
+    cascade.toxic_service = ToxicDetectionService(models_path=models_path)
+    assert cascade.toxic_service.models_loaded, "cần --models"
+
+    user_id = ObjectId()
+    post_id = ObjectId()
+    posts = []
+    for i in range(200):
+        text = (TOXIC if i % 10 == 0 else CLEAN)[i % 2]
+        posts.append({"user_id": user_id, "content": text, "moderation_status": "Approved",
+                      "ai_scan_result": "Safe", "comment_count": 0, "created_at": datetime.utcnow()})
+    posts[0]["status_reason"] = "admin checked"  # duyệt tay → bỏ qua
+    posts[1]["ai_scan_result"] = "Not Scanned"  # duyệt khi thiếu model → chấm lại
+    posts[2].update(moderation_status="Pending", ai_scan_result=SCAN_QUEUED)  # còn trong hàng đợi → bỏ qua
+    await db["anon_posts"].insert_many(posts)
+    await db["anon_posts"].insert_one({"_id": post_id, "user_id": user_id, "content": "post", "moderation_status": "Approved",
+                                       "ai_scan_result": "Safe", "status_reason": "x", "comment_count": 3})
+    await db["anon_comments"].insert_many([
+        {"post_id": post_id, "user_id": user_id, "content": text, "moderation_status": "Approved"}
+        for text in TOXIC + CLEAN
+    ])
+
+    service = RemoderationService(db)
+
+    print("[1] Start (batch 32), admin pause sau batch thứ 2")
+    process_batch = service._process_batch
+    batches = []
+
+    async def pausing_batch(job, *args):
+        if len(batches) == 2:
+            await service.pause(str(job["_id"]))
+        batches.append(len(args[-1]))
+        return await process_batch(job, *args)
+
+    service._process_batch = pausing_batch
+    status = await service.start(admin_id=user_id, batch_size=32)
+    print(f"    totals: {status['totals']}")
+    assert status["totals"] == {"anon_posts": 198, "anon_comments": 5}
+    paused = await wait_for(service, status["job_id"], ["paused"])
+    await asyncio.sleep(0.05)
+    paused = await service.status(status["job_id"])
+    service._process_batch = process_batch
+    print(f"    paused at processed={paused['processed']}")
+    # Batch thứ 3 bị bỏ (checkpoint từ chối) → chấm lại khi resume
+    assert paused["status"] == "paused" and paused["processed"]["anon_posts"] == 64
+
+    print("\n[2] Resume → chạy tiếp từ checkpoint đến hết")
+    await service.resume(status["job_id"])
+    done = await wait_for(service, status["job_id"], ["completed", "failed"])
+    print(f"    processed={done['processed']} changed={done['changed']} escalated={done['escalated']}")
+    assert done["status"] == "completed", done["error"]
+    assert done["processed"] == {"anon_posts": 198, "anon_comments": 5}
+
+    print("\n[3] Kết quả trên dữ liệu")
+    assert await db["anon_posts"].count_documents({"remoderated_at": {"$exists": True}}) == 198
+    assert "remoderated_at" in await db["anon_posts"].find_one({"_id": posts[1]["_id"]})
+    assert "remoderated_at" not in await db["anon_posts"].find_one({"_id": posts[2]["_id"]})
+    first = await db["anon_posts"].find_one({"status_reason": "admin checked"})
+    assert "remoderated_at" not in first and first["moderation_status"] == "Approved"
+    escalated = await db["anon_posts"].count_documents({"moderation_status": {"$ne": "Approved"}, "_id": {"$ne": posts[2]["_id"]}})
+    logs = await db["moderation_logs"].count_documents({"source": "remoderation"})
+    parent = await db["anon_posts"].find_one({"_id": post_id})
+    print(f"    posts escalated: {escalated}, logs: {logs}, comment_count: 3 → {parent['comment_count']}")
+    assert escalated == done["changed"]["anon_posts"] and logs == sum(done["changed"].values())
+    assert parent["comment_count"] == 3 - done["changed"]["anon_comments"]
+
+    print("\n[4] Job mới sau khi xong, mode scores: không đổi trạng thái")
+    again = await service.start(admin_id=user_id, mode="scores")
+    done = await wait_for(service, again["job_id"], ["completed", "failed"])
+    assert sum(done["changed"].values()) == 0
+    print(f"    {done['docs_per_second']} docs/s")
+
+    print("\n[5] Admin duyệt tay giữa lúc chấm và lúc ghi → không tính là escalate")
+    other_post = ObjectId()
+    await db["anon_posts"].insert_one({"_id": other_post, "user_id": user_id, "content": "post", "moderation_status": "Approved",
+                                       "ai_scan_result": "Safe", "status_reason": "x", "comment_count": 2})
+    result = await db["anon_comments"].insert_many([
+        {"post_id": other_post, "user_id": user_id, "content": text, "moderation_status": "Approved"} for text in TOXIC
+    ])
+    moderate_batch = ModerationCascade.moderate_batch
+
+    async def admin_meanwhile(self, texts, **kwargs):
+        decisions = await moderate_batch(self, texts, **kwargs)
+        await db["anon_comments"].update_one({"_id": result.inserted_ids[0]}, {"$set": {"status_reason": "admin ok"}})
+        return decisions
+
+    ModerationCascade.moderate_batch = admin_meanwhile
+    try:
+        job = await service.start(admin_id=user_id, collections=["anon_comments"])
+        done = await wait_for(service, job["job_id"], ["completed", "failed"])
+    finally:
+        ModerationCascade.moderate_batch = moderate_batch
+    logs = await db["moderation_logs"].count_documents({"job_id": ObjectId(job["job_id"])})
+    parent = await db["anon_posts"].find_one({"_id": other_post})
+    print(f"    changed={done['changed']} logs={logs} comment_count: 2 → {parent['comment_count']}")
+    assert done["changed"]["anon_comments"] == 1 and logs == 1 and parent["comment_count"] == 1
+
+    print("\n[6] Runner chết giữa chừng → watcher nhận lại job sau khi heartbeat quá hạn")
+    settings.REMODERATION_STALE_SECONDS = 1
+    job = await service.start(admin_id=user_id, mode="scores")
+    remoderation_service._tasks[job["job_id"]].cancel()  # process bị kill khi redeploy
+    await asyncio.sleep(0)
+    await service.start_watching()  # process mới khởi động: heartbeat chưa quá hạn
+    assert (await service.status(job["job_id"]))["status"] == "running"
+    done = await wait_for(service, job["job_id"], ["completed", "failed"])
+    await remoderation_service.stop_remoderation_watcher()
+    print(f"    {done['status']} processed={done['processed']}")
+    assert done["status"] == "completed"
+
+    print("\n✅ Re-moderation OK")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--models", required=True, help="Only_Model/models (TF-IDF pickles / compact dir)")
+    args = parser.parse_args()
+    asyncio.run(test_remoderation(args.models))